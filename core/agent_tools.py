@@ -17,6 +17,7 @@ from core.agent_tools_edit import (
     _plan_line_range_edit,
     _reindent_like_match,
     _select_single_edit_match,
+    apply_edit,
     copy_file,
     delete_file,
     edit_file,
@@ -91,6 +92,7 @@ class AgentToolHandler:
     execute_command = staticmethod(execute_command)
     preview_edit = classmethod(preview_edit)
     edit_file = classmethod(edit_file)
+    apply_edit = classmethod(apply_edit)
 
     _plan_edit = classmethod(_plan_edit)
     _plan_line_range_edit = classmethod(_plan_line_range_edit)
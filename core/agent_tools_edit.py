@@ -1,6 +1,13 @@
 import os
+import re
 
 from core.agent_tools_base import _require_inside_project, get_project_root, resolve_path
+from core.agent_tools_read_search import _evict_cached_source
+
+DIFF_CONTEXT_LINES = 3
+DIFF_MAX_LINES = 5000  # changed regions wider than this are not handed to difflib
+DIFF_TRIM_SLACK = 50  # shared lines kept around a change so difflib aligns it as on the whole file
+_HUNK_HEADER_RE = re.compile(r"@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
 
 
 def write_file(path, content):
@@ -16,6 +23,8 @@ def write_file(path, content):
         return f"[Success: File written to {full_path}]"
     except Exception as e:
         return f"[Error writing file: {e}]"
+    finally:
+        _evict_cached_source(full_path)
 
 
 def move_file(src, dst):
@@ -35,6 +44,9 @@ def move_file(src, dst):
         return f"[Success: Moved '{src}' to '{dst}']"
     except Exception as e:
         return f"[Error moving file: {e}]"
+    finally:
+        _evict_cached_source(src_path)
+        _evict_cached_source(dst_path)
 
 
 def copy_file(src, dst):
@@ -53,6 +65,8 @@ def copy_file(src, dst):
         return f"[Success: Copied '{src}' to '{dst}']"
     except Exception as e:
         return f"[Error copying file: {e}]"
+    finally:
+        _evict_cached_source(dst_path)
 
 
 def delete_file(path):
@@ -72,6 +86,8 @@ def delete_file(path):
         return f"[Error: Path not found '{path}']"
     except Exception as e:
         return f"[Error deleting '{path}': {e}]"
+    finally:
+        _evict_cached_source(full_path)
 
 
 def execute_command(command, cwd=None, timeout=120):
@@ -125,6 +141,11 @@ def preview_edit(cls, path, old_text="", new_text="", start_line=None, end_line=
 
 def edit_file(cls, path, old_text="", new_text="", start_line=None, end_line=None, match_mode="smart", occurrence=None, replace_all=False, anchor_before="", anchor_after="", insert_before="", insert_after=""):
     plan = cls.preview_edit(path, old_text=old_text, new_text=new_text, start_line=start_line, end_line=end_line, match_mode=match_mode, occurrence=occurrence, replace_all=replace_all, anchor_before=anchor_before, anchor_after=anchor_after, insert_before=insert_before, insert_after=insert_after)
+    return cls.apply_edit(path, plan)
+
+
+def apply_edit(cls, path, plan):
+    """Write a ``preview_edit`` plan to disk; its ``old_content``/``new_content`` stay valid for diffs."""
     if plan.get('error'):
         return plan['error']
     if not plan.get('changed'):
@@ -138,6 +159,8 @@ def edit_file(cls, path, old_text="", new_text="", start_line=None, end_line=Non
         return f"[Success: Edited {plan['full_path']} using {plan.get('method', 'edit')} — {plan.get('summary', 'applied edit')}]"
     except Exception as e:
         return f"[Error editing file: {e}]"
+    finally:
+        _evict_cached_source(plan['full_path'])
 
 
 def _plan_edit(cls, content, *, path, old_text="", new_text="", start_line=None, end_line=None, match_mode="smart", occurrence=None, replace_all=False, anchor_before="", anchor_after="", insert_before="", insert_after=""):
@@ -354,6 +377,38 @@ def validate_syntax(code, filename):
 
 
 def get_diff(old_content, new_content, filename):
+    """Unified diff of the two texts, run only over the lines that differ.
+
+    The shared head and tail are trimmed before difflib sees them (its cost
+    grows with both sides), and a changed region wider than
+    ``DIFF_MAX_LINES`` is elided rather than diffed.
+    """
     import difflib
-    diff = difflib.unified_diff(old_content.splitlines(), new_content.splitlines(), fromfile=f"a/{filename}", tofile=f"b/{filename}", n=3)
-    return '\n'.join(list(diff))
\ No newline at end of file
+    old_lines = old_content.splitlines()
+    new_lines = new_content.splitlines()
+    limit = min(len(old_lines), len(new_lines))
+    head = 0
+    while head < limit and old_lines[head] == new_lines[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and old_lines[-1 - tail] == new_lines[-1 - tail]:
+        tail += 1
+    changed = max(len(old_lines), len(new_lines)) - head - tail
+    if changed > DIFF_MAX_LINES:
+        return f"[Large change in {filename} — diff of ~{changed} lines elided]"
+    start = max(0, head - DIFF_TRIM_SLACK)
+    keep_tail = max(0, tail - DIFF_TRIM_SLACK)
+    old_lines = old_lines[start:len(old_lines) - keep_tail]
+    new_lines = new_lines[start:len(new_lines) - keep_tail]
+    diff = difflib.unified_diff(old_lines, new_lines, fromfile=f"a/{filename}", tofile=f"b/{filename}", n=DIFF_CONTEXT_LINES)
+    if not start:
+        return '\n'.join(diff)
+    return '\n'.join(_shift_hunk_header(line, start) if line.startswith('@@') else line for line in diff)
+
+
+def _shift_hunk_header(line, offset):
+    match = _HUNK_HEADER_RE.match(line)
+    if not match:
+        return line
+    old_start, old_count, new_start, new_count = match.groups()
+    return f"@@ -{int(old_start) + offset}{old_count or ''} +{int(new_start) + offset}{new_count or ''} @@" + line[match.end():]
\ No newline at end of file
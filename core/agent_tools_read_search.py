@@ -1,11 +1,63 @@
 import ast
+import io
 import json
 import os
 import re
+import threading
+from collections import OrderedDict
 
 from core.agent_tools_base import get_project_root, resolve_path
 
 
+SOURCE_CACHE_SIZE = 64
+SOURCE_CACHE_MAX_BYTES = 2 * 1024 * 1024  # larger files are always read fresh
+_source_cache = OrderedDict()  # full_path -> [(mtime_ns, size), text, lines, tree]
+_source_cache_lock = threading.Lock()
+
+
+def _cached_source(full_path, want_lines=False, want_tree=False):
+    """Return a cache entry for ``full_path``, reused while its (mtime, size) is unchanged.
+
+    Read tools hit the same files repeatedly across an agent loop; the text,
+    its lines and the parsed AST are filled in lazily and shared between them.
+    Raises the same errors as reading/parsing the file directly.
+    """
+    st = os.stat(full_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _source_cache_lock:
+        entry = _source_cache.get(full_path)
+        if entry is not None and entry[0] == stamp:
+            _source_cache.move_to_end(full_path)
+        else:
+            entry = None
+    if entry is None:
+        with open(full_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        entry = [stamp, text, None, None]
+        if st.st_size <= SOURCE_CACHE_MAX_BYTES:
+            with _source_cache_lock:
+                _source_cache[full_path] = entry
+                while len(_source_cache) > SOURCE_CACHE_SIZE:
+                    _source_cache.popitem(last=False)
+    if want_lines and entry[2] is None:
+        entry[2] = io.StringIO(entry[1]).readlines()
+    if want_tree and entry[3] is None:
+        entry[3] = ast.parse(entry[1])
+    return entry
+
+
+def _evict_cached_source(full_path):
+    """Forget cached sources at or under ``full_path`` after a tool changed them.
+
+    The (mtime, size) stamp alone misses same-size rewrites on filesystems
+    with coarse timestamps.
+    """
+    prefix = os.path.join(full_path, "")
+    with _source_cache_lock:
+        for cached in [p for p in _source_cache if p == full_path or p.startswith(prefix)]:
+            del _source_cache[cached]
+
+
 def read_file(cls, path, start_line=1, end_line=150, with_line_numbers=False):
     full_path = resolve_path(path)
     if not os.path.exists(full_path):
@@ -13,8 +65,7 @@ def read_file(cls, path, start_line=1, end_line=150, with_line_numbers=False):
     if "crash.log" in os.path.basename(full_path):
         return "[Skipping crash.log to prevent file lock issues]"
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        lines = _cached_source(full_path, want_lines=True)[2]
         total_lines = len(lines)
         content = cls._render_line_excerpt(lines, start_line, end_line, with_line_numbers=with_line_numbers)
         if total_lines > end_line:
@@ -53,12 +104,14 @@ def find_files(cls, pattern, root_dir=".", case_insensitive=False, max_results=1
     limit = max(1, int(max_results or 100))
     pattern_cmp = pattern.lower() if case_insensitive else pattern
     matches = []
+    base_len = len(os.path.join(base_dir, ""))
     for root, dirs, files in os.walk(base_dir):
         dirs[:] = [d for d in dirs if d not in cls.EXCLUDE_DIRS]
+        rel_root = os.path.join(root, "")[base_len:]
         for file_name in files:
             candidate = file_name.lower() if case_insensitive else file_name
             if fnmatch.fnmatch(candidate, pattern_cmp):
-                matches.append(os.path.relpath(os.path.join(root, file_name), base_dir))
+                matches.append(rel_root + file_name)
                 if len(matches) >= limit:
                     return "\n".join(matches)
     return "\n".join(matches) if matches else "[No files found]"
@@ -74,18 +127,20 @@ def search_files(cls, query, root_dir=".", file_pattern=None, case_insensitive=F
     pattern = re.compile(re.escape(str(query or "")), re.IGNORECASE if case_insensitive else 0)
     hits = []
     limit = max(1, int(max_results or 100))
+    base_len = len(os.path.join(base_dir, ""))
     for root, dirs, files in os.walk(base_dir):
         dirs[:] = [d for d in dirs if d not in cls.EXCLUDE_DIRS]
+        root_with_sep = os.path.join(root, "")
         for file_name in files:
             if file_pattern and not fnmatch.fnmatch(file_name, file_pattern):
                 continue
-            full_path = os.path.join(root, file_name)
+            full_path = root_with_sep + file_name
             try:
                 with open(full_path, 'r', encoding='utf-8') as f:
                     lines = f.readlines()
             except Exception:
                 continue
-            rel_path = os.path.relpath(full_path, base_dir)
+            rel_path = full_path[base_len:]
             for idx, line in enumerate(lines, start=1):
                 if pattern.search(line):
                     hits.append(cls._format_context_block(rel_path, lines, idx, context_lines=context_lines))
@@ -152,14 +207,14 @@ def find_references(cls, symbol, root_dir=".", file_pattern="*.py", context_line
     hits = []
     for rel_path, full_path in cls._iter_python_files(base_dir, file_pattern=file_pattern):
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            entry = _cached_source(full_path, want_lines=True)
         except Exception:
             continue
+        lines = entry[2]
         definitions = set()
         if not include_definitions:
             try:
-                tree = ast.parse(''.join(lines))
+                tree = _cached_source(full_path, want_tree=True)[3]
                 definitions = {int(getattr(node, 'lineno', -1)) for node in ast.walk(tree) if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and getattr(node, 'name', '') in target_names}
             except Exception:
                 definitions = set()
@@ -351,9 +406,9 @@ def _load_python_ast(path):
     if not full_path.endswith('.py'):
         return None, "[Info: Python symbol tools are only supported for .py files]"
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            source = f.read()
-        return (full_path, source, source.splitlines(True), ast.parse(source)), None
+        entry = _cached_source(full_path, want_tree=True)
+        source = entry[1]
+        return (full_path, source, source.splitlines(True), entry[3]), None
     except Exception as e:
         return None, f"[Error parsing Python file: {e}]"
 
@@ -406,13 +461,15 @@ def _iter_python_files(cls, base_dir, file_pattern='*.py'):
         if rel_name.endswith('.py') and fnmatch.fnmatch(rel_name, file_pattern or '*.py'):
             yield rel_name, base_dir
         return
+    base_len = len(os.path.join(base_dir, ""))
     for root, dirs, files in os.walk(base_dir):
         dirs[:] = [d for d in dirs if d not in cls.EXCLUDE_DIRS]
+        root_with_sep = os.path.join(root, "")
         for file_name in files:
             if not file_name.endswith('.py') or not fnmatch.fnmatch(file_name, file_pattern or '*.py'):
                 continue
-            full_path = os.path.join(root, file_name)
-            yield os.path.relpath(full_path, base_dir), full_path
+            full_path = root_with_sep + file_name
+            yield full_path[base_len:], full_path
 
 
 def _scan_python_symbols(cls, root_dir='.', file_pattern='*.py', predicate=None, max_results=50):
@@ -423,8 +480,7 @@ def _scan_python_symbols(cls, root_dir='.', file_pattern='*.py', predicate=None,
     limit = max(1, int(max_results or 50))
     for rel_path, full_path in cls._iter_python_files(base_dir, file_pattern=file_pattern):
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                tree = ast.parse(f.read())
+            tree = _cached_source(full_path, want_tree=True)[3]
         except Exception:
             continue
         for entry in cls._collect_python_symbols(tree):
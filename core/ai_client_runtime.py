@@ -1,12 +1,31 @@
 import json
 import logging
+import threading
 import time
 
 import requests
 
+try:
+    import orjson as _orjson  # optional: faster encoding of large (base64-heavy) bodies
+except ImportError:
+    _orjson = None
+
 
 log = logging.getLogger(__name__)
 
+_http_session_obj = None
+_http_session_lock = threading.Lock()
+
+
+def _http_session() -> requests.Session:
+    """Process-wide session so provider connections (TCP + TLS) stay warm between turns."""
+    global _http_session_obj
+    if _http_session_obj is None:
+        with _http_session_lock:
+            if _http_session_obj is None:
+                _http_session_obj = requests.Session()
+    return _http_session_obj
+
 
 def _build_payload(self, messages, fmt, model_name=None):
     model_name = model_name or self.model
@@ -51,8 +70,22 @@ def _build_payload(self, messages, fmt, model_name=None):
     return {}
 
 
+def _encode_payload(payload) -> bytes:
+    """Serialise a request body compactly; non-ASCII text is sent as UTF-8 instead of \\u escapes.
+
+    orjson, when installed, produces the same compact UTF-8 form; anything it
+    cannot encode falls back to the stdlib encoder.
+    """
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(payload)
+        except TypeError:
+            pass
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
 def _stream_remote_attempt(self, url, headers, payload, fmt):
-    with requests.post(url, headers=headers, json=payload, stream=True) as response:
+    with _http_session().post(url, headers=headers, data=_encode_payload(payload), stream=True) as response:
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
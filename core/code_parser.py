@@ -14,36 +14,43 @@ class CodeParser:
         'git_push', 'git_pull', 'git_fetch',
         'web_search', 'fetch_url',
     }
+    _KNOWN_TOOLS_ALT = "|".join(sorted(KNOWN_TOOLS, key=len, reverse=True))
+    # Every accepted call spells a known tool name verbatim, so text without
+    # one can skip the stripping/normalising passes entirely.
+    _TOOL_NAME_RE = re.compile(rf'(?:{_KNOWN_TOOLS_ALT})\b')
+    # Compiled once: the tool-name alternation is long, and every finished
+    # response goes through all of these.
+    _CODE_FENCE_RE = re.compile(r'```[\s\S]*?```', re.DOTALL)
+    _THOUGHT_RE = re.compile(r'<thought>[\s\S]*?</thought>', re.DOTALL)
+    _TOOL_CALL_LINE_RE = re.compile(r'(?mi)^[ \t]*</?tool_call>[ \t]*$')
+    _TOOL_CALL_BEFORE_TAG_RE = re.compile(rf'(?mi)^([ \t]*)<tool_call>\s*(?=<(?:{_KNOWN_TOOLS_ALT})\b)')
+    _TOOL_CALL_BEFORE_NAME_RE = re.compile(rf'(?mi)^([ \t]*)<tool_call>\s*(?=(?:{_KNOWN_TOOLS_ALT})\b)')
+    _TOOL_CALL_CLOSE_RE = re.compile(r'(?mi)\s*</tool_call>[ \t]*$')
+    _BRACKET_CALL_RE = re.compile(rf'(?mi)^([ \t]*)\[({_KNOWN_TOOLS_ALT})(\b[^\]]*)\][ \t]*$')
+    _CODE_BLOCK_RE = re.compile(r"```(\w*)\n([\s\S]*?)```")
+    # Regex for attributes: key="value" or key='value'
+    _ATTR_RE = re.compile(r"(\w+)=(?:\"([^\"]*)\"|'([^']*)')")
+    # Tools must start at the beginning of a line (ignoring indentation).
+    # This prevents inline examples like `use <read_file ... />` from firing.
+    _BLOCK_CALL_RE = re.compile(r'(?ms)^[ \t]*<(\w+)([^>]*)>(.*?)</\1>[ \t]*$')
+    _SELF_CLOSING_CALL_RE = re.compile(r'(?m)^[ \t]*<(\w+)([^>]*?)\s*/>[ \t]*$')
 
     @staticmethod
     def _strip_non_executable_regions(text: str) -> str:
-        cleaned = re.sub(r'```[\s\S]*?```', '', text, flags=re.DOTALL)
-        cleaned = re.sub(r'<thought>[\s\S]*?</thought>', '', cleaned, flags=re.DOTALL)
+        cleaned = CodeParser._CODE_FENCE_RE.sub('', text)
+        cleaned = CodeParser._THOUGHT_RE.sub('', cleaned)
         return cleaned
 
     @staticmethod
     def _normalize_tool_syntax(text: str) -> str:
         if not text:
             return text
-        known_tools = "|".join(sorted(CodeParser.KNOWN_TOOLS, key=len, reverse=True))
         normalized = text
-        normalized = re.sub(r'(?mi)^[ \t]*</?tool_call>[ \t]*$', '', normalized)
-        normalized = re.sub(
-            rf'(?mi)^([ \t]*)<tool_call>\s*(?=<(?:{known_tools})\b)',
-            r'\1',
-            normalized,
-        )
-        normalized = re.sub(
-            rf'(?mi)^([ \t]*)<tool_call>\s*(?=(?:{known_tools})\b)',
-            r'\1<',
-            normalized,
-        )
-        normalized = re.sub(r'(?mi)\s*</tool_call>[ \t]*$', '', normalized)
-        normalized = re.sub(
-            rf'(?mi)^([ \t]*)\[({known_tools})(\b[^\]]*)\][ \t]*$',
-            r'\1<\2\3 />',
-            normalized,
-        )
+        normalized = CodeParser._TOOL_CALL_LINE_RE.sub('', normalized)
+        normalized = CodeParser._TOOL_CALL_BEFORE_TAG_RE.sub(r'\1', normalized)
+        normalized = CodeParser._TOOL_CALL_BEFORE_NAME_RE.sub(r'\1<', normalized)
+        normalized = CodeParser._TOOL_CALL_CLOSE_RE.sub('', normalized)
+        normalized = CodeParser._BRACKET_CALL_RE.sub(r'\1<\2\3 />', normalized)
         return normalized
 
     @staticmethod
@@ -52,8 +59,7 @@ class CodeParser:
         Extracts the first code block found in the text.
         Returns (language, code) or (None, None) if no block found.
         """
-        pattern = r"```(\w*)\n([\s\S]*?)```"
-        match = re.search(pattern, text)
+        match = CodeParser._CODE_BLOCK_RE.search(text)
         
         if match:
             language = match.group(1).strip()
@@ -74,29 +80,27 @@ class CodeParser:
         """
         calls = []
 
-        if not text:
+        if not text or ("<" not in text and "[" not in text) or not CodeParser._TOOL_NAME_RE.search(text):
             return calls
 
         cleaned = CodeParser._strip_non_executable_regions(text)
         cleaned = CodeParser._normalize_tool_syntax(cleaned)
 
-        # Regex for attributes: key="value" or key='value'
-        attr_pattern = re.compile(r"(\w+)=(?:\"([^\"]*)\"|'([^']*)')")
-
-        # Tools must start at the beginning of a line (ignoring indentation).
-        # This prevents inline examples like `use <read_file ... />` from firing.
-        block_pattern = re.compile(r'(?ms)^[ \t]*<(\w+)([^>]*)>(.*?)</\1>[ \t]*$')
-        self_closing_pattern = re.compile(r'(?m)^[ \t]*<(\w+)([^>]*?)\s*/>[ \t]*$')
-
         matches = []
-        for match in block_pattern.finditer(cleaned):
+        for match in CodeParser._BLOCK_CALL_RE.finditer(cleaned):
             matches.append((match.start(), match.end(), 'block', match))
 
-        masked = cleaned
-        for start, end, _, _ in sorted(matches, reverse=True):
-            masked = masked[:start] + (' ' * (end - start)) + masked[end:]
-
-        for match in self_closing_pattern.finditer(masked):
+        # Blank out block calls (non-overlapping, already in order) in one pass.
+        pieces = []
+        pos = 0
+        for start, end, _, _ in matches:
+            pieces.append(cleaned[pos:start])
+            pieces.append(' ' * (end - start))
+            pos = end
+        pieces.append(cleaned[pos:])
+        masked = "".join(pieces)
+
+        for match in CodeParser._SELF_CLOSING_CALL_RE.finditer(masked):
             matches.append((match.start(), match.end(), 'self', match))
 
         for _, _, kind, match in sorted(matches, key=lambda item: item[0]):
@@ -106,7 +110,7 @@ class CodeParser:
 
             attr_str = match.group(2)
             args = {}
-            for attr_match in attr_pattern.finditer(attr_str):
+            for attr_match in CodeParser._ATTR_RE.finditer(attr_str):
                 key = attr_match.group(1)
                 value = attr_match.group(2)
                 if value is None:
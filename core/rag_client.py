@@ -8,6 +8,7 @@ import socket
 import subprocess
 import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
@@ -19,6 +20,9 @@ from core.ai_client import AIClient
 
 log = logging.getLogger(__name__)
 
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 300.0  # seconds a cached retrieval stays valid
+
 
 @dataclass
 class RetrievedChunk:
@@ -46,6 +50,12 @@ class RAGClient:
     _server_failed: bool = False          # True once we know the server can't start
     _atexit_registered: bool = False
 
+    # Class-level retrieval cache — keyed by normalized query and corpus version
+    _query_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+    _query_cache_lock = threading.Lock()
+    _corpus_version: int = 0  # bumped when any project's files change
+    _namespace_versions: Dict[str, int] = {}  # namespace -> version of its codebase index
+
     def __init__(self):
         self.settings = SettingsManager()
         self.ai = AIClient()
@@ -251,6 +261,51 @@ class RAGClient:
             root = os.getcwd()
         return hashlib.sha256(root.encode()).hexdigest()[:16]
 
+    # ------------------------------------------------------------------
+    # Retrieval cache
+    # ------------------------------------------------------------------
+    @classmethod
+    def invalidate_query_cache(cls, *_):
+        """Bumps the corpus version so cached retrievals are never served again."""
+        with cls._query_cache_lock:
+            cls._corpus_version += 1
+            cls._query_cache.clear()
+
+    @classmethod
+    def _invalidate_namespace(cls, namespace: str):
+        """Drops cached retrievals of one project after its codebase index changed."""
+        with cls._query_cache_lock:
+            cls._namespace_versions[namespace] = cls._namespace_versions.get(namespace, 0) + 1
+            for key in [key for key in cls._query_cache if key[0] == namespace]:
+                del cls._query_cache[key]
+
+    @classmethod
+    def _corpus_version_of(cls, namespace: str) -> tuple:
+        return cls._corpus_version, cls._namespace_versions.get(namespace, 0)
+
+    @classmethod
+    def _cached_retrieval(cls, key: tuple) -> Optional[List[RetrievedChunk]]:
+        with cls._query_cache_lock:
+            entry = cls._query_cache.get(key)
+            if entry is None:
+                return None
+            stored_at, chunks = entry
+            if time.monotonic() - stored_at > QUERY_CACHE_TTL:
+                del cls._query_cache[key]
+                return None
+            cls._query_cache.move_to_end(key)
+            return list(chunks)
+
+    @classmethod
+    def _store_retrieval(cls, key: tuple, chunks: List[RetrievedChunk]):
+        with cls._query_cache_lock:
+            if key[1] != cls._corpus_version_of(key[0]):
+                return
+            cls._query_cache[key] = (time.monotonic(), list(chunks))
+            cls._query_cache.move_to_end(key)
+            while len(cls._query_cache) > QUERY_CACHE_SIZE:
+                cls._query_cache.popitem(last=False)
+
     def retrieve(self, query_text: str, k: Optional[int] = None, max_tokens: int = 8192) -> List[RetrievedChunk]:
         """
         Retrieves relevant context using the Go-based RIG engine.
@@ -265,7 +320,11 @@ class RAGClient:
         log.debug("RAG retrieve: query=%s... k=%d budget=%d tokens",
                   query_text[:60], k, max_tokens)
 
-        namespace = self._project_namespace()
+        cache_key = self._retrieval_key(query_text, k, max_tokens)
+        cached = self._cached_retrieval(cache_key)
+        if cached is not None:
+            log.debug("RAG retrieve: cache hit (%d chunks)", len(cached))
+            return cached
 
         try:
             vectors = self.ai.embed_texts([query_text])
@@ -277,12 +336,62 @@ class RAGClient:
             log.error("RAG retrieve: embedding failed: %s", e)
             return []
 
-        token_budget = max_tokens
+        return self._search_vector(cache_key, qvec, k, max_tokens)
+
+    def retrieve_batch(self, requests: List[tuple], max_tokens: int = 8192) -> Dict[tuple, List[RetrievedChunk]]:
+        """
+        Retrieves several ``(query, k)`` requests, embedding every uncached
+        query in a single ``embed_texts`` call. Requests that could not be
+        embedded are left out of the result so callers fall back to ``retrieve``.
+        """
+        if not self.settings.get_rag_enabled():
+            return {}
+
+        results: Dict[tuple, List[RetrievedChunk]] = {}
+        pending: Dict[tuple, List[tuple]] = {}
+        for query_text, k in requests:
+            if not query_text or not query_text.strip():
+                continue
+            cache_key = self._retrieval_key(query_text, k, max_tokens)
+            cached = self._cached_retrieval(cache_key)
+            if cached is not None:
+                results[(query_text, k)] = cached
+            else:
+                pending.setdefault(cache_key, []).append((query_text, k))
+        if not pending:
+            return results
+
+        texts = [requests_for_key[0][0] for requests_for_key in pending.values()]
+        log.debug("RAG retrieve_batch: embedding %d queries (%d cached)", len(texts), len(results))
+        try:
+            vectors = self.ai.embed_texts(texts)
+        except Exception as e:
+            log.error("RAG retrieve_batch: embedding failed: %s", e)
+            return results
+        if not vectors or len(vectors) != len(texts):
+            log.warning("RAG retrieve_batch: got %d vectors for %d queries, skipping.",
+                        len(vectors or []), len(texts))
+            return results
+
+        for (cache_key, requests_for_key), qvec in zip(pending.items(), vectors):
+            k = requests_for_key[0][1]
+            chunks = self._search_vector(cache_key, qvec, k, max_tokens)
+            for request in requests_for_key:
+                results[request] = chunks
+        return results
+
+    def _retrieval_key(self, query_text: str, k: int, max_tokens: int) -> tuple:
+        min_score = self.settings.get_rag_min_score() # Usually 0.4 - 0.7
+        namespace = self._project_namespace()
+        return (namespace, RAGClient._corpus_version_of(namespace),
+                " ".join(query_text.split()), k, max_tokens, min_score)
 
+    def _search_vector(self, cache_key: tuple, qvec: List[float], k: int, max_tokens: int) -> List[RetrievedChunk]:
+        namespace, min_score = cache_key[0], cache_key[5]
         payload = {
             "namespace": namespace,
             "query": qvec,
-            "max_tokens": token_budget,
+            "max_tokens": max_tokens,
         }
 
         resp = self._http_post("/retrieve", payload) or self._run_cli("retrieve", payload)
@@ -294,6 +403,7 @@ class RAGClient:
         # The Go engine now returns ScoredChunk which has a nested 'chunk' field
         raw_chunks = resp.get("chunks", [])
         if not raw_chunks:
+            self._store_retrieval(cache_key, [])
             return []
             
         for c in raw_chunks:
@@ -313,8 +423,6 @@ class RAGClient:
                 metadata=None, 
             ))
 
-        min_score = self.settings.get_rag_min_score() # Usually 0.4 - 0.7
-        
         # Filter by score
         if min_score > 0:
             chunks = [c for c in chunks if c.score >= min_score]
@@ -327,6 +435,7 @@ class RAGClient:
         est_tokens = total_chars // 4
         log.debug("RAG retrieve: returning %d chunks (~%d tokens, best score=%.4f)",
                   len(result), est_tokens, result[0].score if result else 0.0)
+        self._store_retrieval(cache_key, result)
         return result
 
     def format_context_block(self, chunks: List[RetrievedChunk], *, max_chars: Optional[int] = None, max_chunk_chars: Optional[int] = None) -> str:
@@ -394,6 +503,8 @@ class RAGClient:
                 log.debug("RAG ingest_message: both transports returned None")
                 return False
             log.debug("RAG ingest_message: stored (%s, ~%d tokens)", role, payload["token_count"])
+            # No cache invalidation: the newest messages are already in the prompt
+            # history, and cached retrievals pick them up after QUERY_CACHE_TTL.
             return True
         except Exception as e:
             log.error("RAG ingest_message failed: %s", e)
@@ -451,6 +562,8 @@ class RAGClient:
                 res = self._run_cli("ingest_document", cli_payload)
 
             ok = res is not None and (res.get("status") in ("ok", "ingested"))
+            if ok:
+                RAGClient._invalidate_namespace(namespace)
             return ok
         except Exception as e:
             log.error("RAG ingest_document failed (%s): %s", file_path, e)
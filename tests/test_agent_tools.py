@@ -2,9 +2,11 @@ import os
 import sys
 import tempfile
 import unittest
+from unittest.mock import patch
 
 sys.path.append(os.getcwd())
 
+from core import agent_tools_read_search
 from core.agent_tools import AgentToolHandler, get_project_root, set_project_root
 
 
@@ -47,6 +49,45 @@ class TestAgentTools(unittest.TestCase):
         self.assertIn("2: beta", read_result)
         self.assertIn("3: gamma", read_result)
 
+    def test_read_tools_reuse_cached_source_until_the_file_changes(self):
+        full_path = os.path.join(self._tmp.name, "app.py")
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write("def alpha():\n    return 1\n")
+
+        with patch.object(agent_tools_read_search.ast, 'parse', wraps=agent_tools_read_search.ast.parse) as mock_parse:
+            first = AgentToolHandler.get_file_structure("app.py")
+            self.assertIn("alpha", AgentToolHandler.read_file("app.py", 1, 20))
+            self.assertEqual(AgentToolHandler.get_file_structure("app.py"), first)
+            self.assertEqual(mock_parse.call_count, 1)
+
+            AgentToolHandler.write_file("app.py", "def beta():\n    return 2\n\n\ndef gamma():\n    pass\n")
+            second = AgentToolHandler.get_file_structure("app.py")
+
+        self.assertEqual(mock_parse.call_count, 2)
+        self.assertIn("beta", second)
+        self.assertNotIn("alpha", second)
+        self.assertIn("gamma", AgentToolHandler.read_file("app.py", 1, 20))
+
+    def test_tool_writes_evict_cached_source_even_when_the_stamp_matches(self):
+        full_path = os.path.join(self._tmp.name, "pkg", "app.py")
+        os.makedirs(os.path.dirname(full_path))
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write("x = 1\n")
+        stamp = os.stat(full_path).st_mtime_ns
+        self.assertIn("x = 1", AgentToolHandler.read_file("pkg/app.py", 1, 20))
+
+        # Same size and, as on a coarse-mtime filesystem, the same timestamp.
+        AgentToolHandler.write_file("pkg/app.py", "x = 2\n")
+        os.utime(full_path, ns=(stamp, stamp))
+        self.assertIn("x = 2", AgentToolHandler.read_file("pkg/app.py", 1, 20))
+
+        AgentToolHandler.move_file("pkg", "lib")
+        os.makedirs(os.path.dirname(full_path))
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write("x = 3\n")
+        os.utime(full_path, ns=(stamp, stamp))
+        self.assertIn("x = 3", AgentToolHandler.read_file("pkg/app.py", 1, 20))
+
     def test_edit_file_uses_indentation_aware_fallback_for_unique_block(self):
         full_path = os.path.join(self._tmp.name, "pkg", "worker.py")
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
@@ -275,6 +316,21 @@ class TestAgentTools(unittest.TestCase):
         self.assertIn("3: import json [external]", imports)
         self.assertIn("consumer.py:1: from src.engine import Worker [matches src.engine]", importers)
 
+    def test_get_diff_trims_shared_lines_but_keeps_file_line_numbers(self):
+        old = "".join(f"line {i}\n" for i in range(1, 1001))
+        new = old.replace("line 500\n", "line 500 changed\n")
+
+        diff = AgentToolHandler.get_diff(old, new, "big.txt")
+
+        self.assertIn("@@ -497,7 +497,7 @@", diff)
+        self.assertIn("-line 500\n+line 500 changed", diff)
+        self.assertNotIn("line 400", diff)
+
+    def test_get_diff_elides_very_large_changes(self):
+        diff = AgentToolHandler.get_diff("a\n", "".join(f"{i}\n" for i in range(6000)), "gen.txt")
+
+        self.assertTrue(diff.startswith("[Large change in gen.txt"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -103,7 +103,7 @@ class TestAIClient(unittest.TestCase):
         second_ctx.__enter__.return_value = second_response
         second_ctx.__exit__.return_value = False
 
-        with patch('core.ai_client.requests.post', side_effect=[first_ctx, second_ctx]) as mock_post, \
+        with patch('core.ai_client.requests.Session.post', side_effect=[first_ctx, second_ctx]) as mock_post, \
              patch('core.ai_client.time.sleep') as mock_sleep:
             chunks = list(client.stream_chat([{"role": "user", "content": "Say hello"}]))
 
@@ -273,7 +273,7 @@ class TestAIClient(unittest.TestCase):
         self.assertEqual(indicator["recommended_model"], "z-ai/glm-4.5-air:free")
         self.assertIn("OpenRouter ready", indicator["message"])
 
-    @patch('core.ai_client.requests.post')
+    @patch('core.ai_client.requests.Session.post')
     def test_openrouter_rate_limit_error_is_actionable(self, mock_post):
         self.settings_mock.get_selected_model.return_value = "[OpenRouter] z-ai/glm-4.5-air:free"
         client = AIClient()
@@ -298,7 +298,7 @@ class TestAIClient(unittest.TestCase):
         self.assertIn("try another free model", joined)
         self.assertIn("Rate limit exceeded for free tier", joined)
 
-    @patch('core.ai_client.requests.post')
+    @patch('core.ai_client.requests.Session.post')
     def test_openrouter_privacy_policy_error_is_actionable(self, mock_post):
         self.settings_mock.get_selected_model.return_value = "[OpenRouter] openai/gpt-oss-20b:free"
         client = AIClient()
@@ -325,7 +325,42 @@ class TestAIClient(unittest.TestCase):
         self.assertIn("settings/privacy", joined)
         self.assertIn("data policy", joined)
 
-    @patch('core.ai_client.requests.post')
+    @patch('core.ai_client.requests.Session.post')
+    def test_stream_request_body_is_compact_utf8_json(self, mock_post):
+        self.settings_mock.get_selected_model.return_value = "[OpenRouter] qwen/qwen3-coder:free"
+        client = AIClient()
+        response = MagicMock()
+        response.raise_for_status.return_value = None
+        response.iter_lines.return_value = [b'data: [DONE]']
+        ctx = MagicMock()
+        ctx.__enter__.return_value = response
+        ctx.__exit__.return_value = False
+        mock_post.return_value = ctx
+
+        with patch.object(client, '_openrouter_candidate_models', return_value=['qwen/qwen3-coder:free']):
+            list(client.stream_chat([{"role": "user", "content": "héllo ✓"}]))
+
+        body = mock_post.call_args.kwargs["data"]
+        self.assertNotIn("json", mock_post.call_args.kwargs)
+        self.assertIn('"content":"héllo ✓"'.encode("utf-8"), body)
+        self.assertNotIn(b'", "', body)
+
+    def test_encode_payload_prefers_orjson_and_falls_back_to_stdlib(self):
+        from core import ai_client_runtime
+
+        fast = MagicMock()
+        fast.dumps.return_value = b'{"fast":true}'
+        with patch.object(ai_client_runtime, '_orjson', fast):
+            self.assertEqual(ai_client_runtime._encode_payload({"a": 1}), b'{"fast":true}')
+
+        fast.dumps.side_effect = TypeError("Type is not JSON serializable")
+        with patch.object(ai_client_runtime, '_orjson', fast):
+            self.assertEqual(ai_client_runtime._encode_payload({"a": "é"}), '{"a":"é"}'.encode("utf-8"))
+
+        with patch.object(ai_client_runtime, '_orjson', None):
+            self.assertEqual(ai_client_runtime._encode_payload({"a": [1, 2]}), b'{"a":[1,2]}')
+
+    @patch('core.ai_client.requests.Session.post')
     def test_openrouter_falls_back_to_next_free_model(self, mock_post):
         self.settings_mock.get_selected_model.return_value = "[OpenRouter] qwen/qwen3-coder:free"
         client = AIClient()
@@ -364,7 +399,7 @@ class TestAIClient(unittest.TestCase):
         self.assertEqual(mock_post.call_count, 2)
         self.settings_mock.set_selected_model.assert_called_with("[OpenRouter] z-ai/glm-4.5-air:free")
 
-    @patch('core.ai_client.requests.post')
+    @patch('core.ai_client.requests.Session.post')
     def test_openrouter_reports_all_failed_fallback_attempts(self, mock_post):
         self.settings_mock.get_selected_model.return_value = "[OpenRouter] qwen/qwen3-coder:free"
         client = AIClient()
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 
 from core.code_parser import CodeParser
 
@@ -178,6 +179,28 @@ class TestCodeParser(unittest.TestCase):
 
         self.assertEqual(calls, [{"cmd": "list_files", "args": {"path": "."}}])
 
+    def test_self_closing_tags_inside_block_content_are_masked(self):
+        text = (
+            "<write_file path=\"a.md\">\n<git_status />\n</write_file>\n"
+            "<git_diff />\n"
+            "<write_file path=\"b.md\">\n<git_log />\n</write_file>"
+        )
+
+        calls = CodeParser.parse_tool_calls(text)
+
+        self.assertEqual([call["cmd"] for call in calls], ["write_file", "git_diff", "write_file"])
+        self.assertEqual([calls[0]["args"]["content"], calls[2]["args"]["content"]], ["<git_status />", "<git_log />"])
+
+    def test_plain_prose_skips_the_full_parser(self):
+        texts = [
+            "All done. The tests pass and [nothing] else needs changing.",
+            "Use a <div> wrapper here.",
+        ]
+        with patch.object(CodeParser, "_strip_non_executable_regions") as mock_strip:
+            for text in texts:
+                self.assertEqual(CodeParser.parse_tool_calls(text), [])
+        mock_strip.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
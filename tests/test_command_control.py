@@ -1,21 +1,30 @@
 
+import gc
+import json
 import os
 import sys
 import tempfile
+import threading
 import time
 import unittest
 from contextlib import contextmanager
 from unittest.mock import MagicMock, patch
 
-from PySide6.QtWidgets import QApplication, QMessageBox
+from PySide6.QtWidgets import QApplication, QMessageBox, QPushButton
 
 app = QApplication.instance() or QApplication(sys.argv)
 sys.path.append(os.getcwd())
 
 from ui.chat_panel import ChatPanel, ToolWorker
+from ui import chat_panel_io as panel_io
+from ui import chat_panel_runtime as panel_runtime
+from ui import project_file_index
+from ui.chat_workers import AIWorker, build_attachment_payload
+from ui.widgets.chat_items import MessageItem
 from core.settings import SettingsManager
 from core.ai_client import AIClient
 from core.agent_tools import get_project_root, set_project_root
+from core.prompts import SystemPrompts
 
 
 class TestCommandControl(unittest.TestCase):
@@ -30,6 +39,7 @@ class TestCommandControl(unittest.TestCase):
         panel.model_combo.clear()
         panel.model_combo.addItem("gpt-4", "[OpenAI] gpt-4")
         panel.model_combo.setCurrentIndex(0)
+        self._panels.append(panel)
         return panel
 
     @contextmanager
@@ -42,8 +52,17 @@ class TestCommandControl(unittest.TestCase):
             finally:
                 set_project_root(old_root)
 
+    def setUp(self):
+        self._panels = []
+
     def tearDown(self):
         AIClient.clear_test_provider()
+        for panel in self._panels:
+            panel._save_timer.stop()
+        self._panels = []
+        # Collect leaked panels here, on the GUI thread, rather than letting a
+        # later allocation (possibly inside a worker thread) tear down widgets.
+        gc.collect()
 
     def _wait_until(self, predicate, timeout=5.0):
         deadline = time.time() + timeout
@@ -55,6 +74,20 @@ class TestCommandControl(unittest.TestCase):
         app.processEvents()
         return predicate()
 
+    @staticmethod
+    def _listing_files(listing, root):
+        """files() for a root, letting a background prime or subtree scan land first."""
+        from PySide6.QtCore import QCoreApplication
+
+        project_file_index._prime_pool().submit(lambda: None).result()
+        QCoreApplication.sendPostedEvents(listing)
+        files = listing.files(root)
+        if files is None:
+            project_file_index._prime_pool().submit(lambda: None).result()
+            QCoreApplication.sendPostedEvents(listing)
+            files = listing.files(root)
+        return files
+
     def _wait_until_idle(self, panel: ChatPanel, timeout=8.0):
         return self._wait_until(
             lambda: (
@@ -103,6 +136,566 @@ class TestCommandControl(unittest.TestCase):
         self.assertIn("Output excerpt:", converted[0]["content"])
         self.assertEqual(converted[2]["content"], latest_tool)
 
+    def test_message_token_estimate_is_cached_until_content_changes(self):
+        panel = self._panel()
+        msg = {"role": "user", "content": "x" * 400}
+        panel.messages = [msg]
+
+        self.assertEqual(panel._message_token_estimate(msg), 100)
+        self.assertIn(id(msg), panel._token_est_cache)
+        msg["content"] = "y" * 40
+        self.assertEqual(panel._message_token_estimate(msg), 10)
+
+    def test_compact_assistant_display_hides_closed_code_fences_only(self):
+        panel = self._panel()
+        text = "Intro\n```python\na = 1\nb = 2\n```\nMiddle ```not a fence``` end\n```\nopen tail"
+
+        compact = panel._compact_assistant_display(text)
+
+        self.assertIn("```python\n[code block hidden: 3 lines]\n```", compact)
+        self.assertNotIn("a = 1", compact)
+        self.assertIn("Middle ```not a fence``` end", compact)
+        self.assertTrue(compact.endswith("```\nopen tail"))
+
+    def test_streaming_preview_matches_full_compaction_while_growing(self):
+        panel = self._panel()
+        panel._stream_preview_lines = (0, 0)
+        text = ""
+        for i in range(120):
+            text += f"line {i} " + ("word " * (i % 7)) + ("\r\n" if i % 5 else "\n")
+            self.assertEqual(
+                panel._streaming_preview(text),
+                panel._compact_for_display(text, max_chars=1200, max_lines=45),
+            )
+
+    def test_streamed_chunks_are_buffered_and_joined_on_read(self):
+        panel = self._panel()
+        panel.current_ai_response = "Hello"
+        for chunk in (", ", "world", "!"):
+            panel.handle_ai_chunk(chunk)
+        self.assertEqual(len(panel._ai_chunks), 4)
+
+        self.assertEqual(panel.current_ai_response, "Hello, world!")
+        self.assertEqual(panel._ai_chunks, ["Hello, world!"])
+
+        panel.current_ai_response = ""
+        self.assertEqual(panel._ai_chunks, [])
+        self.assertEqual(panel.current_ai_response, "")
+
+    def test_streamed_chunks_paint_immediately_after_idle_then_coalesce(self):
+        panel = self._panel()
+        panel.current_ai_item = MagicMock()
+        panel.current_ai_response = ""
+
+        panel.handle_ai_chunk("Hel")
+        panel.current_ai_item.set_text.assert_called_once_with("Hel")
+        self.assertFalse(panel._ai_update_timer.isActive())
+
+        panel.handle_ai_chunk("lo")
+        panel.handle_ai_chunk("!")
+        panel.current_ai_item.set_text.assert_called_once_with("Hel")
+        self.assertTrue(panel._ai_update_timer.isActive())
+
+        panel._ai_update_timer.stop()
+        panel._flush_ai_text()
+        panel.current_ai_item.set_text.assert_called_with("Hello!")
+
+    def test_scroll_to_bottom_schedules_one_deferred_scroll_per_turn(self):
+        panel = self._panel()
+        QApplication.processEvents()
+
+        with patch('ui.chat_panel_state.QTimer.singleShot') as mock_single_shot:
+            panel._scroll_to_bottom()
+            panel._scroll_to_bottom()
+            panel._on_scroll_range_changed(0, 100)
+        mock_single_shot.assert_called_once_with(0, panel._do_deferred_scroll)
+
+        panel._do_deferred_scroll()
+        with patch('ui.chat_panel_state.QTimer.singleShot') as mock_single_shot:
+            panel._scroll_to_bottom()
+        mock_single_shot.assert_called_once()
+
+    def test_rendered_chat_rows_are_pruned_oldest_first_but_keep_active_reply(self):
+        panel = self._panel()
+        panel.MAX_RENDERED_MESSAGES = 5
+        first = panel.append_message_widget("user", "first")
+        panel.current_ai_item = first
+        for i in range(7):
+            panel.append_message_widget("system", f"row {i}")
+
+        self.assertEqual(panel.chat_layout.count(), 8)
+        self.assertIs(panel._rendered_rows[0], first._chat_row)
+
+        panel.current_ai_item = None
+        panel.append_message_widget("system", "row 7")
+        self.assertEqual(panel.chat_layout.count(), 5)
+        self.assertEqual(len(panel._rendered_rows), 5)
+        self.assertEqual(panel.chat_layout.itemAt(0).widget(), panel._rendered_rows[0])
+
+    def test_rows_inserted_before_a_widget_keep_layout_order_for_pruning(self):
+        panel = self._panel()
+        panel.MAX_RENDERED_MESSAGES = 3
+        first = panel.append_message_widget("user", "first")
+        reply = panel.append_message_widget("assistant", "reply")
+        thought = MessageItem("system", "thinking")
+        panel._add_chat_widget(thought, before_widget=reply)
+
+        layout_rows = [panel.chat_layout.itemAt(i).widget() for i in range(panel.chat_layout.count())]
+        self.assertEqual(list(panel._rendered_rows), layout_rows)
+        self.assertEqual(layout_rows, [first._chat_row, thought._chat_row, reply._chat_row])
+
+        panel.append_message_widget("system", "next")
+        self.assertEqual(
+            [panel.chat_layout.itemAt(i).widget() for i in range(panel.chat_layout.count())],
+            [thought._chat_row, reply._chat_row, panel._rendered_rows[-1]],
+        )
+
+    def test_clear_chat_widgets_hands_rows_to_one_deferred_container(self):
+        import shiboken6
+        from PySide6.QtCore import QCoreApplication, QEvent
+
+        panel = self._panel()
+        rows = [panel.append_message_widget("system", f"row {i}")._chat_row for i in range(3)]
+
+        panel._clear_chat_widgets()
+
+        self.assertEqual(panel.chat_layout.count(), 0)
+        self.assertEqual(len(panel._rendered_rows), 0)
+        graveyard = rows[0].parentWidget()
+        self.assertTrue(all(row.parentWidget() is graveyard for row in rows))
+        self.assertTrue(graveyard.isHidden())
+
+        QCoreApplication.sendPostedEvents(graveyard, QEvent.DeferredDelete)
+        self.assertFalse(any(shiboken6.isValid(row) for row in rows))
+
+    def test_resolve_at_mentions_uses_the_live_project_listing(self):
+        with self._blank_project() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "pkg", "sub"))
+            os.makedirs(os.path.join(tmpdir, ".hidden"))
+            for rel in ("pkg/sub/util.py", "pkg/app.py", ".hidden/secret.py"):
+                with open(os.path.join(tmpdir, rel), "w", encoding="utf-8") as f:
+                    f.write("x = 1\n")
+            panel = self._panel(project_root=tmpdir)
+            self._listing_files(panel._file_listing, tmpdir)
+
+            _, resolved = panel._resolve_at_mentions("See @util.py and @pkg/app.py and @secret.py")
+            self.assertEqual(
+                [os.path.relpath(p, tmpdir).replace("\\", "/") for p in resolved],
+                ["pkg/sub/util.py", "pkg/app.py"],
+            )
+            index = panel._mention_index_cache[2]
+            _, again = panel._resolve_at_mentions("@sub/util.py")
+            self.assertIs(panel._mention_index_cache[2], index)
+            self.assertEqual(len(again), 1)
+
+            new_file = os.path.join(tmpdir, "pkg", "sub", "fresh.py")
+            with open(new_file, "w", encoding="utf-8") as f:
+                f.write("x = 1\n")
+            panel.file_updated.emit(new_file)
+            _, fresh = panel._resolve_at_mentions("@fresh.py")
+            self.assertEqual([os.path.normpath(p) for p in fresh], [os.path.normpath(new_file)])
+
+    def test_read_text_attachment_keeps_head_and_tail_of_large_files(self):
+        from ui.chat_workers import _read_text_attachment
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            small = os.path.join(tmpdir, "small.txt")
+            with open(small, "w", encoding="utf-8", newline="") as f:
+                f.write("a\r\nb\n")
+            self.assertEqual(_read_text_attachment(small, max_attach=100), "a\nb\n")
+            with open(small, "wb") as f:
+                f.write(b"caf\xc3\xa9 \xff\rend")
+            self.assertEqual(_read_text_attachment(small, max_attach=100), "café \ufffd\nend")
+
+            big = os.path.join(tmpdir, "big.log")
+            with open(big, "w", encoding="utf-8") as f:
+                f.write("H" * 500 + "M" * 1000 + "T" * 500)
+            content = _read_text_attachment(big, max_attach=100)
+            self.assertEqual(
+                content,
+                "H" * 80 + "\n\n... [1900 bytes truncated] ...\n\n" + "T" * 20,
+            )
+
+            lines = os.path.join(tmpdir, "lines.log")
+            with open(lines, "w", encoding="utf-8", newline="") as f:
+                f.write("".join(f"row {i:03d} é\r\n" for i in range(100)))
+            content = _read_text_attachment(lines, max_attach=100)
+            head, _, tail = content.partition("\n\n... [")
+            self.assertEqual(head, "\n".join(f"row {i:03d} é" for i in range(6)))
+            self.assertEqual(tail.split("\n\n", 1)[1], "row 099 é\n")
+
+    def test_ai_worker_builds_attachment_payload_off_the_gui_thread(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            notes = os.path.join(tmpdir, "notes.txt")
+            with open(notes, "w", encoding="utf-8") as f:
+                f.write("remember the milk")
+            history = [{"role": "system", "content": "sys"}, {"role": "user", "content": "Read this"}]
+            worker = AIWorker(history, "OpenAI: gpt-test", attachments=[notes])
+            enriched = []
+            worker.history_enriched.connect(lambda *args: enriched.append(args))
+
+            worker._load_attachments()
+
+        expected = "Read this\n\n[FILE: notes.txt]\nremember the milk\n[/FILE]"
+        self.assertEqual(history[-1], {"role": "user", "content": expected})
+        self.assertEqual(enriched, [("Read this", expected, expected)])
+
+        panel = self._panel()
+        panel.messages = [{"role": "user", "content": "Read this"}]
+        panel._pending_attachment_msg = panel.messages[0]
+        panel._apply_attachment_payload("Read this", expected, expected)
+        self.assertEqual(panel.messages[0], {"role": "user", "content": expected, "payload_content": expected})
+
+    def test_ai_worker_copies_only_system_prompts_with_cwd_placeholder(self):
+        history = [
+            {"role": "system", "content": "Work in {cwd_path}."},
+            {"role": "system", "content": "Plain rules."},
+            {"role": "user", "content": "hi"},
+        ]
+        worker = AIWorker(history, "OpenAI: gpt-test", project_files=[])
+
+        with patch('ui.chat_workers.AIClient') as MockClient:
+            MockClient.return_value.stream_chat.return_value = iter([])
+            worker.run()
+
+        sent = MockClient.return_value.stream_chat.call_args.args[0]
+        cwd = get_project_root().replace("\\", "/")
+        self.assertEqual(sent[1], {"role": "system", "content": f"Work in {cwd}."})
+        self.assertIs(sent[2], history[1])
+        self.assertIs(sent[3], history[2])
+        self.assertEqual(history[0]["content"], "Work in {cwd_path}.")
+
+    def test_ai_worker_counts_usage_itself_only_when_provider_reports_none(self):
+        import types
+        from ui import chat_workers
+
+        def run_worker(model, chunks):
+            worker = AIWorker([{"role": "user", "content": "12345678"}], model, project_files=[])
+            usage = []
+            worker.usage_received.connect(usage.append)
+            with patch('ui.chat_workers.AIClient') as MockClient:
+                MockClient.return_value.stream_chat.return_value = iter(chunks)
+                worker.run()
+            return worker, usage
+
+        def load_encoding(model):
+            chat_workers._tiktoken_encoding(model)
+            chat_workers._tiktoken_pool().submit(lambda: None).result()
+
+        chat_workers._tiktoken_encodings.clear()
+        requested = []
+        encoding = MagicMock()
+        encoding.encode.side_effect = lambda text, **kwargs: text.split()
+        fake_tiktoken = types.SimpleNamespace(encoding_for_model=lambda name: requested.append(name) or encoding)
+        try:
+            with patch.dict(sys.modules, {"tiktoken": None}):
+                load_encoding("[OpenAI] gpt-4o")
+                _, usage = run_worker("[OpenAI] gpt-4o", ["abcd" * 3])
+            self.assertEqual(usage[0]["completion_tokens"], 3)
+
+            release = threading.Event()
+            slow_tiktoken = types.SimpleNamespace(encoding_for_model=lambda name: release.wait(5) and encoding)
+            with patch.dict(sys.modules, {"tiktoken": slow_tiktoken}):
+                _, usage = run_worker("[OpenAI] gpt-4o-mini", ["abcd" * 3])
+                self.assertEqual(usage[0]["completion_tokens"], 3)  # chars fallback while loading
+                release.set()
+                chat_workers._tiktoken_pool().submit(lambda: None).result()
+
+            with patch.dict(sys.modules, {"tiktoken": fake_tiktoken}):
+                load_encoding("[OpenRouter] openai/gpt-4o")
+                worker, usage = run_worker("[OpenRouter] openai/gpt-4o", ["two words"])
+                self.assertEqual(usage[0]["completion_tokens"], 2)
+                self.assertEqual(requested, ["gpt-4o"])
+
+                reported = {"prompt_tokens": 7, "completion_tokens": 1, "total_tokens": 8}
+                _, usage = run_worker("[OpenRouter] openai/gpt-4o", [{"usage": reported}, "ok"])
+            self.assertEqual(usage, [reported])
+        finally:
+            chat_workers._tiktoken_encodings.clear()
+
+    def test_usage_count_skips_image_data_urls(self):
+        from ui import chat_workers
+
+        encoded = []
+        encoding = MagicMock()
+        encoding.encode.side_effect = lambda text, **kwargs: encoded.append(text) or text.split()
+        content = [
+            {"type": "text", "text": "describe this image"},
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64," + "A" * 100000}},
+        ]
+        with patch('ui.chat_workers._tiktoken_encoding', return_value=encoding):
+            tokens = chat_workers._count_content_tokens(content, "[OpenAI] gpt-4o")
+            self.assertEqual(chat_workers._count_content_tokens("two words", "[OpenAI] gpt-4o"), 2)
+
+        self.assertEqual(tokens, 3 + chat_workers.IMAGE_TOKENS)
+        self.assertEqual(encoded, ["describe this image", "two words"])
+
+    def test_build_attachment_payload_skips_missing_files_with_one_stat_each(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            notes = os.path.join(tmpdir, "notes.md")
+            with open(notes, "w", encoding="utf-8") as f:
+                f.write("# Notes")
+            missing = os.path.join(tmpdir, "gone.png")
+
+            with patch('ui.chat_workers.os.stat', wraps=os.stat) as mock_stat:
+                text_body, payload = build_attachment_payload("Look", [missing, notes])
+
+        self.assertEqual(mock_stat.call_count, 2)
+        self.assertEqual(text_body, "Look\n\n[FILE: notes.md]\n# Notes\n[/FILE]")
+        self.assertEqual(payload, text_body)
+
+    def test_scan_project_files_matches_sorted_pruned_walk_order(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for rel in ("main.py", "pkg/a.py", "pkg/sub/b.py", "pkg/0.py", "docs/readme.md",
+                        "node_modules/dep/index.js", ".git/HEAD", "pkg/__pycache__/a.pyc",
+                        "pkg/native.SO", ".pytest_cache/v/cache"):
+                path = os.path.join(tmpdir, *rel.split("/"))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write("x")
+
+            expected = []
+            for root, dirs, filenames in os.walk(tmpdir):
+                dirs[:] = sorted(d for d in dirs if d not in project_file_index.PROJECT_STRUCTURE_SKIP_DIRS)
+                expected.extend(os.path.relpath(os.path.join(root, f), tmpdir) for f in sorted(filenames)
+                                if not f.lower().endswith(project_file_index.PROJECT_STRUCTURE_SKIP_EXTS))
+
+            files = project_file_index._scan_project_files(tmpdir)
+            listing = project_file_index.ProjectFileIndex()
+            indexed = self._listing_files(listing, tmpdir)
+
+        self.assertEqual(files, expected)
+        self.assertEqual(indexed, expected)
+        self.assertEqual(len(files), 5)
+
+    def test_project_file_index_rescans_only_changed_directories(self):
+        panel = ChatPanel()
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                os.makedirs(os.path.join(tmpdir, "pkg"))
+                with open(os.path.join(tmpdir, "main.py"), "w", encoding="utf-8") as f:
+                    f.write("x")
+                listing = panel._file_listing
+                first = self._listing_files(listing, tmpdir)
+                self.assertEqual(first, ["main.py"])
+
+                new_file = os.path.join(tmpdir, "pkg", "util.py")
+                with open(new_file, "w", encoding="utf-8") as f:
+                    f.write("x")
+                with patch.object(project_file_index, '_scan_directory', wraps=project_file_index._scan_directory) as mock_scan:
+                    panel.file_updated.emit(new_file)
+                    second = listing.files(tmpdir)
+                    os.remove(os.path.join(tmpdir, "main.py"))
+                    listing.refresh_directory(tmpdir)
+                    third = listing.files(tmpdir)
+
+                self.assertEqual(mock_scan.call_count, 2)
+                self.assertEqual(first, ["main.py"])
+                self.assertEqual(second, ["main.py", os.path.join("pkg", "util.py")])
+                self.assertEqual(third, [os.path.join("pkg", "util.py")])
+        finally:
+            panel.close()
+
+    def test_project_file_index_primes_off_the_gui_thread(self):
+        import threading
+        from PySide6.QtCore import QCoreApplication
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "pkg"))
+            for rel in ("main.py", os.path.join("pkg", "util.py")):
+                with open(os.path.join(tmpdir, rel), "w", encoding="utf-8") as f:
+                    f.write("x")
+            listing = project_file_index.ProjectFileIndex()
+            scan_threads = []
+            real_scan = project_file_index._scan_directory
+
+            def tracking_scan(path):
+                scan_threads.append(threading.current_thread())
+                return real_scan(path)
+
+            with patch.object(project_file_index, '_scan_directory', side_effect=tracking_scan):
+                listing.prime(tmpdir)
+                self.assertIsNone(listing.files(tmpdir))
+                project_file_index._prime_pool().submit(lambda: None).result()
+                QCoreApplication.sendPostedEvents(listing)
+                files = listing.files(tmpdir)
+
+        self.assertEqual(files, ["main.py", os.path.join("pkg", "util.py")])
+        self.assertEqual(len(scan_threads), 2)
+        self.assertNotIn(threading.main_thread(), scan_threads)
+
+    def test_project_file_index_scans_unprimed_roots_and_new_subtrees_in_background(self):
+        import threading
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = os.path.normpath(tmpdir)
+            with open(os.path.join(tmpdir, "main.py"), "w", encoding="utf-8") as f:
+                f.write("x")
+            listing = project_file_index.ProjectFileIndex()
+            scan_threads = []
+            real_scan = project_file_index._scan_directory
+
+            def tracking_scan(path):
+                scan_threads.append((path, threading.current_thread()))
+                return real_scan(path)
+
+            with patch.object(project_file_index, '_scan_directory', side_effect=tracking_scan):
+                self.assertIsNone(listing.files(tmpdir))
+                self.assertEqual(self._listing_files(listing, tmpdir), ["main.py"])
+
+                os.makedirs(os.path.join(tmpdir, "pkg", "sub"))
+                with open(os.path.join(tmpdir, "pkg", "sub", "util.py"), "w", encoding="utf-8") as f:
+                    f.write("x")
+                listing.refresh_directory(tmpdir)
+                files = self._listing_files(listing, tmpdir)
+
+        self.assertEqual(files, ["main.py", os.path.join("pkg", "sub", "util.py")])
+        gui_scans = [path for path, thread in scan_threads if thread is threading.main_thread()]
+        self.assertEqual(gui_scans, [tmpdir])
+
+    def test_project_file_index_caps_watched_directories_shallowest_first(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = os.path.normpath(tmpdir)
+            for rel in ("a/deep/deeper", "b", "c"):
+                os.makedirs(os.path.join(tmpdir, *rel.split("/")))
+            listing = project_file_index.ProjectFileIndex()
+            with patch.object(project_file_index, 'MAX_WATCHED_DIRS', 4):
+                self._listing_files(listing, tmpdir)
+
+            self.assertEqual(
+                sorted(os.path.relpath(d, tmpdir) for d in listing._watched),
+                sorted([".", "a", "b", "c"]),
+            )
+            self.assertTrue(listing._unwatched)
+            listing._scanned_at -= project_file_index.UNWATCHED_RESCAN_SECONDS
+            with patch.object(project_file_index, '_prime_pool') as mock_pool:
+                self.assertEqual(listing.files(tmpdir), [])
+            mock_pool.return_value.submit.assert_called_once()
+
+    def test_build_attachment_payload_maps_image_extensions_to_mime_types(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name in ("a.JPG", "b.jpeg", "c.webp"):
+                paths.append(os.path.join(tmpdir, name))
+                with open(paths[-1], "wb") as f:
+                    f.write(b"img")
+
+            _, payload = build_attachment_payload("Images", paths)
+            _, image_only = build_attachment_payload("", paths[:1])
+
+        self.assertEqual(payload[0], {"type": "text", "text": "Images"})
+        urls = [part["image_url"]["url"] for part in payload[1:]]
+        self.assertEqual(
+            [url.split(";", 1)[0] for url in urls],
+            ["data:image/jpeg", "data:image/jpeg", "data:image/webp"],
+        )
+        self.assertEqual([part["type"] for part in image_only], ["image_url"])
+
+    def test_attachment_add_and_remove_skip_duplicates_and_unknown_paths(self):
+        panel = self._panel()
+        a_path = os.path.join("docs", "a.txt")
+        b_path = os.path.join("src", "b.py")
+
+        with patch.object(panel, '_refresh_attachments_ui') as mock_refresh:
+            panel.add_attachment(a_path)
+            panel.add_attachment(b_path)
+            panel.add_attachment(a_path)
+            panel.remove_attachment("missing.txt")
+            panel.remove_attachment(a_path)
+            panel.add_attachment(a_path)
+
+        self.assertEqual(panel.attachments, [b_path, a_path])
+        self.assertEqual(panel._attachment_names, {a_path: "a.txt", b_path: "b.py"})
+        self.assertEqual(mock_refresh.call_count, 4)
+
+    def test_attachment_chips_are_updated_incrementally(self):
+        panel = self._panel()
+
+        panel.add_attachment("a.txt")
+        panel.add_attachment("b.txt")
+        chip_a = panel._attachment_chips["a.txt"]
+        panel.add_attachment("c.txt")
+        self.assertIs(panel._attachment_chips["a.txt"], chip_a)
+        self.assertEqual(chip_a.objectName(), "attachmentChip")
+        self.assertEqual(chip_a.styleSheet(), "")
+
+        panel._attachment_chips["a.txt"].findChild(QPushButton).click()
+        self.assertEqual(panel.attachments, ["b.txt", "c.txt"])
+        layout = panel.attachment_layout
+        chips = [layout.itemAt(i).widget() for i in range(layout.count() - 1)]
+        self.assertEqual(chips, [panel._attachment_chips["b.txt"], panel._attachment_chips["c.txt"]])
+        self.assertIsNotNone(layout.itemAt(layout.count() - 1).spacerItem())
+        self.assertFalse(panel.attachment_area.isHidden())
+
+        panel.remove_attachment("b.txt")
+        panel.remove_attachment("c.txt")
+        self.assertEqual(panel._attachment_chips, {})
+        self.assertEqual(layout.count(), 1)
+        self.assertTrue(panel.attachment_area.isHidden())
+
+    def test_attachment_payload_reuses_image_encoding_until_file_changes(self):
+        from ui import chat_workers
+
+        chat_workers._cached_image_data_url.cache_clear()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "shot.png")
+            with open(path, "wb") as f:
+                f.write(b"first")
+            with patch('ui.chat_workers._image_data_url', wraps=chat_workers._image_data_url) as mock_encode:
+                _, first = chat_workers.build_attachment_payload("look", [path])
+                _, again = chat_workers.build_attachment_payload("again", [path])
+                self.assertEqual(mock_encode.call_count, 1)
+                self.assertEqual(first[1], again[1])
+
+                with open(path, "wb") as f:
+                    f.write(b"second!")
+                _, changed = chat_workers.build_attachment_payload("changed", [path])
+                self.assertEqual(mock_encode.call_count, 2)
+                self.assertNotEqual(changed[1], first[1])
+
+                with patch('ui.chat_workers.IMAGE_CACHE_MAX_BYTES', 0):
+                    chat_workers.build_attachment_payload("big", [path])
+                self.assertEqual(mock_encode.call_count, 3)
+        chat_workers._cached_image_data_url.cache_clear()
+
+    def test_image_data_url_matches_single_shot_base64(self):
+        import base64
+        from ui.chat_workers import _IMAGE_READ_CHUNK, _image_data_url
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "shot.png")
+            raw = os.urandom(_IMAGE_READ_CHUNK * 2 + 7)
+            with open(path, "wb") as f:
+                f.write(raw)
+            self.assertEqual(
+                _image_data_url(path, "image/png"),
+                "data:image/png;base64," + base64.b64encode(raw).decode("ascii"),
+            )
+            # A stale size (file grew or shrank after the stat) still yields the full encoding.
+            for stale in (0, len(raw) + 100):
+                self.assertEqual(
+                    _image_data_url(path, "image/png", size=stale),
+                    "data:image/png;base64," + base64.b64encode(raw).decode("ascii"),
+                )
+
+    def test_messages_for_ai_reuses_compacted_older_tool_results(self):
+        panel = self._panel()
+        older = f"[TOOL_RESULT]\n{'old line\n' * 40}unique {time.time()}\n[/TOOL_RESULT]"
+        latest = "[TOOL_RESULT]\nnew\n[/TOOL_RESULT]"
+        history = [
+            {"role": "system", "content": older},
+            {"role": "system", "content": latest},
+        ]
+
+        with patch('ui.chat_panel_ui.SummaryGuard.parse_action_summary', return_value={}) as mock_parse:
+            first = panel._messages_for_ai(history)
+            second = panel._messages_for_ai(history + [{"role": "system", "content": "[TOOL_RESULT]\nnewer\n[/TOOL_RESULT]"}])
+
+        self.assertEqual(mock_parse.call_count, 2)  # older once, then the previous latest once
+        self.assertIn("compact replay", first[0]["content"])
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[1]["content"], latest)
+
     def test_messages_for_ai_leaves_single_tool_result_uncompacted(self):
         panel = self._panel()
         only_tool = "[TOOL_RESULT]\n[ACTION_SUMMARY]\nSuccessful file changes:\n- app.py\n[/ACTION_SUMMARY]\nEdited app.py\n[/TOOL_RESULT]"
@@ -113,6 +706,58 @@ class TestCommandControl(unittest.TestCase):
 
         self.assertEqual(converted[0]["content"], only_tool)
 
+    @patch('ui.chat_panel.AIWorker')
+    @patch('ui.chat_panel.QThread')
+    def test_start_ai_worker_only_tags_the_newest_user_turn(self, MockThread, MockWorker):
+        panel = self._panel()
+        older = {"role": "user", "content": "retry"}
+        newest = {"role": "user", "content": "Fix the parser"}
+        panel.messages = [older, {"role": "assistant", "content": "ok"}, newest]
+        panel._last_user_idx = 2
+
+        panel._start_ai_worker("Fix the parser")
+        self.assertEqual(newest.get("payload_content"), "Fix the parser")
+        sent = MockWorker.call_args.args[0]
+        self.assertEqual(sum(1 for m in sent if m.get("content") == "Fix the parser"), 1)
+
+        panel._start_ai_worker("retry")
+        self.assertNotIn("payload_content", older)
+
+    @patch('ui.chat_panel.AIWorker')
+    @patch('ui.chat_panel.QThread')
+    def test_start_ai_worker_finds_turn_dropped_by_token_cutoff(self, MockThread, MockWorker):
+        panel = self._panel()
+        text = "Summarise this long brief " + "word " * 400
+        panel.messages = [{"role": "user", "content": text}]
+        panel._last_user_idx = 0
+
+        with patch.object(panel.settings_manager, 'get_max_history_tokens', return_value=10):
+            panel._start_ai_worker(text, ["notes.md"])
+
+        self.assertIs(panel._pending_attachment_msg, panel.messages[0])
+        panel._apply_attachment_payload(text, text + "[FILE]", text + "[FILE]")
+        self.assertEqual(panel.messages[0]["payload_content"], text + "[FILE]")
+
+    @patch('ui.chat_panel.AIWorker')
+    @patch('ui.chat_panel.QThread')
+    def test_start_ai_worker_keeps_a_stable_prompt_prefix_across_turns(self, MockThread, MockWorker):
+        panel = self._panel()
+        panel.mode_combo.setCurrentText("Phased")
+        panel._editor_context_getter = lambda: {"file": "app.py", "line": 3, "total_lines": 10, "snippet": "x = 1"}
+        panel.messages = [{"role": "user", "content": "Inspect app.py"}]
+
+        panel._start_ai_worker("Inspect app.py")
+        user_turn = MockWorker.call_args.args[0]
+        panel.messages.append({"role": "assistant", "content": "<read_file path=\"app.py\" />"})
+        panel.messages.append({"role": "system", "content": "[TOOL_RESULT]\nx = 1\n[/TOOL_RESULT]"})
+        panel._start_ai_worker()
+        loop_turn = MockWorker.call_args.args[0]
+
+        self.assertEqual(user_turn[:2], loop_turn[:2])
+        self.assertEqual(user_turn[1]["content"], SystemPrompts.PHASED_MODE)
+        self.assertTrue(user_turn[-2]["content"].startswith("[EDITOR] app.py:3"))
+        self.assertEqual(user_turn[-1], {"role": "user", "content": "Inspect app.py"})
+
     @patch('ui.chat_panel.AIWorker')
     @patch('ui.chat_panel.QThread')
     def test_mode_prompts_match_new_loop_controls(self, MockThread, MockWorker):
@@ -520,6 +1165,7 @@ class TestCommandControl(unittest.TestCase):
             panel._pending_summary_guard_flags = {"no_post_edit_validation", "no_post_edit_rescan"}
             panel._refresh_guided_task_board()
             panel.save_conversation()
+            panel.flush_conversation_save()
             conv_id = panel.conversation_id
 
             restored = self._panel(project_root=tmpdir)
@@ -545,6 +1191,7 @@ class TestCommandControl(unittest.TestCase):
 
             with patch.object(panel.rag_client, 'ingest_message'):
                 panel.handle_ai_finished()
+            panel.flush_conversation_save()
             conv_id = panel.conversation_id
 
             restored = self._panel(project_root=tmpdir)
@@ -580,6 +1227,7 @@ class TestCommandControl(unittest.TestCase):
 
             with patch.object(panel.rag_client, 'ingest_message'):
                 panel.handle_ai_finished()
+            panel.flush_conversation_save()
             conv_id = panel.conversation_id
 
             restored = self._panel(project_root=tmpdir)
@@ -591,6 +1239,125 @@ class TestCommandControl(unittest.TestCase):
             self.assertIn("reply 'continue'", restored._guided_phase_anchor)
             self.assertEqual(restored._pending_phased_tools, [])
 
+    def test_save_conversation_is_debounced_until_flushed(self):
+        with self._blank_project() as tmpdir:
+            panel = self._panel(project_root=tmpdir)
+            panel.settings_manager.get_auto_save_conversation = MagicMock(return_value=True)
+            panel.messages = [{"role": "user", "content": "Coalesce these saves."}]
+
+            with patch('ui.chat_panel_io.json.dumps', wraps=json.dumps) as mock_dump:
+                panel.save_conversation()
+                panel.save_conversation()
+                self.assertTrue(panel._save_timer.isActive())
+                self.assertFalse(os.path.exists(panel._conversation_file()))
+
+                panel.flush_conversation_save()
+                panel.flush_conversation_save()
+
+            self.assertFalse(panel._save_timer.isActive())
+            self.assertTrue(os.path.exists(panel._conversation_file()))
+            self.assertEqual(mock_dump.call_count, 2)  # conversation file + sidebar sidecar
+
+    def test_debounced_save_writes_on_background_thread_and_flush_waits(self):
+        import threading
+
+        with self._blank_project() as tmpdir:
+            panel = self._panel(project_root=tmpdir)
+            panel.settings_manager.get_auto_save_conversation = MagicMock(return_value=True)
+            panel.messages = [{"role": "user", "content": "Save me off the GUI thread."}]
+            writer_threads = []
+            real_write = panel_io._write_conversation_files
+
+            def recording_write(*args):
+                writer_threads.append(threading.current_thread())
+                real_write(*args)
+
+            with patch('ui.chat_panel_io._write_conversation_files', side_effect=recording_write):
+                panel.save_conversation()
+                panel._save_timer.timeout.emit()
+                panel.flush_conversation_save()
+
+            self.assertIsNone(panel._save_future)
+            self.assertEqual(len(writer_threads), 1)
+            self.assertIsNot(writer_threads[0], threading.main_thread())
+            with open(panel._conversation_file(), encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["messages"], panel.messages)
+
+    def test_rag_ingest_runs_off_the_gui_thread_and_survives_errors(self):
+        import threading
+
+        panel = self._panel()
+        panel.settings_manager.get_rag_enabled = MagicMock(return_value=True)
+        calls = []
+
+        def fake_ingest(role, text, conv_id):
+            calls.append((role, text, conv_id, threading.current_thread()))
+            raise RuntimeError("vector engine offline")
+
+        gate = threading.Event()
+        with patch.object(panel.rag_client, 'ingest_message', side_effect=fake_ingest):
+            panel_runtime._rag_ingest_pool().submit(gate.wait, 5)
+            # Both are queued before the first one fails; the failure still pauses the second.
+            panel._ingest_rag_message("assistant", "Stored for later.")
+            panel._ingest_rag_message("user", "Queued behind the failure.")
+            gate.set()
+            panel_runtime._rag_ingest_pool().submit(lambda: None).result()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][:3], ("assistant", "Stored for later.", panel.conversation_id))
+        self.assertIsNot(calls[0][3], threading.main_thread())
+        self.assertTrue(panel._rag_ingest_backoff.paused())
+
+        with patch.object(panel.rag_client, 'ingest_message', side_effect=fake_ingest), \
+             patch.object(panel_runtime, '_rag_ingest_pool') as mock_pool:
+            panel._ingest_rag_message("user", "Paused after the failure.")
+
+            panel._rag_ingest_backoff.paused_until = 0.0
+            panel.settings_manager.get_rag_enabled.return_value = False
+            panel._ingest_rag_message("user", "Skipped.")
+        mock_pool.assert_not_called()
+
+    def test_list_conversations_reuses_cached_metadata_until_file_changes(self):
+        with self._blank_project() as tmpdir:
+            panel = self._panel(project_root=tmpdir)
+            panel.settings_manager.get_auto_save_conversation = MagicMock(return_value=True)
+            panel.messages = [{"role": "user", "content": "List me in the sidebar."}]
+            panel.save_conversation()
+            panel.flush_conversation_save()
+
+            first = panel.list_conversations()
+            with patch('ui.chat_panel_io.json.load') as mock_load:
+                second = panel.list_conversations()
+            mock_load.assert_not_called()
+            self.assertEqual(first, second)
+            self.assertEqual(second[0]["title"], "List me in the sidebar.")
+
+            os.remove(panel._conversation_file())
+            self.assertEqual(panel.list_conversations(), [])
+            self.assertEqual(panel._conv_meta_cache, {})
+
+    def test_list_conversations_reads_sidecar_and_falls_back_for_legacy_files(self):
+        with self._blank_project() as tmpdir:
+            panel = self._panel(project_root=tmpdir)
+            panel.settings_manager.get_auto_save_conversation = MagicMock(return_value=True)
+            panel.messages = [
+                {"role": "user", "content": "Sidecar listing."},
+                {"role": "assistant", "content": "x" * 5000},
+            ]
+            panel.save_conversation()
+            panel.flush_conversation_save()
+            self.assertTrue(os.path.exists(panel._conversation_meta_file()))
+
+            legacy_path = os.path.join(panel._history_dir(), "legacy01.json")
+            with open(legacy_path, "w", encoding="utf-8") as f:
+                json.dump({"conversation_id": "legacy01", "title": "Old", "updated_at": "2000-01-01",
+                           "messages": [{"role": "user", "content": "Old"}]}, f)
+
+            convos = {c["id"]: c for c in panel.list_conversations()}
+            self.assertEqual(set(convos), {panel.conversation_id, "legacy01"})
+            self.assertEqual(convos[panel.conversation_id]["msg_count"], 2)
+            self.assertEqual(convos["legacy01"]["title"], "Old")
+
     def test_project_tracker_state_persists_session_changes(self):
         with self._blank_project() as tmpdir:
             panel = self._panel(project_root=tmpdir)
@@ -602,6 +1369,7 @@ class TestCommandControl(unittest.TestCase):
             panel._refresh_guided_task_board()
             panel._record_session_change(file_path, "@@\n- old line\n+ new line")
             panel.save_conversation()
+            panel.flush_conversation_save()
             conv_id = panel.conversation_id
 
             restored = self._panel(project_root=tmpdir)
@@ -630,11 +1398,14 @@ class TestCommandControl(unittest.TestCase):
                 panel.input_field.setPlainText('Inspect this image')
                 panel.send_message()
 
+            self.assertEqual(MockWorker.call_args.kwargs.get('attachments'), [image_path])
             first_history = MockWorker.call_args.args[0]
             first_user = next(m for m in reversed(first_history) if m['role'] == 'user')
-            self.assertIsInstance(first_user['content'], list)
-            self.assertEqual(first_user['content'][0]['type'], 'text')
-            self.assertEqual(first_user['content'][1]['type'], 'image_url')
+            text_body, payload = build_attachment_payload(first_user['content'], [image_path])
+            self.assertIsInstance(payload, list)
+            self.assertEqual(payload[0]['type'], 'text')
+            self.assertEqual(payload[1]['type'], 'image_url')
+            panel._apply_attachment_payload(first_user['content'], text_body, payload)
 
             MockWorker.reset_mock()
             panel.is_processing = False
@@ -668,6 +1439,28 @@ class TestCommandControl(unittest.TestCase):
         mock_tools.assert_not_called()
         self.assertEqual(panel.messages, [])
 
+    def test_finished_response_moves_thought_blocks_into_progress_item(self):
+        panel = self._panel()
+        panel.current_ai_item = panel.append_message_widget("assistant", "")
+        panel.current_ai_response = "<thought>plan A</thought>\n  Answer <thought> </thought><thought>plan B</thought> done"
+        panel._stop_requested = True
+
+        with patch('ui.chat_panel.ProgressItem') as MockProgress, \
+             patch.object(panel, '_add_chat_widget') as mock_add:
+            panel.handle_ai_finished()
+            mock_add.assert_not_called()
+            QApplication.processEvents()
+
+        MockProgress.return_value.set_thought.assert_called_once_with("plan A\n---\nplan B")
+        mock_add.assert_called_once_with(MockProgress.return_value, before_widget=panel.current_ai_item)
+        MockProgress.return_value.finish.assert_called_once_with()
+        self.assertEqual(panel.current_ai_response, "Answer done")
+
+        panel.current_ai_response = "<thought>   </thought>Just the answer"
+        with patch('ui.chat_panel.ProgressItem') as MockProgress:
+            panel.handle_ai_finished()
+        MockProgress.assert_not_called()
+
     def test_stopped_blank_response_does_not_turn_into_blank_fallback(self):
         panel = self._panel()
         panel.mode_combo.setCurrentText("Phased")
@@ -757,7 +1550,16 @@ class TestCommandControl(unittest.TestCase):
             panel.handle_tool_finished("[Interrupted] Tool execution stopped by user.")
 
         mock_restart.assert_not_called()
-        mock_append.assert_called_once()
+        mock_append.assert_called_once_with(
+            "system",
+            "[TOOL_RESULT] (Automated system output — compact view)\n"
+            "Tools used: list_files\n"
+            "Actions taken:\n"
+            "- Listed -> Done\n\n"
+            "Output excerpt:\n"
+            "[Interrupted] Tool execution stopped by user.\n"
+            "[/TOOL_RESULT]",
+        )
         self.assertEqual(panel.messages[-1]["role"], "system")
         self.assertIn("[TOOL_RESULT]", panel.messages[-1]["content"])
 
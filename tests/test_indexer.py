@@ -31,10 +31,10 @@ class TestIndexer(unittest.TestCase):
         fake_indexer = MagicMock()
         fake_indexer.index_project.return_value = True
 
-        with patch('core.indexer.ProjectIndexer', return_value=fake_indexer):
+        with patch('core.indexer.ProjectIndexer', return_value=fake_indexer) as mock_indexer_cls, \
+             patch('ui.chat_workers.QThread.currentThread', return_value=SimpleNamespace(isInterruptionRequested=lambda: True)):
             worker = IndexingWorker('.')
-
-        with patch('ui.chat_workers.QThread.currentThread', return_value=SimpleNamespace(isInterruptionRequested=lambda: True)):
+            mock_indexer_cls.assert_not_called()
             worker.run()
             kwargs = fake_indexer.index_project.call_args.kwargs
             self.assertIn('cancel_callback', kwargs)
@@ -16,6 +16,7 @@ from core.agent_tools import get_project_root, set_project_root
 from core.rag_client import RAGClient, RetrievedChunk
 from core.settings import SettingsManager
 from ui.chat_panel import ChatPanel
+from ui import chat_panel_runtime as panel_runtime
 
 
 class TestRAGAgentFlow(unittest.TestCase):
@@ -61,6 +62,7 @@ class TestRAGAgentFlow(unittest.TestCase):
                  patch.object(panel, '_start_ai_worker') as mock_start, \
                  patch.object(panel, 'save_conversation'):
                 panel.send_worker('Run an offline retrieval validation of this project.')
+                panel_runtime._rag_ingest_pool().submit(lambda: None).result()
 
             mock_ingest.assert_called_once_with(
                 'user',
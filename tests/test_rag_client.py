@@ -41,6 +41,70 @@ class TestRAGClient(unittest.TestCase):
         self.assertEqual([c.doc_id for c in chunks], ['file:ns:best.py:3-4', 'chat:conv:msg1'])
         self.assertTrue(all(c.score >= 0.5 for c in chunks))
 
+    def test_retrieve_caches_repeated_queries_until_corpus_changes(self):
+        client = RAGClient()
+        RAGClient.invalidate_query_cache()
+        response = {'chunks': [{'similarity': 0.9, 'chunk': {'id': 1, 'doc_id': 'file:ns:a.py:1-2', 'content': 'a'}}]}
+
+        with patch.object(client.settings, 'get_rag_enabled', return_value=True), \
+             patch.object(client.settings, 'get_rag_min_score', return_value=0.0), \
+             patch.object(client.ai, 'embed_texts', return_value=[[0.1, 0.2]]) as mock_embed, \
+             patch.object(client, '_http_post', return_value=response) as mock_post, \
+             patch.object(client, '_run_cli', return_value=None):
+            first = client.retrieve('where is auth', k=3)
+            second = client.retrieve('  where   is auth ', k=3)
+            self.assertEqual(mock_embed.call_count, 1)
+            self.assertEqual(mock_post.call_count, 1)
+            self.assertEqual([c.doc_id for c in second], [c.doc_id for c in first])
+
+            client.retrieve('where is auth', k=5)
+            self.assertEqual(mock_embed.call_count, 2)
+
+            RAGClient.invalidate_query_cache()
+            client.retrieve('where is auth', k=3)
+            self.assertEqual(mock_embed.call_count, 3)
+
+    def test_chat_ingest_keeps_cache_and_document_ingest_drops_only_its_project(self):
+        client = RAGClient()
+        RAGClient.invalidate_query_cache()
+        response = {'chunks': [{'similarity': 0.9, 'chunk': {'id': 1, 'doc_id': 'file:ns:a.py:1-2', 'content': 'a'}}]}
+
+        with patch.object(client.settings, 'get_rag_enabled', return_value=True), \
+             patch.object(client.settings, 'get_rag_min_score', return_value=0.0), \
+             patch.object(client.ai, 'embed_texts', return_value=[[0.1, 0.2]]) as mock_embed, \
+             patch.object(client, '_http_post', return_value={'status': 'ok', **response}), \
+             patch.object(client, '_run_cli', return_value=None):
+            client.retrieve('where is auth', k=3)
+            self.assertTrue(client.ingest_message('user', 'hello there', 'conv1'))
+            client.retrieve('where is auth', k=3)
+            self.assertEqual(mock_embed.call_count, 2)  # query + message, no second query embed
+
+            RAGClient._invalidate_namespace('another-project')
+            client.retrieve('where is auth', k=3)
+            self.assertEqual(mock_embed.call_count, 2)
+
+            self.assertTrue(client.ingest_document('a.py', 'print(1)', 1, 1))
+            client.retrieve('where is auth', k=3)
+            self.assertEqual(mock_embed.call_count, 4)
+
+    def test_retrieve_batch_embeds_uncached_queries_in_one_call(self):
+        client = RAGClient()
+        RAGClient.invalidate_query_cache()
+        response = {'chunks': [{'similarity': 0.9, 'chunk': {'id': 1, 'doc_id': 'file:ns:a.py:1-2', 'content': 'a'}}]}
+
+        with patch.object(client.settings, 'get_rag_enabled', return_value=True), \
+             patch.object(client.settings, 'get_rag_min_score', return_value=0.0), \
+             patch.object(client.ai, 'embed_texts', return_value=[[0.1], [0.2]]) as mock_embed, \
+             patch.object(client, '_http_post', return_value=response) as mock_post, \
+             patch.object(client, '_run_cli', return_value=None):
+            results = client.retrieve_batch([('auth', 3), ('needle', 5), ('auth', 3)])
+            cached = client.retrieve('auth', k=3)
+
+        mock_embed.assert_called_once_with(['auth', 'needle'])
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(set(results), {('auth', 3), ('needle', 5)})
+        self.assertEqual([c.doc_id for c in cached], ['file:ns:a.py:1-2'])
+
     def test_format_context_block_uses_settings_limits(self):
         client = RAGClient()
         chunks = [
@@ -49,6 +49,34 @@ class TestRAGTools(unittest.TestCase):
         self.assertNotIn('Chat Memory', outputs[0])
         self.assertIn('...(truncated)', outputs[0])
 
+    def test_search_codebase_result_block_layout(self):
+        worker = ToolWorker([{'cmd': 'search_codebase', 'args': {'query': 'needle'}}], auto_approve=True)
+        outputs = []
+        worker.finished.connect(outputs.append)
+        worker.settings.get_advanced_agent_tools_enabled = MagicMock(return_value=True)
+        chunks = [
+            RetrievedChunk(1, 'file:ns:src/app.py:10-12', '  def needle():\n    pass  ', 0.7, 10, 12),
+            RetrievedChunk(2, 'file:ns:README.md:0-0', 'needle docs', 0.5),
+        ]
+
+        with patch.object(worker.settings, 'get_rag_enabled', return_value=True), \
+             patch.object(worker.settings, 'get_rag_top_k', return_value=2), \
+             patch.object(worker.settings, 'get_rag_max_chunk', return_value=80), \
+             patch.object(worker.rag_client, 'retrieve', return_value=chunks):
+            worker.run()
+
+        self.assertIn(
+            "Codebase Search Results for 'needle':\n"
+            "\n--- Result 1 (File) | Score: 0.7000 ---\n"
+            "Location: src/app.py\n"
+            "Lines: 10-12\n"
+            "Content:\ndef needle():\n    pass\n\n"
+            "\n--- Result 2 (File) | Score: 0.5000 ---\n"
+            "Location: README.md\n"
+            "Content:\nneedle docs\n",
+            outputs[0],
+        )
+
     def test_search_codebase_does_not_fallback_to_chat_memory(self):
         worker = ToolWorker([{'cmd': 'search_codebase', 'args': {'query': 'needle'}}], auto_approve=True)
         outputs = []
@@ -65,6 +93,30 @@ class TestRAGTools(unittest.TestCase):
         self.assertIn("No relevant code found for 'needle'", outputs[0])
         self.assertNotIn('Chat Memory', outputs[0])
 
+    def test_multiple_searches_share_one_batched_retrieval(self):
+        worker = ToolWorker([
+            {'cmd': 'search_memory', 'args': {'query': 'auth'}},
+            {'cmd': 'search_codebase', 'args': {'query': 'needle'}},
+        ], auto_approve=True)
+        outputs = []
+        worker.finished.connect(outputs.append)
+        worker.settings.get_advanced_agent_tools_enabled = MagicMock(return_value=True)
+        batched = {
+            ('auth', 2): [RetrievedChunk(1, 'chat:conv:msg1', 'auth memory', 0.9)],
+            ('needle', 22): [RetrievedChunk(2, 'file:ns:src/app.py:1-2', 'needle code', 0.8, 1, 2)],
+        }
+
+        with patch.object(worker.settings, 'get_rag_enabled', return_value=True), \
+             patch.object(worker.settings, 'get_rag_top_k', return_value=2), \
+             patch.object(worker.rag_client, 'retrieve_batch', return_value=batched) as mock_batch, \
+             patch.object(worker.rag_client, 'retrieve') as mock_retrieve:
+            worker.run()
+
+        mock_batch.assert_called_once_with([('auth', 2), ('needle', 22)])
+        mock_retrieve.assert_not_called()
+        self.assertIn('auth memory', outputs[0])
+        self.assertIn('Location: src/app.py', outputs[0])
+
     def test_chatpanel_send_worker_skips_rag_ingest_when_disabled(self):
         with patch('ui.chat_panel.QTimer.singleShot', lambda *args, **kwargs: None):
             panel = ChatPanel()
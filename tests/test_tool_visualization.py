@@ -13,6 +13,7 @@ app = QApplication.instance() or QApplication(sys.argv)
 
 from ui.widgets.chat_items import MessageItem
 from ui.chat_panel import ChatPanel
+from ui.chat_background import WatermarkContainer
 
 class TestToolVisualization(unittest.TestCase):
     
@@ -26,6 +27,43 @@ class TestToolVisualization(unittest.TestCase):
         # Tool labels use the current tool accent color
         self.assertIn("#4ec9b0", item.role_label.styleSheet())
 
+    def test_message_item_skips_rerender_of_unchanged_text(self):
+        item = MessageItem("assistant", "hello")
+
+        with patch.object(item, '_format', wraps=item._format) as mock_format:
+            item.set_text("hello")
+            mock_format.assert_not_called()
+
+            item.set_text("hello again")
+            item.set_text("hello again")
+            self.assertEqual(mock_format.call_count, 1)
+
+            item.update_appearance()
+            self.assertEqual(mock_format.call_count, 1)
+            item.current_color = "#123456"
+            item.set_text("hello again")
+            self.assertEqual(mock_format.call_count, 2)
+        self.assertEqual(item.original_text, "hello again")
+
+    def test_watermark_rescales_logo_once_per_size(self):
+        import tempfile
+        from PySide6.QtGui import QPixmap
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logo_path = os.path.join(tmpdir, "logo.png")
+            pixmap = QPixmap(8, 8)
+            pixmap.fill()
+            pixmap.save(logo_path)
+            container = WatermarkContainer(logo_path=logo_path)
+
+        container.resize(40, 30)
+        first = container._logo_for_size()
+        self.assertIs(container._logo_for_size(), first)
+        self.assertEqual((first.width(), first.height()), (40, 30))
+
+        container.resize(60, 30)
+        self.assertEqual(container._logo_for_size().width(), 60)
+
     @patch('ui.chat_panel.ToolWorker')
     @patch('ui.chat_panel.QThread')
     def test_chat_panel_logs_tool(self, MockThread, MockToolWorker):
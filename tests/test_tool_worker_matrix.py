@@ -1,15 +1,18 @@
 import os
 import sys
 import tempfile
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 
+from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QApplication
 
 app = QApplication.instance() or QApplication(sys.argv)
 sys.path.append(os.getcwd())
 
 from core.agent_tools import get_project_root, set_project_root
+from core.settings import SettingsManager
 from ui.chat_workers import ToolWorker
 
 
@@ -160,6 +163,147 @@ class TestToolWorkerMatrix(unittest.TestCase):
         self.assertIn('Failed actions:', outputs[0])
         self.assertIn('execute_command python broken.py', outputs[0])
 
+    def test_auto_approved_write_diffs_off_the_tool_loop_before_finishing(self):
+        target = os.path.join(self._tmp.name, 'app.py')
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write("print('old')\n")
+        worker = ToolWorker([{'cmd': 'write_file', 'args': {'path': 'app.py', 'content': "print('new')\n"}}], auto_approve=True)
+        events = []
+        diff_threads = []
+        worker.diff_generated.connect(lambda path, diff: events.append(('diff', diff)), Qt.DirectConnection)
+        worker.finished.connect(lambda output: events.append(('finished', output)))
+
+        from ui.chat_workers import AgentToolHandler
+        real_diff = AgentToolHandler.get_diff
+
+        def tracking_diff(*args):
+            diff_threads.append(threading.get_ident())
+            return real_diff(*args)
+
+        with patch('ui.chat_workers.AgentToolHandler.get_diff', side_effect=tracking_diff):
+            worker.run()
+
+        self.assertNotEqual(diff_threads, [threading.get_ident()])
+        self.assertEqual([kind for kind, _ in events], ['diff', 'finished'])
+        self.assertIn("+print('new')", events[0][1])
+
+    def test_write_file_reports_new_file_when_target_is_missing(self):
+        worker = ToolWorker([{'cmd': 'write_file', 'args': {'path': 'fresh.py', 'content': "x = 1\n"}}], auto_approve=True)
+        steps = []
+        worker.step_finished.connect(lambda title, detail, status: steps.append((title, detail, status)))
+
+        worker.run()
+
+        self.assertEqual(steps, [("Wrote fresh.py (new)", "[New File]\nx = 1\n", "Done")])
+        with open(os.path.join(self._tmp.name, 'fresh.py'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), "x = 1\n")
+
+    def test_auto_approved_edit_plans_once_and_diffs_without_rereading(self):
+        target = os.path.join(self._tmp.name, 'app.py')
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write("x = 1\ny = 2\n")
+        worker = ToolWorker([{'cmd': 'edit_file', 'args': {'path': 'app.py', 'old_text': 'y = 2', 'new_text': 'y = 3'}}], auto_approve=True)
+        diffs = []
+        worker.diff_generated.connect(lambda path, diff: diffs.append(diff), Qt.DirectConnection)
+
+        from ui.chat_workers import AgentToolHandler
+        with patch('ui.chat_workers.AgentToolHandler.preview_edit', side_effect=AgentToolHandler.preview_edit) as mock_preview:
+            worker.run()
+
+        self.assertEqual(mock_preview.call_count, 1)
+        self.assertEqual(len(diffs), 1)
+        self.assertIn("-y = 2\n+y = 3", diffs[0])
+        with open(target, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "x = 1\ny = 3\n")
+
+    def test_stop_during_read_only_batch_skips_calls_not_yet_started(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        stopped = threading.Event()
+        thread = MagicMock()
+        thread.isInterruptionRequested.side_effect = stopped.is_set
+
+        def listing(path):
+            stopped.set()
+            return f"<{path}>"
+
+        worker = ToolWorker([{'cmd': 'list_files', 'args': {'path': p}} for p in ('a', 'b', 'c')], auto_approve=True)
+        outputs = []
+        worker.finished.connect(outputs.append)
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+             patch('ui.chat_workers._read_pool', return_value=pool), \
+             patch('ui.chat_workers.QThread.currentThread', return_value=thread), \
+             patch('ui.chat_workers.AgentToolHandler.list_files', side_effect=listing):
+            worker.run()
+
+        self.assertIn("<a>", outputs[0])
+        self.assertNotIn("<b>", outputs[0])
+        self.assertNotIn("<c>", outputs[0])
+        self.assertTrue(outputs[0].endswith(ToolWorker.INTERRUPTED_OUTPUT))
+
+    def test_unknown_tool_is_reported_as_skipped(self):
+        output = self._run_worker([
+            {'cmd': 'teleport_file', 'args': {}},
+            {'cmd': 'list_files', 'args': {'path': '.'}},
+        ])
+
+        self.assertIn("System: [teleport_file] Skipped — unknown tool.", output)
+        self.assertIn("teleport_file: unknown tool", output)
+        self.assertIn("Listed files in '.'", output)
+
+    def test_adjacent_read_only_calls_run_concurrently_and_report_in_order(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def listing(path):
+            barrier.wait()  # only passes when both listings are in flight together
+            return f"<{path}>"
+
+        worker = ToolWorker([
+            {'cmd': 'list_files', 'args': {'path': 'a'}},
+            {'cmd': 'list_files', 'args': {'path': 'b'}},
+            {'cmd': 'write_file', 'args': {'path': 'c.txt', 'content': 'c'}},
+        ], auto_approve=True)
+        outputs = []
+        steps = []
+        worker.finished.connect(outputs.append)
+        worker.step_finished.connect(lambda title, detail, status: steps.append((title, status)))
+
+        with patch('ui.chat_workers.AgentToolHandler.list_files', side_effect=listing):
+            worker.run()
+
+        self.assertEqual(steps, [
+            ("Listed files in: a", "Done"),
+            ("Listed files in: b", "Done"),
+            ("Wrote c.txt (new)", "Done"),
+        ])
+        output = outputs[0]
+        self.assertLess(output.index("<a>"), output.index("<b>"))
+        self.assertLess(output.index("<b>"), output.index("Wrote file 'c.txt'"))
+
+    def test_read_only_batch_reads_settings_on_the_tool_loop_only(self):
+        worker = ToolWorker([
+            {'cmd': 'search_codebase', 'args': {'query': 'needle'}},
+            {'cmd': 'search_memory', 'args': {'query': 'needle'}},
+            {'cmd': 'list_files', 'args': {'path': '.'}},
+        ], auto_approve=True)
+        qsettings = SettingsManager._settings
+        readers = []
+
+        class RecordingSettings:
+            def value(self, *args, **kwargs):
+                readers.append(threading.current_thread())
+                return qsettings.value(*args, **kwargs)
+
+        with patch.object(SettingsManager, '_settings', RecordingSettings()), \
+             patch.object(ToolWorker, '_rag_enabled', return_value=True), \
+             patch.object(worker.rag_client, 'retrieve_batch', return_value={}), \
+             patch.object(worker.rag_client, 'retrieve', return_value=[]), \
+             patch('ui.chat_workers.AgentToolHandler.list_files', return_value="."):
+            worker.run()
+
+        self.assertTrue(readers)
+        self.assertEqual(set(readers), {threading.current_thread()})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,8 @@ from PySide6.QtWidgets import QVBoxLayout, QWidget
 
 log = logging.getLogger(__name__)
 
+_BASE_COLOR = QColor("#18181b")
+
 
 class WatermarkContainer(QWidget):
     """Layer 1 & 2: Base Gray + Background Image."""
@@ -15,6 +17,7 @@ class WatermarkContainer(QWidget):
     def __init__(self, parent=None, logo_path=None):
         super().__init__(parent)
         self.logo = None
+        self._scaled_logo = None  # logo rescaled to the current widget size
         if logo_path:
             logo_path = os.path.realpath(logo_path)
             if os.path.exists(logo_path):
@@ -26,17 +29,33 @@ class WatermarkContainer(QWidget):
             else:
                 log.warning("WatermarkContainer: Logo path does not exist: %s", logo_path)
 
+        # paintEvent fills the whole rect, so Qt can skip erasing/painting what
+        # lies beneath; the translucent chat viewport on top must stay non-opaque.
+        self.setAttribute(Qt.WA_OpaquePaintEvent, True)
+
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)
         self.layout.setSpacing(0)
 
+    def resizeEvent(self, event):
+        self._scaled_logo = None
+        super().resizeEvent(event)
+
+    def _logo_for_size(self):
+        """Smooth-scale the logo once per widget size instead of on every repaint."""
+        scaled = self._scaled_logo
+        if scaled is None or scaled.size() != self.size():
+            scaled = self.logo.scaled(self.size(), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            self._scaled_logo = scaled
+        return scaled
+
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.fillRect(self.rect(), QColor("#18181b"))
+        painter.fillRect(self.rect(), _BASE_COLOR)
         if self.logo and not self.logo.isNull():
             vw, vh = self.width(), self.height()
             if vw > 0 and vh > 0:
-                scaled_logo = self.logo.scaled(self.size(), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+                scaled_logo = self._logo_for_size()
                 if not scaled_logo.isNull():
                     painter.setOpacity(1.0)
                     painter.drawPixmap(0, 0, scaled_logo)
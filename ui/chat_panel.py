@@ -4,6 +4,8 @@ import os
 import re
 import json
 import logging
+import uuid
+from collections import deque
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QScrollArea, 
     QTextEdit, QPushButton, QFrame, QLabel, QMessageBox,
@@ -25,6 +27,7 @@ from ui import chat_panel_handlers as panel_handlers
 from ui import chat_panel_io as panel_io
 from ui import chat_panel_ui as panel_ui
 from ui.chat_workers import AIWorker, ToolWorker
+from ui.project_file_index import ProjectFileIndex
 from ui import chat_panel_models as panel_models
 from ui import chat_panel_runtime as panel_runtime
 from ui import chat_panel_state as panel_state
@@ -56,9 +59,13 @@ class ChatPanel(QWidget):
     _prepare_selected_model_for_send = panel_models._prepare_selected_model_for_send
     _get_full_model_name = panel_models._get_full_model_name
     _handle_ai_model_selected = panel_models._handle_ai_model_selected
+    _mention_file_index = panel_dispatch._mention_file_index
     _resolve_at_mentions = panel_dispatch._resolve_at_mentions
     send_message = panel_dispatch.send_message
+    _message_token_estimate = panel_dispatch._message_token_estimate
     _start_ai_worker = panel_dispatch._start_ai_worker
+    _last_user_message = panel_dispatch._last_user_message
+    _apply_attachment_payload = panel_dispatch._apply_attachment_payload
     send_worker = panel_dispatch.send_worker
     _guided_takeoff_prompt = panel_guidance._guided_takeoff_prompt
     _guided_tool_limit = panel_guidance._guided_tool_limit
@@ -138,13 +145,16 @@ class ChatPanel(QWidget):
     open_settings = panel_ui.open_settings
     append_message_widget = panel_ui.append_message_widget
     _add_chat_widget = panel_ui._add_chat_widget
+    _set_chat_updates_enabled = panel_ui._set_chat_updates_enabled
     _prune_chat_widgets = panel_ui._prune_chat_widgets
+    _clear_chat_widgets = panel_ui._clear_chat_widgets
     _regenerate_last = panel_ui._regenerate_last
     add_message = panel_ui.add_message
     _message_for_ai = staticmethod(panel_ui._message_for_ai)
     _messages_for_ai = classmethod(panel_ui._messages_for_ai)
     eventFilter = panel_ui.eventFilter
     handle_ai_finished = panel_handlers.handle_ai_finished
+    _insert_thought_item = panel_handlers._insert_thought_item
     handle_tool_finished = panel_handlers.handle_tool_finished
     _tool_coach_prompt = panel_state._tool_coach_prompt
     _parse_action_summary = staticmethod(panel_state._parse_action_summary)
@@ -212,12 +222,19 @@ class ChatPanel(QWidget):
     select_attachment = panel_io.select_attachment
     add_attachment = panel_io.add_attachment
     remove_attachment = panel_io.remove_attachment
+    _on_attachment_chip_closed = panel_io._on_attachment_chip_closed
     _refresh_attachments_ui = panel_io._refresh_attachments_ui
     _history_dir = panel_io._history_dir
     _conversation_file = panel_io._conversation_file
+    _conversation_meta_file = panel_io._conversation_meta_file
     _derive_title = panel_io._derive_title
     save_conversation = panel_io.save_conversation
+    flush_conversation_save = panel_io.flush_conversation_save
+    _wait_for_background_save = panel_io._wait_for_background_save
+    _save_conversation_in_background = panel_io._save_conversation_in_background
+    _do_save_conversation = panel_io._do_save_conversation
     load_conversation = panel_io.load_conversation
+    _render_restored_messages = panel_io._render_restored_messages
     switch_conversation = panel_io.switch_conversation
     list_conversations = panel_io.list_conversations
     clear_context = panel_io.clear_context
@@ -229,8 +246,11 @@ class ChatPanel(QWidget):
     _clear_tool_refs = panel_runtime._clear_tool_refs
     _clear_indexing_refs = panel_runtime._clear_indexing_refs
     _shutdown_thread = panel_runtime._shutdown_thread
+    _ingest_rag_message = panel_runtime._ingest_rag_message
     _shutdown_background_threads = panel_runtime._shutdown_background_threads
+    current_ai_response = property(panel_runtime._get_current_ai_response, panel_runtime._set_current_ai_response)
     handle_ai_chunk = panel_runtime.handle_ai_chunk
+    _streaming_preview = panel_runtime._streaming_preview
     _flush_ai_text = panel_runtime._flush_ai_text
     handle_ai_usage = panel_runtime.handle_ai_usage
     handle_stop_button = panel_runtime.handle_stop_button
@@ -242,6 +262,7 @@ class ChatPanel(QWidget):
     _handle_change_proposed = panel_runtime._handle_change_proposed
     _handle_diff_generated = panel_runtime._handle_diff_generated
     _handle_confirmation = panel_runtime._handle_confirmation
+    prime_project_files = panel_runtime.prime_project_files
     start_auto_indexing = panel_runtime.start_auto_indexing
 
     def __init__(self, parent=None):
@@ -250,7 +271,6 @@ class ChatPanel(QWidget):
         self.settings_manager = SettingsManager()
         
         # Long-term Memory: Conversation Tracking
-        import uuid
         self.conversation_id = str(uuid.uuid4())[:8]
         self.rag_client = RAGClient()
         
@@ -284,6 +304,8 @@ class ChatPanel(QWidget):
         self.scroll_area.verticalScrollBar().valueChanged.connect(
             self._on_user_scroll)
 
+        self._rendered_rows = deque()  # chat rows in insertion order, pruned from the left
+
         self.chat_container.layout.addWidget(self.scroll_area)
         self.layout.addWidget(self.chat_container, 1)
 
@@ -329,10 +351,12 @@ class ChatPanel(QWidget):
         # Attachment preview row
         self.attachment_area = QFrame()
         self.attachment_area.setVisible(False)
-        self.attachment_area.setStyleSheet("background: transparent; border: none;")
+        self.attachment_area.setObjectName("attachmentArea")
+        self.attachment_area.setStyleSheet(panel_io.ATTACHMENT_AREA_STYLE)
         self.attachment_layout = QHBoxLayout(self.attachment_area)
         self.attachment_layout.setAlignment(Qt.AlignLeft)
         self.attachment_layout.setContentsMargins(0, 0, 0, 0)
+        self.attachment_layout.addStretch()
         self.input_wrapper_layout.addWidget(self.attachment_area)
 
         # Main input frame (rounded card)
@@ -428,9 +452,18 @@ class ChatPanel(QWidget):
         
         # State
         self.attachments = [] # List of paths
+        self._attachment_names = {}  # path -> display basename; mirrors self.attachments for O(1) lookups
+        self._attachment_chips = {}  # path -> chip widget in attachment_layout
 
         # State
         self.messages = [] # List of {"role":Str, "content":Str}
+        self._conv_meta_cache = {}  # path -> (mtime, sidebar metadata)
+        self._file_listing = ProjectFileIndex(self)  # live project listing for the structure prompt
+        self.file_updated.connect(self._file_listing.note_file_changed)
+        self._token_est_cache = {}  # id(message) -> (content, token estimate)
+        self._mention_index_cache = None  # (root, listing it was built from, basename -> paths)
+        self._last_user_idx = None  # index in self.messages of the newest stored user turn
+        self._pending_attachment_msg = None  # user message awaiting its worker-built attachment payload
         self.is_processing = False
         self._auto_scroll = True
         self._programmatic_scroll = False
@@ -439,9 +472,20 @@ class ChatPanel(QWidget):
 
         # Streaming text buffer — batch updates to reduce layout thrashing
         self._ai_text_dirty = False
+        self._ai_chunks = []  # streamed pieces behind current_ai_response, joined lazily
         self._ai_update_timer = QTimer()
-        self._ai_update_timer.setInterval(50)  # Refresh UI every 50ms max
+        self._ai_update_timer.setSingleShot(True)  # armed per burst by handle_ai_chunk
+        self._ai_update_timer.setInterval(panel_runtime.AI_FLUSH_INTERVAL_MS)
         self._ai_update_timer.timeout.connect(self._flush_ai_text)
+        self._last_ai_flush = 0.0  # monotonic time of the last streamed repaint
+        self._stream_preview_lines = (0, 0)  # (offset after last seen "\n", lines before it)
+
+        # Conversation persistence — debounce bursts of saves into one write
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self._save_conversation_in_background)
+        self._save_future = None  # in-flight background write, if any
+        self._rag_ingest_backoff = panel_runtime._RagIngestBackoff()  # skips ingestion for a while after a failure
         
         # Threads (use the same names throughout lifecycle)
         self.ai_thread_obj = None
@@ -495,7 +539,6 @@ class ChatPanel(QWidget):
         self._shutting_down = False
 
         # Load system prompt
-        from core.prompts import SystemPrompts
         self.system_prompt = SystemPrompts.CODING_AGENT
 
         # Restore previous conversation if available
@@ -505,5 +548,6 @@ class ChatPanel(QWidget):
         QTimer.singleShot(1000, self.start_auto_indexing)
 
     def closeEvent(self, event):
+        self.flush_conversation_save()
         self._shutdown_background_threads()
         super().closeEvent(event)
@@ -1,6 +1,9 @@
 import re
 
 
+_THOUGHT_RE = re.compile(r'<thought>(.*?)</thought>\s*', re.DOTALL)
+
+
 def _chat_panel_module():
     from ui import chat_panel as chat_panel_module
 
@@ -13,20 +16,27 @@ def handle_ai_finished(self):
     self._ai_update_timer.stop()
     self._ai_text_dirty = False
     self._guided_task_board_updated_this_turn = False
-    if self.current_ai_item:
-        self.current_ai_item.set_text(self._compact_assistant_display(self.current_ai_response))
 
     chat_panel.log.debug("handle_ai_finished: response_len=%d chars", len(self.current_ai_response))
 
-    thought_blocks = re.findall(r'<thought>(.*?)</thought>', self.current_ai_response, re.DOTALL)
-    display_response = re.sub(r'<thought>.*?</thought>\s*', '', self.current_ai_response, flags=re.DOTALL).strip()
+    thought_blocks = []
+
+    def _take_thought(match):
+        thought_blocks.append(match.group(1))
+        return ""
+
+    display_response = _THOUGHT_RE.sub(_take_thought, self.current_ai_response).strip()
 
-    if thought_blocks and self.current_ai_item:
-        thought_text = "\n---\n".join(t.strip() for t in thought_blocks)
+    thought_text = "\n---\n".join(t for t in (block.strip() for block in thought_blocks) if t)
+    if thought_text and self.current_ai_item:
         thought_item = chat_panel.ProgressItem()
         thought_item.set_thought(thought_text)
-        self._add_chat_widget(thought_item, before_widget=self.current_ai_item)
-        thought_item.finish()
+        # Insert the thought panel on the next event-loop pass so the final
+        # reply and tool dispatch below are not held up by its layout work.
+        chat_panel.QTimer.singleShot(
+            0,
+            lambda item=thought_item, anchor=self.current_ai_item: self._insert_thought_item(item, anchor),
+        )
 
     display_response, task_board_update, task_board_goal = self._extract_guided_task_board_update(display_response)
     if task_board_update:
@@ -34,6 +44,8 @@ def handle_ai_finished(self):
 
     if display_response != self.current_ai_response:
         self.current_ai_response = display_response
+    if self.current_ai_item:
+        self.current_ai_item.set_text(self._compact_assistant_display(display_response))
     if self._stop_requested:
         chat_panel.log.info("AI generation stopped; skipping history append and tool parsing.")
         self._phased_summary_pending = False
@@ -75,11 +87,11 @@ def handle_ai_finished(self):
             return
         self.current_ai_response = self._blank_response_fallback_message()
         display_response = self.current_ai_response
+        if self.current_ai_item:
+            self.current_ai_item.set_text(self._compact_assistant_display(display_response))
     else:
         self._empty_ai_retry_count = 0
         self._guided_blank_response_retry_count = 0
-    if self.current_ai_item:
-        self.current_ai_item.set_text(self._compact_assistant_display(display_response))
     self.refresh_models()
 
     if self._is_ai_error_response(self.current_ai_response):
@@ -334,11 +346,7 @@ def handle_ai_finished(self):
     self.messages.append({"role": "assistant", "content": self.current_ai_response})
     self.save_conversation()
 
-    if self._rag_enabled():
-        try:
-            self.rag_client.ingest_message("assistant", self.current_ai_response, self.conversation_id)
-        except Exception as e:
-            chat_panel.log.error(f"Failed to ingest AI response: {e}")
+    self._ingest_rag_message("assistant", self.current_ai_response)
 
     if tools:
         self._guided_decision_retry_count = 0
@@ -395,6 +403,17 @@ def handle_ai_finished(self):
     )
 
 
+def _insert_thought_item(self, thought_item, anchor):
+    if getattr(self, "_shutting_down", False):
+        return
+    try:
+        self._add_chat_widget(thought_item, before_widget=anchor)
+    except RuntimeError:
+        # The anchor row was already pruned or deleted.
+        return
+    thought_item.finish()
+
+
 def handle_tool_finished(self, output):
     chat_panel = _chat_panel_module()
 
@@ -406,20 +425,22 @@ def handle_tool_finished(self, output):
     max_tool_output = 8000
     if len(output) > max_tool_output:
         half = max_tool_output // 2
-        output = output[:half] + f"\n\n... [{len(output) - max_tool_output} chars truncated] ...\n\n" + output[-half:]
-    tool_msg = "[TOOL_RESULT] (Automated system output — not user input)\n" f"{output}\n" "[/TOOL_RESULT]"
-    tools_used = ", ".join(self._tool_calls_for_run) if self._tool_calls_for_run else "none"
-    actions = "\n".join(f"- {a}" for a in self._tool_action_log) if self._tool_action_log else "- (no actions logged)"
-    display_output = self._compact_for_display(output, max_chars=700, max_lines=10)
-    display_tool_msg = (
-        "[TOOL_RESULT] (Automated system output — compact view)\n"
-        f"Tools used: {tools_used}\n"
-        "Actions taken:\n"
-        f"{actions}\n\n"
-        "Output excerpt:\n"
-        f"{display_output}\n"
-        "[/TOOL_RESULT]"
-    )
+        output = f"{output[:half]}\n\n... [{len(output) - max_tool_output} chars truncated] ...\n\n{output[-half:]}"
+    tool_msg = f"[TOOL_RESULT] (Automated system output — not user input)\n{output}\n[/TOOL_RESULT]"
+    # Assemble the compact view in one join rather than nesting joins inside
+    # f-strings; this runs once per tool cycle.
+    parts = [
+        "[TOOL_RESULT] (Automated system output — compact view)\nTools used: ",
+        ", ".join(self._tool_calls_for_run) if self._tool_calls_for_run else "none",
+        "\nActions taken:\n",
+    ]
+    if self._tool_action_log:
+        for action in self._tool_action_log:
+            parts += ("- ", action, "\n")
+    else:
+        parts.append("- (no actions logged)\n")
+    parts += ("\nOutput excerpt:\n", self._compact_for_display(output, max_chars=700, max_lines=10), "\n[/TOOL_RESULT]")
+    display_tool_msg = "".join(parts)
 
     self.append_message_widget("system", display_tool_msg)
     self.messages.append({"role": "system", "content": tool_msg})
@@ -487,4 +508,4 @@ def handle_tool_finished(self, output):
     self._start_ai_worker(extra_system_messages=extra_messages or None)
 
 
-__all__ = ["handle_ai_finished", "handle_tool_finished"]
\ No newline at end of file
+__all__ = ["handle_ai_finished", "_insert_thought_item", "handle_tool_finished"]
\ No newline at end of file
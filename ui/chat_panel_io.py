@@ -1,6 +1,9 @@
 import json
 import logging
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 from PySide6.QtWidgets import QFileDialog, QFrame, QHBoxLayout, QLabel, QPushButton
 
@@ -9,6 +12,31 @@ from core.agent_tools import get_project_root
 
 log = logging.getLogger(__name__)
 
+# Small sidecar written next to each <id>.json so the history sidebar can be
+# listed without parsing full message arrays.
+CONVERSATION_META_SUFFIX = ".meta.json"
+# Coalesce bursts of save requests (streamed segments, tool results) into one write.
+CONVERSATION_SAVE_DEBOUNCE_MS = 500
+# Installed once on the attachment row; chips only set object names, so Qt
+# parses these rules a single time instead of per chip widget.
+ATTACHMENT_AREA_STYLE = """
+    QFrame#attachmentArea { background: transparent; border: none; }
+    QFrame#attachmentChip { background: #007fd4; border-radius: 10px; color: white; }
+    QLabel#attachmentChipLabel { border: none; background: transparent; color: white; font-size: 11px; }
+    QPushButton#attachmentChipClose { border: none; background: transparent; color: white; font-weight: bold; }
+"""
+
+# One shared writer thread keeps debounced saves off the GUI thread while
+# still landing them on disk in the order they were taken.
+_save_executor = None
+
+
+def _conversation_save_executor() -> ThreadPoolExecutor:
+    global _save_executor
+    if _save_executor is None:
+        _save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vox-conversation-save")
+    return _save_executor
+
 
 def select_attachment(self):
     path, _ = QFileDialog.getOpenFileName(self, "Attach File", get_project_root(), "All Files (*.*)")
@@ -17,43 +45,62 @@ def select_attachment(self):
 
 
 def add_attachment(self, path):
-    if path in self.attachments:
+    if path in self._attachment_names:
         return
+    self._attachment_names[path] = os.path.basename(path)
     self.attachments.append(path)
     self._refresh_attachments_ui()
 
 
 def remove_attachment(self, path):
-    if path in self.attachments:
-        self.attachments.remove(path)
-        self._refresh_attachments_ui()
+    if self._attachment_names.pop(path, None) is None:
+        return
+    self.attachments.remove(path)
+    self._refresh_attachments_ui()
+
+
+def _build_attachment_chip(self, path):
+    chip = QFrame()
+    chip.setObjectName("attachmentChip")
+    chip_layout = QHBoxLayout(chip)
+    chip_layout.setContentsMargins(8, 2, 8, 2)
+    chip_layout.setSpacing(4)
+    lbl = QLabel(self._attachment_names[path])
+    lbl.setObjectName("attachmentChipLabel")
+    chip_layout.addWidget(lbl)
+    close_btn = QPushButton("✕")
+    close_btn.setFixedSize(16, 16)
+    close_btn.setObjectName("attachmentChipClose")
+    close_btn.setProperty("attachment_path", path)
+    close_btn.clicked.connect(self._on_attachment_chip_closed)
+    chip_layout.addWidget(close_btn)
+    return chip
+
+
+def _on_attachment_chip_closed(self, checked=False):
+    """Shared slot for every chip's close button; the path rides on the button."""
+    button = self.sender()
+    if button is not None:
+        self.remove_attachment(button.property("attachment_path"))
 
 
 def _refresh_attachments_ui(self):
-    while self.attachment_layout.count():
-        item = self.attachment_layout.takeAt(0)
-        if item.widget():
-            item.widget().deleteLater()
+    """Sync the chip row with ``self.attachments``, touching only chips that changed."""
+    for path in [p for p in self._attachment_chips if p not in self._attachment_names]:
+        chip = self._attachment_chips.pop(path)
+        self.attachment_layout.removeWidget(chip)
+        chip.hide()
+        chip.deleteLater()
     if not self.attachments:
         self.attachment_area.setVisible(False)
         return
-    self.attachment_area.setVisible(True)
     for path in self.attachments:
-        chip = QFrame()
-        chip.setStyleSheet("background: #007fd4; border-radius: 10px; color: white;")
-        chip_layout = QHBoxLayout(chip)
-        chip_layout.setContentsMargins(8, 2, 8, 2)
-        chip_layout.setSpacing(4)
-        lbl = QLabel(os.path.basename(path))
-        lbl.setStyleSheet("border: none; background: transparent; color: white; font-size: 11px;")
-        chip_layout.addWidget(lbl)
-        close_btn = QPushButton("✕")
-        close_btn.setFixedSize(16, 16)
-        close_btn.setStyleSheet("border: none; background: transparent; color: white; font-weight: bold;")
-        close_btn.clicked.connect(lambda checked=False, p=path: self.remove_attachment(p))
-        chip_layout.addWidget(close_btn)
-        self.attachment_layout.addWidget(chip)
-    self.attachment_layout.addStretch()
+        if path not in self._attachment_chips:
+            chip = _build_attachment_chip(self, path)
+            self._attachment_chips[path] = chip
+            # New paths are always appended, so they belong just before the trailing stretch.
+            self.attachment_layout.insertWidget(self.attachment_layout.count() - 1, chip)
+    self.attachment_area.setVisible(True)
 
 
 def _history_dir(self) -> str:
@@ -66,6 +113,10 @@ def _conversation_file(self) -> str:
     return os.path.join(self._history_dir(), f"{self.conversation_id}.json")
 
 
+def _conversation_meta_file(self) -> str:
+    return os.path.join(self._history_dir(), f"{self.conversation_id}{CONVERSATION_META_SUFFIX}")
+
+
 def _derive_title(self) -> str:
     for message in self.messages:
         if message.get("role") == "user" and message.get("content", "").strip():
@@ -74,29 +125,85 @@ def _derive_title(self) -> str:
 
 
 def save_conversation(self):
+    """Schedule a debounced write of the current conversation."""
+    self._save_timer.start(CONVERSATION_SAVE_DEBOUNCE_MS)
+
+
+def flush_conversation_save(self):
+    """Write a pending debounced save immediately and wait for any in-flight write."""
+    if self._save_timer.isActive():
+        self._do_save_conversation()
+    else:
+        self._wait_for_background_save()
+
+
+def _wait_for_background_save(self):
+    future, self._save_future = self._save_future, None
+    if future is not None:
+        future.result()
+
+
+def _save_conversation_in_background(self):
+    self._do_save_conversation(background=True)
+
+
+def _write_conversation_files(self, files, msg_count):
+    try:
+        for path, text in files:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        log.debug("Conversation saved (%d messages)", msg_count)
+    except Exception as e:
+        log.error("Failed to save conversation: %s", e)
+        return
+    try:
+        self.conversation_changed.emit()
+    except RuntimeError:
+        # The panel was destroyed while the background write was running.
+        pass
+
+
+def _do_save_conversation(self, background=False):
+    """Snapshot the conversation and write it to disk.
+
+    The JSON is always built on the calling (GUI) thread so it reflects a
+    consistent state; with ``background`` the file writes are handed to the
+    shared save thread.
+    """
+    self._save_timer.stop()
     if not self.messages:
         return
     if not self.settings_manager.get_auto_save_conversation():
         return
     try:
-        from datetime import datetime
-
-        data = {
+        meta = {
             "conversation_id": self.conversation_id,
             "title": self._derive_title(),
             "updated_at": datetime.now().isoformat(),
+            "msg_count": len(self.messages),
+        }
+        data = {
+            "conversation_id": meta["conversation_id"],
+            "title": meta["title"],
+            "updated_at": meta["updated_at"],
             "messages": self.messages,
             "agent_state": self._serialize_agent_state(),
         }
-        with open(self._conversation_file(), "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        pointer = os.path.join(self._history_dir(), "current.txt")
-        with open(pointer, "w", encoding="utf-8") as f:
-            f.write(self.conversation_id)
-        log.debug("Conversation saved (%d messages)", len(self.messages))
-        self.conversation_changed.emit()
+        files = [
+            (self._conversation_file(), json.dumps(data, ensure_ascii=False, indent=2)),
+            (self._conversation_meta_file(), json.dumps(meta, ensure_ascii=False)),
+            (os.path.join(self._history_dir(), "current.txt"), self.conversation_id),
+        ]
     except Exception as e:
         log.error("Failed to save conversation: %s", e)
+        return
+    if background:
+        self._save_future = _conversation_save_executor().submit(
+            _write_conversation_files, self, files, meta["msg_count"]
+        )
+        return
+    self._wait_for_background_save()
+    _write_conversation_files(self, files, meta["msg_count"])
 
 
 def load_conversation(self):
@@ -117,11 +224,15 @@ def load_conversation(self):
             conv_id = data.get("conversation_id", self.conversation_id)
             self.conversation_id = conv_id
             self.messages = data.get("messages", [])
+            self._last_user_idx = None
             self._restore_agent_state(data.get("agent_state"))
-            self.save_conversation()
+            self._do_save_conversation()
             os.remove(legacy)
-            for message in self.messages:
-                self.append_message_widget(message["role"], message.get("content", ""))
+            self._set_chat_updates_enabled(False)
+            try:
+                self._render_restored_messages(self.messages)
+            finally:
+                self._set_chat_updates_enabled(True)
             log.info("Migrated legacy conversation (%d msgs)", len(self.messages))
             return
         except Exception:
@@ -133,27 +244,41 @@ def load_conversation(self):
         log.info("No conversation history found. Starting fresh.")
 
 
+def _render_restored_messages(self, messages, hidden: int = 0):
+    """Append restored message widgets in one pass, then scroll to the end once."""
+    scroll_bar = self.scroll_area.verticalScrollBar()
+    scroll_bar.rangeChanged.disconnect(self._on_scroll_range_changed)
+    try:
+        if hidden > 0:
+            self.append_message_widget("system", f"[{hidden} older messages hidden for performance. Full history is preserved.]")
+        for message in messages:
+            self.append_message_widget(message["role"], message.get("content", ""))
+    finally:
+        scroll_bar.rangeChanged.connect(self._on_scroll_range_changed)
+    self._scroll_to_bottom()
+
+
 def switch_conversation(self, conv_id: str):
     path = os.path.join(self._history_dir(), f"{conv_id}.json")
     if not os.path.exists(path):
         log.warning("Conversation file not found: %s", path)
         return
+    self.flush_conversation_save()
     try:
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
-        while self.chat_layout.count():
-            child = self.chat_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-        self.conversation_id = data.get("conversation_id", conv_id)
-        self._restore_agent_state(data.get("agent_state"))
-        self.messages = data.get("messages", [])
-        render_msgs = self.messages[-self.MAX_RENDERED_MESSAGES:]
-        hidden = max(0, len(self.messages) - len(render_msgs))
-        if hidden > 0:
-            self.append_message_widget("system", f"[{hidden} older messages hidden for performance. Full history is preserved.]")
-        for message in render_msgs:
-            self.append_message_widget(message["role"], message.get("content", ""))
+        self._set_chat_updates_enabled(False)
+        try:
+            self._clear_chat_widgets()
+            self.conversation_id = data.get("conversation_id", conv_id)
+            self._restore_agent_state(data.get("agent_state"))
+            self.messages = data.get("messages", [])
+            self._last_user_idx = None
+            render_msgs = self.messages[-self.MAX_RENDERED_MESSAGES:]
+            hidden = max(0, len(self.messages) - len(render_msgs))
+            self._render_restored_messages(render_msgs, hidden)
+        finally:
+            self._set_chat_updates_enabled(True)
         pointer = os.path.join(self._history_dir(), "current.txt")
         with open(pointer, "w", encoding="utf-8") as f:
             f.write(self.conversation_id)
@@ -163,38 +288,78 @@ def switch_conversation(self, conv_id: str):
         log.error("Failed to load conversation %s: %s", conv_id, e)
 
 
-def list_conversations(self) -> list[dict]:
-    results = []
-    hist_dir = self._history_dir()
-    for fname in os.listdir(hist_dir):
-        if not fname.endswith(".json"):
-            continue
-        try:
-            with open(os.path.join(hist_dir, fname), "r", encoding="utf-8") as f:
+def _read_conversation_meta(fpath: str, mtime: float) -> dict:
+    """Sidebar metadata for one history file, preferring a fresh sidecar."""
+    conv_id = os.path.basename(fpath)[:-5]
+    meta_path = fpath[:-5] + CONVERSATION_META_SUFFIX
+    try:
+        if os.stat(meta_path).st_mtime >= mtime:
+            with open(meta_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            results.append({
-                "id": data.get("conversation_id", fname[:-5]),
+            return {
+                "id": data.get("conversation_id", conv_id),
                 "title": data.get("title", "Untitled"),
                 "updated_at": data.get("updated_at", ""),
-                "msg_count": len(data.get("messages", [])),
-            })
-        except Exception:
-            continue
+                "msg_count": int(data.get("msg_count", 0)),
+            }
+    except (OSError, ValueError, TypeError, AttributeError):
+        pass
+    # Legacy (or externally rewritten) conversation: parse the full file.
+    with open(fpath, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        "id": data.get("conversation_id", conv_id),
+        "title": data.get("title", "Untitled"),
+        "updated_at": data.get("updated_at", ""),
+        "msg_count": len(data.get("messages", [])),
+    }
+
+
+def list_conversations(self) -> list[dict]:
+    results = []
+    hist_dir = self._history_dir()
+    cache = self._conv_meta_cache
+    seen = set()
+    with os.scandir(hist_dir) as entries:
+        for entry in entries:
+            fname = entry.name
+            if not fname.endswith(".json") or fname.endswith(CONVERSATION_META_SUFFIX):
+                continue
+            fpath = entry.path
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            seen.add(fpath)
+            cached = cache.get(fpath)
+            if cached and cached[0] == mtime:
+                results.append(cached[1])
+                continue
+            try:
+                meta = _read_conversation_meta(fpath, mtime)
+            except Exception:
+                cache.pop(fpath, None)
+                continue
+            cache[fpath] = (mtime, meta)
+            results.append(meta)
+    for stale in set(cache) - seen:
+        del cache[stale]
     results.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
-    return results
+    return [dict(item) for item in results]
 
 
 def clear_context(self):
-    self.save_conversation()
-    while self.chat_layout.count():
-        child = self.chat_layout.takeAt(0)
-        if child.widget():
-            child.widget().deleteLater()
+    self._do_save_conversation()
+    self._set_chat_updates_enabled(False)
+    try:
+        self._clear_chat_widgets()
+    finally:
+        self._set_chat_updates_enabled(True)
     self.messages = []
+    self._last_user_idx = None
     self._reset_agent_run_state()
     self._reset_guided_takeoff(None)
     self._session_change_log = []
-    import uuid
     self.conversation_id = str(uuid.uuid4())[:8]
     log.info("Context cleared. New Conversation ID: %s", self.conversation_id)
     self.project_tracker_changed.emit()
@@ -206,12 +371,19 @@ __all__ = [
     "select_attachment",
     "add_attachment",
     "remove_attachment",
+    "_on_attachment_chip_closed",
     "_refresh_attachments_ui",
     "_history_dir",
     "_conversation_file",
+    "_conversation_meta_file",
     "_derive_title",
     "save_conversation",
+    "flush_conversation_save",
+    "_wait_for_background_save",
+    "_save_conversation_in_background",
+    "_do_save_conversation",
     "load_conversation",
+    "_render_restored_messages",
     "switch_conversation",
     "list_conversations",
     "clear_context",
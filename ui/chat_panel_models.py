@@ -1,8 +1,12 @@
+import re
+
 from PySide6.QtCore import Qt
 
 from core.ai_client import AIClient
 from core.settings import SettingsManager
 
+_MODEL_DATE_SUFFIX_RE = re.compile(r'-\d{8,}$')
+
 
 def _short_model_name(full: str) -> str:
     """Turn '[OpenRouter] anthropic/claude-opus-4-20250514' into 'claude-opus-4'."""
@@ -11,8 +15,7 @@ def _short_model_name(full: str) -> str:
         name = name.split("]", 1)[1].strip()
     if "/" in name:
         name = name.rsplit("/", 1)[1]
-    import re as _re
-    return _re.sub(r'-\d{8,}$', '', name)
+    return _MODEL_DATE_SUFFIX_RE.sub('', name)
 
 
 def _recommended_benchmark_model() -> str:
@@ -1,6 +1,9 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-from PySide6.QtCore import QThread
+from PySide6.QtCore import QThread, QTimer
 from PySide6.QtWidgets import QMessageBox
 
 from core.agent_tools import get_project_root
@@ -12,6 +15,60 @@ from ui.widgets.chat_items import ProgressItem
 log = logging.getLogger(__name__)
 
 
+AI_FLUSH_INTERVAL_MS = 50  # minimum gap between streamed repaints
+AUTO_INDEX_RETRY_MS = 5000  # auto-indexing waits while an agent turn is running
+# After a failed ingest, chat messages skip RAG for this long instead of
+# re-embedding and retrying both transports on every message.
+RAG_INGEST_RETRY_SECONDS = 60.0
+
+# RAG ingestion embeds text and talks to the vector engine; run it on one
+# shared background thread so it never blocks the UI and stays in order.
+_rag_ingest_executor = None
+
+
+def _rag_ingest_pool() -> ThreadPoolExecutor:
+    global _rag_ingest_executor
+    if _rag_ingest_executor is None:
+        _rag_ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vox-rag-ingest")
+    return _rag_ingest_executor
+
+
+class _RagIngestBackoff:
+    """Failure pause shared with the ingest thread, which never sees the panel itself."""
+
+    __slots__ = ("paused_until",)
+
+    def __init__(self):
+        self.paused_until = 0.0  # monotonic time
+
+    def paused(self) -> bool:
+        return time.monotonic() < self.paused_until
+
+
+def _run_rag_ingest(ingest, role, text, conversation_id, backoff):
+    if backoff.paused():
+        return  # queued before an earlier message failed
+    try:
+        ok = ingest(role, text, conversation_id) is not False
+    except Exception as e:
+        log.error("Failed to ingest %s message into RAG: %s", role, e)
+        ok = False
+    if not ok:
+        backoff.paused_until = time.monotonic() + RAG_INGEST_RETRY_SECONDS
+
+
+def _ingest_rag_message(self, role: str, text: str):
+    """Queue a chat message for RAG ingestion without blocking the GUI thread."""
+    if not self._rag_enabled() or not text.strip():
+        return
+    if self._rag_ingest_backoff.paused():
+        log.debug("RAG ingest paused after a failure; skipping %s message", role)
+        return
+    _rag_ingest_pool().submit(
+        _run_rag_ingest, self.rag_client.ingest_message, role, text, self.conversation_id, self._rag_ingest_backoff
+    )
+
+
 def _reset_agent_run_state(self):
     self._tool_action_log = []
     self._run_tool_calls = []
@@ -62,7 +119,7 @@ def _track_background_thread(self, thread):
     if thread is None or thread in self._live_background_threads:
         return
     self._live_background_threads.append(thread)
-    thread.finished.connect(lambda t=thread: self._forget_background_thread(t))
+    thread.finished.connect(partial(self._forget_background_thread, thread))
 
 
 def _forget_background_thread(self, thread):
@@ -134,19 +191,72 @@ def _shutdown_background_threads(self):
     self._live_background_threads = []
 
 
+def _get_current_ai_response(self) -> str:
+    chunks = getattr(self, "_ai_chunks", None)
+    if not chunks:
+        return ""
+    if len(chunks) > 1:
+        # Collapse once per read so repeated reads between chunks are free.
+        chunks[:] = ["".join(chunks)]
+    return chunks[0]
+
+
+def _set_current_ai_response(self, text: str):
+    self._ai_chunks = [text] if text else []
+
+
 def handle_ai_chunk(self, chunk):
-    self.current_ai_response += chunk
+    self._ai_chunks.append(chunk)
     self._ai_text_dirty = True
-    if not self._ai_update_timer.isActive():
-        self._ai_update_timer.start()
+    if self._ai_update_timer.isActive():
+        return
+    # Paint straight away after a quiet spell; otherwise coalesce the burst
+    # until AI_FLUSH_INTERVAL_MS has passed since the previous repaint.
+    wait_ms = AI_FLUSH_INTERVAL_MS - int((time.monotonic() - self._last_ai_flush) * 1000)
+    if wait_ms <= 0:
+        self._flush_ai_text()
+    else:
+        self._ai_update_timer.start(wait_ms)
+
+
+def _streaming_preview(self, text: str, max_chars: int = 1200, max_lines: int = 45) -> str:
+    """Incremental equivalent of _compact_for_display for the growing stream buffer.
+
+    Line counts up to the last newline already seen are carried between
+    flushes, and the visible head only depends on a bounded prefix, so each
+    flush costs O(new chunk) instead of re-splitting the whole response.
+    """
+    if not text or (len(text) <= max_chars and text.count("\n") < max_lines):
+        return text
+    boundary, complete_lines = self._stream_preview_lines
+    if boundary > len(text):
+        boundary, complete_lines = 0, 0
+    last_break = text.rfind("\n", boundary)
+    if last_break >= 0:
+        # Splitting right after a "\n" never separates a line terminator, so
+        # line counts on either side of the boundary simply add up.
+        complete_lines += len(text[boundary:last_break + 1].splitlines())
+        boundary = last_break + 1
+    self._stream_preview_lines = (boundary, complete_lines)
+    total_lines = complete_lines + len(text[boundary:].splitlines())
+    if total_lines <= max_lines and len(text) <= max_chars:
+        return text
+    compact = "\n".join(text[:2 * (max_chars + max_lines)].splitlines()[:max_lines])
+    if len(compact) > max_chars:
+        compact = compact[:max_chars].rstrip()
+    hidden_lines = max(0, total_lines - max_lines)
+    hidden_chars = max(0, len(text) - len(compact))
+    compact += f"\n\n...[{hidden_lines} lines / {hidden_chars} chars hidden in chat view]..."
+    return compact
 
 
 def _flush_ai_text(self):
     """Push accumulated AI text to the widget (called by timer)."""
     if self._ai_text_dirty and self.current_ai_item:
-        preview = self._compact_for_display(self.current_ai_response, max_chars=1200, max_lines=45)
+        preview = self._streaming_preview(self.current_ai_response)
         self.current_ai_item.set_text(preview)
         self._ai_text_dirty = False
+        self._last_ai_flush = time.monotonic()
         if self._auto_scroll:
             self._scroll_to_bottom()
 
@@ -253,7 +363,7 @@ def _start_tool_execution(self, tools):
     tool_worker.finished.connect(tool_thread.quit)
     tool_worker.finished.connect(tool_worker.deleteLater)
     tool_thread.finished.connect(tool_thread.deleteLater)
-    tool_thread.finished.connect(lambda t=tool_thread, w=tool_worker: self._clear_tool_refs(t, w))
+    tool_thread.finished.connect(partial(self._clear_tool_refs, tool_thread, tool_worker))
 
     tool_thread.start()
 
@@ -298,6 +408,15 @@ def _handle_confirmation(self, description):
         self.tool_worker.approve(reply == QMessageBox.Yes)
 
 
+def _log_indexing_done():
+    log.info("Auto-indexing finished.")
+
+
+def prime_project_files(self):
+    """Build the structure-prompt file listing for the current project in the background."""
+    self._file_listing.prime(get_project_root())
+
+
 def start_auto_indexing(self):
     """Starts the indexing process in the background."""
     if getattr(self, '_shutting_down', False):
@@ -306,6 +425,10 @@ def start_auto_indexing(self):
     if not self._rag_enabled():
         log.info("Auto-indexing skipped because RAG is disabled.")
         return
+    if self.is_processing:
+        log.debug("Auto-indexing postponed until the current agent turn finishes.")
+        QTimer.singleShot(AUTO_INDEX_RETRY_MS, self.start_auto_indexing)
+        return
     log.info("Starting auto-indexing...")
     root = get_project_root()
 
@@ -320,10 +443,10 @@ def start_auto_indexing(self):
     indexing_worker.finished.connect(indexing_thread.quit)
     indexing_worker.finished.connect(indexing_worker.deleteLater)
     indexing_thread.finished.connect(indexing_thread.deleteLater)
-    indexing_thread.finished.connect(lambda t=indexing_thread, w=indexing_worker: self._clear_indexing_refs(t, w))
-    indexing_thread.finished.connect(lambda: log.info("Auto-indexing finished."))
+    indexing_thread.finished.connect(partial(self._clear_indexing_refs, indexing_thread, indexing_worker))
+    indexing_thread.finished.connect(_log_indexing_done)
 
     indexing_thread.start()
 
 
-__all__ = [name for name in globals() if name.startswith("_") or name in {"handle_ai_chunk", "handle_ai_usage", "handle_stop_button", "start_auto_indexing"}]
\ No newline at end of file
+__all__ = [name for name in globals() if name.startswith("_") or name in {"handle_ai_chunk", "handle_ai_usage", "handle_stop_button", "prime_project_files", "start_auto_indexing"}]
\ No newline at end of file
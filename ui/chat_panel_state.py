@@ -220,12 +220,18 @@ def _on_user_scroll(self, value):
 
 def _scroll_to_bottom(self):
     self._auto_scroll = True
-    QTimer.singleShot(0, self._do_deferred_scroll)
+    # Share the pending deferred scroll with _on_scroll_range_changed so a
+    # burst of flushes costs one scrollbar update per event-loop turn.
+    if not self._scroll_pending:
+        self._scroll_pending = True
+        QTimer.singleShot(0, self._do_deferred_scroll)
 
 
 def _compact_for_display(text: str, max_chars: int = 1400, max_lines: int = 40) -> str:
     if not text:
         return text
+    if len(text) <= max_chars and text.count("\n") < max_lines:
+        return text
     lines = text.splitlines()
     over_lines = len(lines) > max_lines
     over_chars = len(text) > max_chars
@@ -241,24 +247,47 @@ def _compact_for_display(text: str, max_chars: int = 1400, max_lines: int = 40)
     return compact
 
 
+_FENCE_LANG_RE = re.compile(r"[\w-]*")
+
+
+def _hide_code_fences(text: str) -> str:
+    """Replace closed ```lang fenced blocks with a one-line placeholder.
+
+    A forward str.find scan instead of a DOTALL regex over the whole reply,
+    since this runs on every streamed flush of the assistant message.
+    """
+    if "```" not in text:
+        return text
+    parts = []
+    pos = search = 0
+    while True:
+        start = text.find("```", search)
+        if start < 0:
+            break
+        newline = text.find("\n", start + 3)
+        if newline < 0:
+            break
+        lang = text[start + 3:newline]
+        if not _FENCE_LANG_RE.fullmatch(lang):
+            search = start + 1
+            continue
+        end = text.find("```", newline + 1)
+        if end < 0:
+            break
+        lines = text.count("\n", newline + 1, end) + 1
+        parts.append(text[pos:start])
+        parts.append(f"\n```{lang or 'code'}\n[code block hidden: {lines} lines]\n```")
+        pos = search = end + 3
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
 def _compact_assistant_display(self, text: str) -> str:
-    import re as _re
     if not text:
         return text
-
-    def _repl(match):
-        block = match.group(0)
-        content = block[3:-3]
-        lang = ""
-        if "\n" in content:
-            lang = content.split("\n", 1)[0].strip()
-        body = content.split("\n", 1)[1] if "\n" in content else content
-        lines = max(1, body.count("\n") + 1)
-        label = lang or "code"
-        return f"\n```{label}\n[code block hidden: {lines} lines]\n```"
-
-    compact = _re.sub(r"```[\w-]*\n.*?```", _repl, text, flags=_re.DOTALL)
-    return self._compact_for_display(compact, max_chars=1800, max_lines=60)
+    return self._compact_for_display(_hide_code_fences(text), max_chars=1800, max_lines=60)
 
 
 def _is_siege_mode(self) -> bool:
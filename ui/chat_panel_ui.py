@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 
 from PySide6.QtCore import QEvent, Qt
 from PySide6.QtWidgets import QHBoxLayout, QSizePolicy, QWidget
@@ -24,6 +25,8 @@ def refresh_appearance(self):
 def on_model_changed(self, _display_text):
     full = self._get_full_model_name()
     if full:
+        if full == self.settings_manager.get_selected_model():
+            return
         self.settings_manager.set_selected_model(full)
         self._refresh_model_combo_tooltip()
         log.info("Model switched to: %s", full)
@@ -59,38 +62,69 @@ def _add_chat_widget(self, widget, before_widget=None):
     row_layout.addStretch(1)
     widget._chat_row = row
 
-    if before_widget is not None and hasattr(before_widget, "_chat_row"):
-        idx = self.chat_layout.indexOf(before_widget._chat_row)
-        if idx >= 0:
-            self.chat_layout.insertWidget(idx, row)
-        else:
-            self.chat_layout.addWidget(row)
+    rows = self._rendered_rows
+    before_row = getattr(before_widget, "_chat_row", None)
+    idx = self.chat_layout.indexOf(before_row) if before_row is not None else -1
+    if idx >= 0:
+        self.chat_layout.insertWidget(idx, row)
+        # Keep the prune order in step with the layout order.
+        try:
+            rows.insert(rows.index(before_row), row)
+        except ValueError:
+            rows.append(row)
     else:
         self.chat_layout.addWidget(row)
+        rows.append(row)
     self._prune_chat_widgets()
 
 
+def _set_chat_updates_enabled(self, enabled: bool):
+    """Suspend/resume chat repaints so bulk widget churn costs a single redraw."""
+    self.chat_content.setUpdatesEnabled(enabled)
+    self.scroll_area.viewport().setUpdatesEnabled(enabled)
+    if enabled:
+        self.chat_content.update()
+
+
 def _prune_chat_widgets(self):
     """Limit rendered widgets to keep long conversations responsive."""
-    while self.chat_layout.count() > self.MAX_RENDERED_MESSAGES:
-        child = self.chat_layout.takeAt(0)
-        widget = child.widget()
-        if widget:
-            active_row = getattr(self.current_ai_item, "_chat_row", None)
-            if active_row is not None and widget is active_row:
-                self.chat_layout.insertWidget(0, widget)
-                break
-            widget.deleteLater()
+    rows = self._rendered_rows
+    while len(rows) > self.MAX_RENDERED_MESSAGES:
+        oldest = rows.popleft()
+        active_row = getattr(self.current_ai_item, "_chat_row", None)
+        if active_row is not None and oldest is active_row:
+            rows.appendleft(oldest)
+            break
+        self.chat_layout.removeWidget(oldest)
+        oldest.deleteLater()
+
+
+def _clear_chat_widgets(self):
+    """Remove every rendered chat row.
+
+    Rows are moved onto one hidden container that is deleted as a whole, so
+    the event queue gets a single deferred delete instead of one per row.
+    """
+    graveyard = QWidget(self)  # parented so Qt, not Python GC, decides when it dies
+    graveyard.hide()
+    for index in range(self.chat_layout.count() - 1, -1, -1):
+        widget = self.chat_layout.takeAt(index).widget()
+        if widget is not None:
+            widget.setParent(graveyard)
+    graveyard.deleteLater()
+    self._rendered_rows.clear()
 
 
 def _regenerate_last(self):
     """Re-send the last user message to get a fresh AI response."""
     if self.is_processing:
         return
-    for message in reversed(self.messages):
+    for index in range(len(self.messages) - 1, -1, -1):
+        message = self.messages[index]
         if message["role"] == "user" and not message["content"].startswith("[TOOL_RESULT]"):
             while self.messages and self.messages[-1]["role"] != "user":
                 self.messages.pop()
+            self._last_user_idx = index
             self.is_processing = True
             self._reset_agent_run_state()
             self._set_stop_button()
@@ -102,8 +136,13 @@ def add_message(self, role, text):
     """Public API for adding messages (compatibility wrapper)."""
     self.append_message_widget(role, text)
     self.messages.append({"role": role, "content": text})
+    if role == "user":
+        self._last_user_idx = len(self.messages) - 1
 
 
+# Older tool results are replayed in compact form on every agent turn; the
+# same strings come back each tool-loop cycle, so memoise the compaction.
+@lru_cache(maxsize=256)
 def _compact_tool_result_text_for_ai(text: str, max_items: int = 6, max_excerpt_chars: int = 500, max_excerpt_lines: int = 12) -> str:
     raw_text = str(text or "")
     if "[TOOL_RESULT]" not in raw_text:
@@ -157,7 +196,7 @@ def _is_tool_result_message(msg) -> bool:
 def _message_for_ai(msg, compact_tool_result: bool = False):
     content = msg.get("payload_content", msg.get("content", ""))
     if compact_tool_result:
-        content = _compact_tool_result_text_for_ai(content)
+        content = _compact_tool_result_text_for_ai(content if isinstance(content, str) else str(content))
     return {
         "role": msg.get("role", "user"),
         "content": content,
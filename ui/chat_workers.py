@@ -1,7 +1,12 @@
+import base64
 import html
 import logging
 import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
 
 from PySide6.QtCore import QObject, QThread, Signal
 
@@ -10,28 +15,289 @@ from core.agent_tools import AgentToolHandler
 from core.rag_client import RAGClient
 from core.settings import SettingsManager
 from core.tool_policy import ToolPolicy
+from ui.project_file_index import _scan_project_files
 
 
 log = logging.getLogger(__name__)
 
 
+MAX_ATTACH_CHARS = 16000
+IMAGE_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+_IMAGE_READ_CHUNK = 3 * 21845  # ~64 KiB, a multiple of 3 so chunks encode without padding
+IMAGE_CACHE_MAX_BYTES = 4 * 1024 * 1024  # larger images are re-encoded rather than kept in memory
+
+
+def _image_data_url(path: str, mime: str, size: int | None = None) -> str:
+    """Base64-encode an image file straight into a ``data:`` URL.
+
+    The output buffer is sized up front from the file size (4 bytes per
+    3-byte group) and filled chunk by chunk, so it is never reallocated while
+    encoding. Pass ``size`` when the caller already stat'ed the file.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    prefix = f"data:{mime};base64,".encode("ascii")
+    buf = bytearray(len(prefix) + (size + 2) // 3 * 4)
+    buf[:len(prefix)] = prefix
+    pos = len(prefix)
+    with open(path, "rb") as image_file:
+        while True:
+            chunk = image_file.read(_IMAGE_READ_CHUNK)
+            if not chunk:
+                break
+            encoded = base64.b64encode(chunk)
+            buf[pos:pos + len(encoded)] = encoded
+            pos += len(encoded)
+    # The file may have changed size since it was stat'ed.
+    del buf[pos:]
+    return buf.decode("ascii")
+
+
+@lru_cache(maxsize=8)
+def _cached_image_data_url(path: str, mime: str, size: int, mtime_ns: int) -> str:
+    """``_image_data_url`` memoised per file version; ``mtime_ns`` only keys the cache."""
+    return _image_data_url(path, mime, size=size)
+
+
+def _decode_attachment_chunk(data: bytes) -> str:
+    # Mirror text-mode reads: utf-8 with replacement and universal newlines.
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _read_text_attachment(path: str, max_attach: int = MAX_ATTACH_CHARS, size: int | None = None) -> str:
+    """Read a text attachment, keeping only the head and tail of oversized files.
+
+    ``max_attach`` caps the file size in bytes, not decoded characters.
+    Large files are never loaded whole: only the bytes that survive the
+    truncation are read from disk. Pass ``size`` when the caller already
+    stat'ed the file.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    if size <= max_attach:
+        # One raw read and a single C-level decode beat a TextIOWrapper pass.
+        with open(path, "rb") as file_handle:
+            return _decode_attachment_chunk(file_handle.read())
+    keep_head = int(max_attach * 0.8)
+    keep_tail = max_attach - keep_head
+    with open(path, "rb") as file_handle:
+        head = file_handle.read(keep_head)
+        file_handle.seek(size - keep_tail)
+        tail = file_handle.read(keep_tail)
+    # Cut on line boundaries (in bytes, so UTF-8 sequences stay whole) unless
+    # that would throw away more than half of the kept slice.
+    cut = head.rfind(b"\n")
+    if cut >= keep_head // 2:
+        head = head[:cut].rstrip(b"\r")
+    cut = tail.find(b"\n")
+    if 0 <= cut < keep_tail // 2:
+        tail = tail[cut + 1:]
+    truncated = size - len(head) - len(tail)
+    return (
+        _decode_attachment_chunk(head)
+        + f"\n\n... [{truncated} bytes truncated] ...\n\n"
+        + _decode_attachment_chunk(tail)
+    )
+
+
+_diff_executor = None
+
+
+def _diff_pool() -> ThreadPoolExecutor:
+    global _diff_executor
+    if _diff_executor is None:
+        _diff_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vox-diff")
+    return _diff_executor
+
+
+TOOL_READ_WORKERS = 8  # independent read-only tool calls run this wide
+_read_executor = None
+
+
+def _read_pool() -> ThreadPoolExecutor:
+    global _read_executor
+    if _read_executor is None:
+        _read_executor = ThreadPoolExecutor(max_workers=TOOL_READ_WORKERS, thread_name_prefix="vox-tool-read")
+    return _read_executor
+
+
+PROJECT_STRUCTURE_TTL = 30.0  # seconds before the cached project listing is rebuilt
+CHARS_PER_TOKEN = 4  # usage fallback while tiktoken loads, or when it is missing or does not know the model
+IMAGE_TOKENS = 765  # flat per-image usage estimate; base64 data URLs are never tokenized
+
+
+_tiktoken_executor = None
+_tiktoken_encodings = {}  # model selection -> encoding, or None while loading / unavailable
+
+
+def _tiktoken_pool() -> ThreadPoolExecutor:
+    global _tiktoken_executor
+    if _tiktoken_executor is None:
+        _tiktoken_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vox-tiktoken")
+    return _tiktoken_executor
+
+
+def _load_tiktoken_encoding(model: str):
+    name = model.rsplit("]", 1)[-1].strip().rsplit("/", 1)[-1]
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(name)
+    except Exception:  # not installed, unknown model, or BPE files unavailable offline
+        encoding = None
+    _tiktoken_encodings[model] = encoding
+
+
+def _tiktoken_encoding(model: str):
+    """tiktoken encoding for a ``[Provider] vendor/model`` selection, or ``None``.
+
+    ``encoding_for_model`` may download BPE files on first use, so the load
+    runs on a background thread and callers get ``None`` until it lands.
+    """
+    if model not in _tiktoken_encodings:
+        _tiktoken_encodings[model] = None
+        _tiktoken_pool().submit(_load_tiktoken_encoding, model)
+    return _tiktoken_encodings[model]
+
+
+def _count_tokens(text: str, model: str) -> int:
+    encoding = _tiktoken_encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _count_content_tokens(content, model: str) -> int:
+    """Token count for a message ``content``; multimodal lists count text parts only."""
+    if not isinstance(content, list):
+        return _count_tokens(str(content or ""), model)
+    total = 0
+    for part in content:
+        if not isinstance(part, dict):
+            continue
+        if part.get("type") == "text":
+            total += _count_tokens(part.get("text") or "", model)
+        elif part.get("type") == "image_url":
+            total += IMAGE_TOKENS
+    return total
+
+
+@lru_cache(maxsize=64)
+def _resolve_cwd_placeholder(content: str, cwd: str) -> str:
+    """Fill ``{cwd_path}`` in a system prompt; the same prompts recur every turn."""
+    if "{cwd_path}" in content:
+        return content.replace("{cwd_path}", cwd)
+    return content
+
+
+def _format_code_search_hit(index: int, chunk, preview_limit: int) -> str:
+    """One search_codebase result block; ``file:<ns>:<path>:<lines>`` ids show their path."""
+    parts = chunk.doc_id.split(":", 3)
+    location = parts[2] if len(parts) >= 3 else chunk.doc_id
+    lines = f"Lines: {chunk.start_line}-{chunk.end_line}\n" if chunk.start_line > 0 else ""
+    preview = chunk.content.strip()
+    if len(preview) > preview_limit:
+        preview = preview[:preview_limit] + "...(truncated)"
+    return f"\n--- Result {index} (File) | Score: {chunk.score:.4f} ---\nLocation: {location}\n{lines}Content:\n{preview}\n"
+
+
+def _format_project_structure(cwd: str, files: list[str], max_files: int) -> str:
+    file_list_str = "\n".join(files[:max_files])
+    if len(files) > max_files:
+        file_list_str += f"\n...({len(files) - max_files} more)"
+    return f"Project: {cwd} ({len(files)} files)\n{file_list_str}\nUse <list_files /> for full listing."
+
+
+def build_attachment_payload(user_text: str, attachments) -> tuple[str, object]:
+    """Read attachments and return ``(text_body, content_payload)`` for a user turn.
+
+    Text files are inlined into the text body; images become ``image_url``
+    parts, which turns the payload into a multimodal list.
+    """
+    text_body = user_text
+    image_parts = []
+
+    for att_path in attachments:
+        # One stat proves the file exists, sizes the text truncation and versions cached images.
+        try:
+            st = os.stat(att_path)
+        except OSError:
+            log.warning("Attachment not found, skipping: %s", att_path)
+            continue
+        size = st.st_size
+        name = os.path.basename(att_path)
+        ext = os.path.splitext(name)[1].lower()
+        mime = IMAGE_MIME_TYPES.get(ext)
+        if mime is not None:
+            try:
+                if size <= IMAGE_CACHE_MAX_BYTES:
+                    # Re-sent images (follow-ups, regenerate) reuse the encoding until the file changes.
+                    url = _cached_image_data_url(att_path, mime, size, st.st_mtime_ns)
+                else:
+                    url = _image_data_url(att_path, mime, size=size)
+                image_parts.append({"type": "image_url", "image_url": {"url": url}})
+                log.debug("Attached image (%s): %s", mime, name)
+            except Exception as e:
+                log.error("Failed to load image %s: %s", att_path, e)
+        else:
+            try:
+                file_content = _read_text_attachment(att_path, size=size)
+                text_body += f"\n\n[FILE: {name}]\n{file_content}\n[/FILE]"
+                log.debug("Attached text file (%d chars): %s", len(file_content), name)
+            except Exception as e:
+                log.error("Failed to read attachment %s: %s", att_path, e)
+
+    if image_parts:
+        if not text_body:
+            # An image-only turn needs no (empty) text block.
+            log.debug("Sending multimodal payload: %d images", len(image_parts))
+            return text_body, image_parts
+        log.debug("Sending multimodal payload: 1 text block + %d images", len(image_parts))
+        return text_body, [{"type": "text", "text": text_body}, *image_parts]
+    log.debug("Sending plain-text payload (%d chars)", len(text_body))
+    return text_body, text_body
+
+
 class AIWorker(QObject):
     chunk_received = Signal(str)
     usage_received = Signal(dict)
     model_selected = Signal(str, str)
+    history_enriched = Signal(str, str, object)
     finished = Signal()
 
-    def __init__(self, message_history, model):
+    def __init__(self, message_history, model, attachments=None, project_files=None):
         super().__init__()
         self.message_history = message_history
         self.model = model
+        self.attachments = list(attachments or [])
+        self.project_files = project_files  # pre-built listing from ProjectFileIndex, if any
         self.client = None
         self.settings = SettingsManager()
 
     _cached_structure: str = ""
     _cached_root: str = ""
+    _cached_at: float = 0.0
+
+    def _load_attachments(self):
+        """Build the attachment payload for the trailing user message off the GUI thread."""
+        for idx in range(len(self.message_history) - 1, -1, -1):
+            msg = self.message_history[idx]
+            if msg.get("role") == "user":
+                user_text = msg.get("content") or ""
+                text_body, content_payload = build_attachment_payload(user_text, self.attachments)
+                self.message_history[idx] = {"role": "user", "content": content_payload}
+                self.history_enriched.emit(user_text, text_body, content_payload)
+                return
 
     def run(self):
+        _tiktoken_encoding(self.model)  # warm up usage counting while the turn streams
+        if self.attachments:
+            self._load_attachments()
         requested_model = self.model
         self.client = AIClient(selected_full_model=self.model, settings_manager=self.settings)
         log.info("AIWorker starting | requested_model=%s effective_model=%s", requested_model, self.model)
@@ -40,45 +306,43 @@ class AIWorker(QObject):
         project_root = get_project_root()
         cwd = project_root.replace("\\", "/")
 
-        if AIWorker._cached_root != project_root:
-            try:
-                files = []
-                skip = {".git", "__pycache__", "node_modules", ".venv", "venv", "storage", ".vox", "dist", "build"}
-                for root, dirs, filenames in os.walk(project_root):
-                    dirs[:] = [d for d in dirs if d not in skip]
-                    for f in filenames:
-                        files.append(os.path.relpath(os.path.join(root, f), project_root))
-
-                stop_idx = min(self.settings.get_max_file_list(), 30)
-                file_list_str = "\n".join(files[:stop_idx])
-                if len(files) > stop_idx:
-                    file_list_str += f"\n...({len(files) - stop_idx} more)"
-                AIWorker._cached_structure = f"Project: {cwd} ({len(files)} files)\n{file_list_str}\nUse <list_files /> for full listing."
-                AIWorker._cached_root = project_root
-            except Exception as e:
-                log.error("Structure injection error: %s", e)
-                AIWorker._cached_structure = f"Project: {cwd}"
+        max_files = min(self.settings.get_max_file_list(), 30)
+        if self.project_files is not None:
+            structure = _format_project_structure(cwd, self.project_files, max_files)
+        else:
+            now = time.monotonic()
+            if AIWorker._cached_root != project_root or now - AIWorker._cached_at > PROJECT_STRUCTURE_TTL:
+                try:
+                    files = _scan_project_files(project_root)
+                    AIWorker._cached_structure = _format_project_structure(cwd, files, max_files)
+                    AIWorker._cached_root = project_root
+                    AIWorker._cached_at = now
+                except Exception as e:
+                    log.error("Structure injection error: %s", e)
+                    AIWorker._cached_structure = f"Project: {cwd}"
+            structure = AIWorker._cached_structure
 
-        final_messages = [{"role": "system", "content": AIWorker._cached_structure}]
+        final_messages = [{"role": "system", "content": structure}]
         for msg in self.message_history:
             if msg.get("role") == "system":
                 content = msg["content"]
-                if "{cwd_path}" in content:
-                    content = content.replace("{cwd_path}", cwd)
-                final_messages.append({"role": "system", "content": content})
+                resolved = _resolve_cwd_placeholder(content, cwd)
+                # Only prompts that carry the placeholder need a rewritten copy.
+                final_messages.append(msg if resolved is content else {"role": "system", "content": resolved})
             else:
                 final_messages.append(msg)
 
         prompt_chars = sum(len(str(m.get("content", ""))) for m in final_messages)
-        est_prompt_tokens = prompt_chars // 4
-        log.info("AIWorker sending %d messages (~%d est. tokens) to %s", len(final_messages), est_prompt_tokens, self.model)
+        log.info("AIWorker sending %d messages (~%d est. tokens) to %s", len(final_messages), prompt_chars // CHARS_PER_TOKEN, self.model)
 
         api_usage = None
-        full_response = ""
+        thread = QThread.currentThread()
+        emit_chunk = self.chunk_received.emit
+        response_parts = []
         try:
             stream = self.client.stream_chat(final_messages)
             for chunk in stream:
-                if QThread.currentThread().isInterruptionRequested():
+                if thread.isInterruptionRequested():
                     log.info("AIWorker interrupted by user.")
                     break
                 if isinstance(chunk, dict):
@@ -86,31 +350,79 @@ class AIWorker(QObject):
                         api_usage = chunk["usage"]
                         self.usage_received.emit(api_usage)
                     continue
-                full_response += chunk
-                self.chunk_received.emit(chunk)
-                QThread.msleep(10)
+                response_parts.append(chunk)
+                emit_chunk(chunk)
         except Exception as e:
             log.error("AIWorker stream failed: %s", e)
             self.chunk_received.emit(f"\n[Error: {str(e)}]\n")
 
-        est_completion_tokens = len(full_response) // 4
+        full_response = "".join(response_parts)
         if api_usage is None:
-            self.usage_received.emit({
-                "prompt_tokens": est_prompt_tokens,
-                "completion_tokens": est_completion_tokens,
-                "total_tokens": est_prompt_tokens + est_completion_tokens,
-            })
+            # No provider in core/ reports usage, so this runs every turn; it
+            # waits for the stream so tokenizing never delays the first token.
+            prompt_tokens = sum(_count_content_tokens(m.get("content"), self.model) for m in final_messages)
+            completion_tokens = _count_tokens(full_response, self.model)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            self.usage_received.emit(usage)
+        else:
+            usage = api_usage
 
         log.info(
             "AIWorker done | prompt~%d completion~%d total~%d tokens | response_len=%d chars",
-            api_usage.get("prompt_tokens", est_prompt_tokens) if api_usage else est_prompt_tokens,
-            api_usage.get("completion_tokens", est_completion_tokens) if api_usage else est_completion_tokens,
-            (api_usage.get("total_tokens", 0) if api_usage else est_prompt_tokens + est_completion_tokens),
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+            usage.get("total_tokens", 0),
             len(full_response),
         )
         self.finished.emit()
 
 
+@dataclass(frozen=True)
+class _ToolSettings:
+    """Settings one ``ToolWorker.run`` reads, resolved once on the tool loop.
+
+    QSettings is not thread-safe, so pooled read-only calls use these plain
+    values instead of the worker's ``SettingsManager``.
+    """
+
+    policy: dict  # cmd -> (enabled, disabled_reason)
+    rag_enabled: bool
+    rag_top_k: int
+    rag_max_context: int
+    rag_max_chunk: int
+
+
+@dataclass
+class _ToolRun:
+    """Results one ``ToolWorker.run`` collects across its tool handlers."""
+
+    settings: _ToolSettings | None = None
+    tool_outputs: list[str] = field(default_factory=list)
+    successful_changes: list[str] = field(default_factory=list)
+    successful_actions: list[str] = field(default_factory=list)
+    failed_actions: list[str] = field(default_factory=list)
+    steps: list | None = None  # (signal, args) held back while running off the tool loop
+
+    def emit(self, signal, *args):
+        if self.steps is None:
+            signal.emit(*args)
+        else:
+            self.steps.append((signal, args))
+
+    def replay(self, into: "_ToolRun"):
+        """Emit held-back steps in order and fold the results into ``into``."""
+        for signal, args in self.steps or ():
+            into.emit(signal, *args)
+        into.tool_outputs.extend(self.tool_outputs)
+        into.successful_changes.extend(self.successful_changes)
+        into.successful_actions.extend(self.successful_actions)
+        into.failed_actions.extend(self.failed_actions)
+
+
 class ToolWorker(QObject):
     """Executes tool calls in a background thread."""
 
@@ -124,19 +436,83 @@ class ToolWorker(QObject):
 
     DESTRUCTIVE_CMDS = {'delete_file', 'execute_command', 'git_commit', 'git_push', 'git_pull', 'move_file'}
     FILE_WRITE_CMDS = {'write_file', 'edit_file'}
+    # Local, side-effect free and independent of each other, so adjacent calls run
+    # concurrently. Web tools stay sequential: they are rate limited and slow enough
+    # that their progress should show while they run.
+    READ_ONLY_CMDS = frozenset({
+        'list_files', 'read_file', 'read_json', 'read_python_symbols', 'find_tests',
+        'search_files', 'find_files', 'find_symbol', 'find_references', 'get_imports',
+        'find_importers', 'get_file_structure', 'search_memory', 'search_codebase',
+    })
+    INTERRUPTED_OUTPUT = "System: [Interrupted] Tool execution stopped by user."
 
     def __init__(self, tool_calls, auto_approve=False):
         super().__init__()
         self.tool_calls = tool_calls
         self.rag_client = RAGClient()
+        self.file_changed.connect(RAGClient.invalidate_query_cache)
         self.settings = SettingsManager()
         self.auto_approve = auto_approve
         self._approval_event = threading.Event()
         self._approved = False
+        self._prefetched_rag = {}  # (query, k) -> chunks from retrieve_batch
+        self._rag_lock = threading.Lock()  # RAGClient reads its own QSettings; one pooled retrieve at a time
+        self._diff_futures = []  # UI-only diffs computed off the tool loop
 
     def _rag_enabled(self) -> bool:
         return self.settings.get_rag_enabled()
 
+    @staticmethod
+    def _rag_search_k(cmd: str, top_k: int) -> int:
+        if cmd == 'search_codebase':
+            return min(100, max(top_k * 5, top_k + 20))
+        return top_k
+
+    def _resolve_settings(self) -> _ToolSettings:
+        """Read every setting this batch needs, on the calling (tool loop) thread."""
+        cmds = {call.get('cmd') for call in self.tool_calls}
+        return _ToolSettings(
+            policy={cmd: ToolPolicy.is_tool_enabled(cmd, self.settings) for cmd in cmds},
+            rag_enabled=self._rag_enabled(),
+            rag_top_k=self.settings.get_rag_top_k(),
+            rag_max_context=self.settings.get_rag_max_context(),
+            rag_max_chunk=self.settings.get_rag_max_chunk(),
+        )
+
+    def _prefetch_rag_searches(self, settings: _ToolSettings):
+        """Embeds all search queries of this batch together when there are several."""
+        if not settings.rag_enabled:
+            return
+        requests = []
+        for call in self.tool_calls:
+            cmd = call.get('cmd')
+            query = (call.get('args') or {}).get('query')
+            if cmd in ('search_memory', 'search_codebase') and query and settings.policy[cmd][0]:
+                requests.append((query, self._rag_search_k(cmd, settings.rag_top_k)))
+        if len(set(requests)) < 2:
+            return
+        self._prefetched_rag = self.rag_client.retrieve_batch(requests)
+
+    def _emit_diff_later(self, full_path: str, old_content: str, new_content: str, filename: str):
+        """Diff a completed write in the background; run() waits for it before finishing."""
+        self._diff_futures.append(_diff_pool().submit(self._emit_diff, full_path, old_content, new_content, filename))
+
+    def _emit_diff(self, full_path: str, old_content: str, new_content: str, filename: str):
+        try:
+            diff_text = AgentToolHandler.get_diff(old_content, new_content, filename)
+        except Exception as e:
+            log.debug("Diff generation failed for %s: %s", full_path, e)
+            return
+        if diff_text:
+            self.diff_generated.emit(full_path, diff_text)
+
+    def _retrieve(self, query: str, k: int):
+        chunks = self._prefetched_rag.pop((query, k), None)
+        if chunks is None:
+            with self._rag_lock:
+                chunks = self.rag_client.retrieve(query, k=k)
+        return chunks
+
     def approve(self, yes: bool):
         self._approved = yes
         self._approval_event.set()
@@ -188,509 +564,604 @@ class ToolWorker(QObject):
         return "\n".join(lines)
 
     def run(self):
-        tool_outputs = []
-        successful_changes = []
-        successful_actions = []
-        failed_actions = []
-        for call in self.tool_calls:
+        run = _ToolRun(settings=self._resolve_settings())
+        self._prefetch_rag_searches(run.settings)
+        calls = self.tool_calls
+        i = 0
+        while i < len(calls):
             if QThread.currentThread().isInterruptionRequested():
-                tool_outputs.append("System: [Interrupted] Tool execution stopped by user.")
+                run.tool_outputs.append(self.INTERRUPTED_OUTPUT)
                 break
-            cmd = call['cmd']
-            args = call['args']
-            enabled, disabled_reason = ToolPolicy.is_tool_enabled(cmd, self.settings)
-            if not enabled:
-                tool_outputs.append(f"System: [{cmd}] Skipped — {disabled_reason}")
-                failed_actions.append(f"{cmd}: {disabled_reason}")
-                self.step_finished.emit(f"{cmd} blocked", disabled_reason, "Skipped")
+            j = i
+            while j < len(calls) and calls[j]['cmd'] in self.READ_ONLY_CMDS:
+                j += 1
+            if j - i > 1:
+                if not self._run_read_only_calls(calls[i:j], run):
+                    run.tool_outputs.append(self.INTERRUPTED_OUTPUT)
+                    break
+                i = j
+            else:
+                self._run_call(calls[i], run)
+                i += 1
+        if self._diff_futures:
+            wait(self._diff_futures)
+            self._diff_futures = []
+        summary = self._build_action_summary(run.successful_changes, run.successful_actions, run.failed_actions)
+        # One join sizes and copies every output once; no intermediate body string.
+        self.finished.emit("\n\n".join([summary, *run.tool_outputs]))
+
+    def _run_read_only_calls(self, calls, run) -> bool:
+        """Run adjacent read-only calls concurrently; False if stopped part way.
+
+        Each call's steps are reported, in call order, as soon as it and every
+        call before it have finished, so progress rows still pair up. A stop
+        request cancels the calls that have not started yet.
+        """
+        thread = QThread.currentThread()
+        call_runs = [_ToolRun(settings=run.settings, steps=[]) for _ in calls]
+        futures = [
+            _read_pool().submit(self._run_pooled_call, thread, call, call_run)
+            for call, call_run in zip(calls, call_runs)
+        ]
+        completed = True
+        for future, call_run in zip(futures, call_runs):
+            if thread.isInterruptionRequested():
+                for pending in futures:
+                    pending.cancel()
+            if future.cancelled() or not future.result():
+                completed = False
                 continue
-            if cmd in self.DESTRUCTIVE_CMDS:
-                desc_map = {
-                    'delete_file': f"Delete: {args.get('path', '?')}",
-                    'execute_command': f"Run: {args.get('command', '?')}",
-                    'git_commit': f"Git commit: {args.get('message', '?')}",
-                    'git_push': f"Git push: {args.get('remote', 'origin')} {args.get('branch', '')}".strip(),
-                    'git_pull': f"Git pull: {args.get('remote', 'origin')} {args.get('branch', '')}".strip(),
-                    'move_file': f"Move: {args.get('src', '?')} -> {args.get('dst', '?')}",
-                }
-                if not self._request_approval(desc_map.get(cmd, cmd)):
-                    tool_outputs.append(f"System: [{cmd}] Skipped — user declined.")
-                    self.step_finished.emit(f"{cmd} declined", None, "Skipped")
-                    continue
-            try:
-                if cmd == 'list_files':
-                    path = args.get('path', '.')
-                    self.step_started.emit("📂", f"Listing files in {path}...")
-                    result = AgentToolHandler.list_files(path)
-                    tool_outputs.append(f"Listed files in '{path}':\n{result}")
-                    self.step_finished.emit(f"Listed files in: {path}", None, "Done")
-                elif cmd == 'read_file':
-                    path = args.get('path')
-                    try:
-                        start = int(args.get('start_line', 1))
-                    except (ValueError, TypeError):
-                        start = 1
-                    try:
-                        end = int(args.get('end_line', 300))
-                    except (ValueError, TypeError):
-                        end = 300
-                    with_line_numbers = str(args.get('with_line_numbers', 'false')).lower() == 'true'
-                    self.step_started.emit("📖", f"Reading {os.path.basename(path)}...")
-                    content = AgentToolHandler.read_file(path, start_line=start, end_line=end, with_line_numbers=with_line_numbers)
-                    tool_outputs.append(f"Read file '{path}':\n{content}")
-                    self.step_finished.emit(f"Read file: {path}", None, "Done")
-                elif cmd == 'read_json':
-                    path = args.get('path')
-                    query = args.get('query')
-                    try:
-                        max_chars = int(args.get('max_chars', 4000))
-                    except (ValueError, TypeError):
-                        max_chars = 4000
-                    self.step_started.emit("🧾", f"Inspecting JSON {os.path.basename(path)}...")
-                    result = AgentToolHandler.read_json(path, query=query, max_chars=max_chars)
-                    tool_outputs.append(f"JSON content for '{path}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"read_json: {path}" + (f" ({query})" if query else ""))
-                    else:
-                        failed_actions.append(f"read_json {path}: {result}")
-                    self.step_finished.emit(f"Read JSON: {path}", None, "Done" if success else "Failed")
-                elif cmd == 'read_python_symbols':
-                    path = args.get('path')
-                    symbols = args.get('symbols')
-                    with_line_numbers = str(args.get('with_line_numbers', 'true')).lower() == 'true'
-                    try:
-                        max_symbols = int(args.get('max_symbols', 5))
-                    except (ValueError, TypeError):
-                        max_symbols = 5
-                    self.step_started.emit("🧠", f"Reading Python symbols from {os.path.basename(path)}...")
-                    result = AgentToolHandler.read_python_symbols(path, symbols=symbols, with_line_numbers=with_line_numbers, max_symbols=max_symbols)
-                    tool_outputs.append(f"Python symbols from '{path}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"read_python_symbols: {path} ({symbols})")
-                    else:
-                        failed_actions.append(f"read_python_symbols {path}: {result}")
-                    self.step_finished.emit(f"Read Python symbols: {path}", None, "Done" if success else "Failed")
-                elif cmd == 'find_tests':
-                    query = args.get('query')
-                    source_path = args.get('source_path')
-                    root = args.get('root_dir', 'tests')
-                    try:
-                        max_results = int(args.get('max_results', 20))
-                    except (ValueError, TypeError):
-                        max_results = 20
-                    label = source_path or query
-                    self.step_started.emit("🧪", f"Finding tests for '{label}'...")
-                    result = AgentToolHandler.find_tests(query=query, source_path=source_path, root_dir=root, max_results=max_results)
-                    tool_outputs.append(f"Tests for '{label}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"find_tests: {label}")
-                    else:
-                        failed_actions.append(f"find_tests {label}: {result}")
-                    self.step_finished.emit(f"Found tests: {label}", None, "Done" if success else "Failed")
-                elif cmd == 'write_file':
-                    path = args.get('path')
-                    content = args.get('content')
-                    self.step_started.emit("📝", f"Writing {os.path.basename(path)}...")
-                    syntax_error = AgentToolHandler.validate_syntax(content, path)
-                    if syntax_error:
-                        tool_outputs.append(f"System: [Syntax Error] in '{path}':\n{syntax_error}")
-                        self.step_finished.emit(f"Syntax Error in {os.path.basename(path)}", syntax_error, "Failed")
-                        continue
-                    diff_text = None
-                    diff_str = "modified"
-                    full_path = AgentToolHandler.resolve_path(path)
-                    if os.path.exists(full_path):
-                        try:
-                            with open(full_path, 'r', encoding='utf-8') as f:
-                                old_content = f.read()
-                            diff_text = AgentToolHandler.get_diff(old_content, content, os.path.basename(path))
-                        except Exception:
-                            diff_text = "[Error generating diff]"
-                    else:
-                        diff_str = "new"
-                        diff_text = f"[New File]\n{content}"
-                    if not self.auto_approve and diff_text and "[Error" not in diff_text:
-                        self.change_proposed.emit(full_path, diff_text, content)
-                        if not self._request_approval(f"Write file: {path} ({diff_str})"):
-                            tool_outputs.append(f"System: [{cmd}] Write to '{path}' rejected by user.")
-                            self.step_finished.emit(f"Write {os.path.basename(path)} rejected", None, "Skipped")
-                            continue
-                    result = AgentToolHandler.write_file(path, content)
-                    tool_outputs.append(f"System: Wrote file '{path}' ({result})")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_changes.append(path)
-                        self.file_changed.emit(full_path)
-                    else:
-                        failed_actions.append(f"write_file {path}: {result}")
-                    if success and diff_text and "[Error" not in diff_text:
-                        self.diff_generated.emit(full_path, diff_text)
-                    self.step_finished.emit(f"Wrote {os.path.basename(path)} ({diff_str})", diff_text, "Done" if success else "Failed")
-                elif cmd == 'move_file':
-                    src = args.get('src')
-                    dst = args.get('dst')
-                    self.step_started.emit("➡️", f"Moving {os.path.basename(src)}...")
-                    result = AgentToolHandler.move_file(src, dst)
-                    tool_outputs.append(f"System: {result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_changes.append(f"{src} -> {dst}")
-                        self.file_changed.emit(AgentToolHandler.resolve_path(dst))
-                    else:
-                        failed_actions.append(f"move_file {src} -> {dst}: {result}")
-                    self.step_finished.emit(f"Moved {src} to {dst}", None, "Done" if success else "Failed")
-                elif cmd == 'copy_file':
-                    src = args.get('src')
-                    dst = args.get('dst')
-                    self.step_started.emit("📋", f"Copying {os.path.basename(src)}...")
-                    result = AgentToolHandler.copy_file(src, dst)
-                    tool_outputs.append(f"System: {result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_changes.append(f"{src} -> {dst}")
-                        self.file_changed.emit(AgentToolHandler.resolve_path(dst))
-                    else:
-                        failed_actions.append(f"copy_file {src} -> {dst}: {result}")
-                    self.step_finished.emit(f"Copied {src} to {dst}", None, "Done" if success else "Failed")
-                elif cmd == 'delete_file':
-                    path = args.get('path')
-                    self.step_started.emit("🗑️", f"Deleting {os.path.basename(path)}...")
-                    result = AgentToolHandler.delete_file(path)
-                    tool_outputs.append(f"System: {result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_changes.append(path)
-                        self.file_changed.emit(AgentToolHandler.resolve_path(path))
-                    else:
-                        failed_actions.append(f"delete_file {path}: {result}")
-                    self.step_finished.emit(f"Deleted {path}", None, "Done" if success else "Failed")
-                elif cmd == 'search_files':
-                    query = args.get('query')
-                    root = args.get('root_dir', '.')
-                    file_pattern = args.get('file_pattern')
-                    case_insensitive = str(args.get('case_insensitive', 'false')).lower() == 'true'
-                    try:
-                        context_lines = int(args.get('context_lines', 0))
-                    except (ValueError, TypeError):
-                        context_lines = 0
-                    try:
-                        max_results = int(args.get('max_results', 100))
-                    except (ValueError, TypeError):
-                        max_results = 100
-                    self.step_started.emit("🔍", f"Searching '{query}'...")
-                    result = AgentToolHandler.search_files(query, root, file_pattern=file_pattern, case_insensitive=case_insensitive, context_lines=context_lines, max_results=max_results)
-                    tool_outputs.append(f"Search Results for '{query}':\n{result}")
-                    self.step_finished.emit(f"Searched for '{query}'", None, "Done")
-                elif cmd == 'find_files':
-                    pattern = args.get('pattern')
-                    root = args.get('root_dir', '.')
-                    case_insensitive = str(args.get('case_insensitive', 'false')).lower() == 'true'
-                    try:
-                        max_results = int(args.get('max_results', 100))
-                    except (ValueError, TypeError):
-                        max_results = 100
-                    self.step_started.emit("🧭", f"Finding files matching '{pattern}'...")
-                    result = AgentToolHandler.find_files(pattern, root_dir=root, case_insensitive=case_insensitive, max_results=max_results)
-                    tool_outputs.append(f"Found Files for '{pattern}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"find_files: {pattern}")
-                    else:
-                        failed_actions.append(f"find_files {pattern}: {result}")
-                    self.step_finished.emit(f"Found files: {pattern}", None, "Done" if success else "Failed")
-                elif cmd == 'find_symbol':
-                    symbol = args.get('symbol')
-                    root = args.get('root_dir', '.')
-                    symbol_type = args.get('symbol_type')
-                    file_pattern = args.get('file_pattern', '*.py')
-                    try:
-                        max_results = int(args.get('max_results', 50))
-                    except (ValueError, TypeError):
-                        max_results = 50
-                    self.step_started.emit("🔎", f"Finding symbol '{symbol}'...")
-                    result = AgentToolHandler.find_symbol(symbol, root_dir=root, symbol_type=symbol_type, file_pattern=file_pattern, max_results=max_results)
-                    tool_outputs.append(f"Python symbols for '{symbol}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"find_symbol: {symbol}")
-                    else:
-                        failed_actions.append(f"find_symbol {symbol}: {result}")
-                    self.step_finished.emit(f"Found symbol: {symbol}", None, "Done" if success else "Failed")
-                elif cmd == 'find_references':
-                    symbol = args.get('symbol')
-                    root = args.get('root_dir', '.')
-                    file_pattern = args.get('file_pattern', '*.py')
-                    include_definitions = str(args.get('include_definitions', 'false')).lower() == 'true'
-                    try:
-                        context_lines = int(args.get('context_lines', 1))
-                    except (ValueError, TypeError):
-                        context_lines = 1
-                    try:
-                        max_results = int(args.get('max_results', 50))
-                    except (ValueError, TypeError):
-                        max_results = 50
-                    self.step_started.emit("🧷", f"Finding references to '{symbol}'...")
-                    result = AgentToolHandler.find_references(symbol, root_dir=root, file_pattern=file_pattern, context_lines=context_lines, max_results=max_results, include_definitions=include_definitions)
-                    tool_outputs.append(f"Python references for '{symbol}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"find_references: {symbol}")
-                    else:
-                        failed_actions.append(f"find_references {symbol}: {result}")
-                    self.step_finished.emit(f"Found references: {symbol}", None, "Done" if success else "Failed")
-                elif cmd == 'get_imports':
-                    path = args.get('path')
-                    include_external = str(args.get('include_external', 'true')).lower() == 'true'
-                    self.step_started.emit("🕸️", f"Inspecting imports in {os.path.basename(path)}...")
-                    result = AgentToolHandler.get_imports(path, include_external=include_external)
-                    tool_outputs.append(f"Imports in '{path}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"get_imports: {path}")
-                    else:
-                        failed_actions.append(f"get_imports {path}: {result}")
-                    self.step_finished.emit(f"Imports in: {path}", None, "Done" if success else "Failed")
-                elif cmd == 'find_importers':
-                    target = args.get('target')
-                    root = args.get('root_dir', '.')
-                    file_pattern = args.get('file_pattern', '*.py')
-                    try:
-                        max_results = int(args.get('max_results', 50))
-                    except (ValueError, TypeError):
-                        max_results = 50
-                    self.step_started.emit("🕵️", f"Finding importers of '{target}'...")
-                    result = AgentToolHandler.find_importers(target, root_dir=root, file_pattern=file_pattern, max_results=max_results)
-                    tool_outputs.append(f"Importers for '{target}':\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"find_importers: {target}")
-                    else:
-                        failed_actions.append(f"find_importers {target}: {result}")
-                    self.step_finished.emit(f"Found importers: {target}", None, "Done" if success else "Failed")
-                elif cmd == 'get_file_structure':
-                    path = args.get('path')
-                    self.step_started.emit("🌳", f"Analyzing {os.path.basename(path)}...")
-                    result = AgentToolHandler.get_file_structure(path)
-                    tool_outputs.append(f"Structure of '{path}':\n{result}")
-                    self.step_finished.emit(f"Got structure of: {path}", None, "Done")
-                elif cmd == 'execute_command':
-                    command = args.get('command')
-                    cwd = args.get('cwd') or '.'
-                    self.step_started.emit("💻", f"Executing: {command}...")
-                    result = AgentToolHandler.execute_command(command, cwd)
-                    tool_outputs.append(f"Command Output:\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"execute_command: {command}")
-                    else:
-                        failed_actions.append(f"execute_command {command}: {result}")
-                    self.step_finished.emit(f"Executed: {command}", result, "Done" if success else "Failed")
-                elif cmd == 'search_memory':
-                    query = args.get('query')
-                    self.step_started.emit("🧠", f"Searching memory for '{query}'...")
-                    if not self._rag_enabled():
-                        tool_outputs.append("System: RAG memory search is disabled in settings.")
-                        self.step_finished.emit("Recall disabled", "Enable RAG in settings to search memory.", "Skipped")
-                        continue
-                    chunks = self.rag_client.retrieve(query, k=self.settings.get_rag_top_k())
-                    if chunks:
-                        context = self.rag_client.format_context_block(chunks)
-                        tool_outputs.append(f"Memory found for '{query}':\n{context}")
-                        self.step_finished.emit(f"Recall: found {len(chunks)} relevant memories", context, "Done")
-                    else:
-                        tool_outputs.append(f"System: No relevant memories found for '{query}'.")
-                        self.step_finished.emit("Recall: No matches in archive", None, "Done")
-                elif cmd == 'search_codebase':
-                    query = args.get('query')
-                    self.step_started.emit("🔎", f"Searching codebase for '{query}'...")
-                    if not self._rag_enabled():
-                        tool_outputs.append("System: RAG codebase search is disabled in settings.")
-                        self.step_finished.emit("Code search disabled", "Enable RAG in settings to search the codebase.", "Skipped")
-                        continue
-                    top_k = self.settings.get_rag_top_k()
-                    candidate_k = min(100, max(top_k * 5, top_k + 20))
-                    chunks = self.rag_client.retrieve(query, k=candidate_k)
-                    chunks = [c for c in chunks if str(c.doc_id).startswith("file:")][:top_k]
-                    preview_limit = self.settings.get_rag_max_chunk()
-                    if chunks:
-                        output = [f"Codebase Search Results for '{query}':"]
-                        for i, c in enumerate(chunks, 1):
-                            source_type = "File"
-                            location = c.doc_id
-                            if "file:" in c.doc_id:
-                                parts = c.doc_id.split(":")
-                                if len(parts) >= 3:
-                                    location = parts[2]
-                            output.append(f"\n--- Result {i} ({source_type}) | Score: {c.score:.4f} ---")
-                            output.append(f"Location: {location}")
-                            if c.start_line > 0:
-                                output.append(f"Lines: {c.start_line}-{c.end_line}")
-                            content_preview = c.content.strip()
-                            if len(content_preview) > preview_limit:
-                                content_preview = content_preview[:preview_limit] + "...(truncated)"
-                            output.append(f"Content:\n{content_preview}\n")
-                        tool_outputs.append("\n".join(output))
-                        self.step_finished.emit(f"Search: found {len(chunks)} code results", None, "Done")
-                    else:
-                        tool_outputs.append(f"System: No relevant code found for '{query}'.")
-                        self.step_finished.emit("Search: No matches found", None, "Done")
-                elif cmd == 'edit_file':
-                    path = args.get('path')
-                    old_text = html.unescape(args.get('old_text', ''))
-                    new_text = html.unescape(args.get('new_text', args.get('content', '')))
-                    start_line = args.get('start_line')
-                    end_line = args.get('end_line')
-                    occurrence = args.get('occurrence')
-                    match_mode = args.get('match_mode', 'smart')
-                    replace_all = str(args.get('replace_all', 'false')).lower() == 'true'
-                    anchor_before = html.unescape(args.get('anchor_before', ''))
-                    anchor_after = html.unescape(args.get('anchor_after', ''))
-                    insert_before = html.unescape(args.get('insert_before', ''))
-                    insert_after = html.unescape(args.get('insert_after', ''))
-                    try:
-                        start_line = int(start_line) if start_line not in (None, '') else None
-                    except (TypeError, ValueError):
-                        pass
-                    try:
-                        end_line = int(end_line) if end_line not in (None, '') else None
-                    except (TypeError, ValueError):
-                        pass
-                    try:
-                        occurrence = int(occurrence) if occurrence not in (None, '') else None
-                    except (TypeError, ValueError):
-                        pass
-                    edit_kwargs = {
-                        'start_line': start_line,
-                        'end_line': end_line,
-                        'match_mode': match_mode,
-                        'occurrence': occurrence,
-                        'replace_all': replace_all,
-                        'anchor_before': anchor_before,
-                        'anchor_after': anchor_after,
-                        'insert_before': insert_before,
-                        'insert_after': insert_after,
-                    }
-                    self.step_started.emit("✏️", f"Editing {os.path.basename(path)}...")
-                    full_path = AgentToolHandler.resolve_path(path)
-                    old_content = ""
-                    if os.path.exists(full_path):
-                        try:
-                            with open(full_path, 'r', encoding='utf-8') as f:
-                                old_content = f.read()
-                        except Exception:
-                            pass
-                    if not self.auto_approve:
-                        preview = AgentToolHandler.preview_edit(path, old_text=old_text, new_text=new_text, **edit_kwargs)
-                        diff_text = preview.get('error', '')
-                        if not diff_text:
-                            diff_text = AgentToolHandler.get_diff(preview.get('old_content', old_content), preview.get('new_content', old_content), os.path.basename(path))
-                            if not diff_text:
-                                diff_text = f"[Preview: {preview.get('summary', 'edit produced no visible diff')}]"
-                        preview_content = preview.get('new_content', old_content)
-                        self.change_proposed.emit(full_path, diff_text, preview_content)
-                        if not self._request_approval(f"Edit file: {path}"):
-                            tool_outputs.append(f"System: [{cmd}] Edit to '{path}' rejected by user.")
-                            self.step_finished.emit(f"Edit {os.path.basename(path)} rejected", None, "Skipped")
-                            continue
-                    result = AgentToolHandler.edit_file(path, old_text=old_text, new_text=new_text, **edit_kwargs)
-                    tool_outputs.append(f"System: {result}")
-                    if "[Success" in result:
-                        successful_changes.append(path)
-                        self.file_changed.emit(full_path)
-                        try:
-                            with open(full_path, 'r', encoding='utf-8') as f:
-                                new_content = f.read()
-                            diff_text = AgentToolHandler.get_diff(old_content, new_content, os.path.basename(path))
-                            if diff_text:
-                                self.diff_generated.emit(full_path, diff_text)
-                        except Exception:
-                            pass
-                    else:
-                        failed_actions.append(f"edit_file {path}: {result}")
-                    self.step_finished.emit(f"Edited {os.path.basename(path)}", None, "Done" if "[Success" in result else "Failed")
-                elif cmd == 'index_codebase':
-                    path = args.get('path', '.')
-                    self.step_started.emit("📚", f"Indexing codebase at {path}...")
-                    if not self._rag_enabled():
-                        tool_outputs.append("System: RAG indexing is disabled in settings.")
-                        self.step_finished.emit("Indexing disabled", "Enable RAG in settings to index the codebase.", "Skipped")
-                        continue
-                    from core.indexer import ProjectIndexer
-                    indexer = ProjectIndexer()
-                    success = indexer.index_project(path)
-                    if success:
-                        tool_outputs.append(f"System: Successfully indexed codebase at '{path}'.")
-                        successful_actions.append(f"index_codebase: {path}")
-                        self.step_finished.emit(f"Indexed {path}", None, "Done")
-                    else:
-                        tool_outputs.append(f"System: Failed to index codebase at '{path}'. Check logs.")
-                        failed_actions.append(f"index_codebase {path}: Failed to index codebase")
-                        self.step_finished.emit("Indexing failed", "Check logs", "Failed")
-                elif cmd in ('git_status', 'git_diff', 'git_log', 'git_commit', 'git_push', 'git_pull', 'git_fetch'):
-                    remote = args.get('remote', 'origin')
-                    branch = args.get('branch', '')
-                    git_cmds = {
-                        'git_status': 'git status --short',
-                        'git_diff': 'git diff' + (f" {args.get('path', '')}" if args.get('path') else ''),
-                        'git_log': f"git log --oneline -n {args.get('count', '15')}",
-                        'git_commit': f"git add -A && git commit -m \"{args.get('message', 'auto-commit')}\"",
-                        'git_push': f"git push {remote} {branch}".strip(),
-                        'git_pull': f"git pull {remote} {branch}".strip(),
-                        'git_fetch': f"git fetch {remote}".strip(),
-                    }
-                    git_cmd = git_cmds[cmd]
-                    self.step_started.emit("🔀", f"Git: {git_cmd}...")
-                    result = AgentToolHandler.execute_command(git_cmd)
-                    tool_outputs.append(f"Git Output ({cmd}):\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"{cmd}: {git_cmd}")
-                    else:
-                        failed_actions.append(f"{cmd} {git_cmd}: {result}")
-                    self.step_finished.emit(f"Git: {cmd}", result, "Done" if success else "Failed")
-                elif cmd == 'web_search':
-                    query = args.get('query', '')
-                    self.step_started.emit("🌐", f"Searching web: {query}...")
-                    try:
-                        from Vox_IronGate import IronGateClient
-                        result = IronGateClient.web_search(query)
-                    except ImportError:
-                        result = "[Error: IronGate web client not available]"
-                    except Exception as e:
-                        result = f"[Error: Web search failed — {e}]"
-                    tool_outputs.append(f"Web Search Results:\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"web_search: {query}")
-                    else:
-                        failed_actions.append(f"web_search {query}: {result}")
-                    self.step_finished.emit(f"Web search: {query}", None, "Done" if success else "Failed")
-                elif cmd == 'fetch_url':
-                    url = args.get('url', '')
-                    self.step_started.emit("🔗", f"Fetching {url}...")
-                    try:
-                        from Vox_IronGate import IronGateClient
-                        result = IronGateClient.fetch_url(url)
-                    except ImportError:
-                        result = "[Error: IronGate web client not available]"
-                    except Exception as e:
-                        result = f"[Error: Fetch failed — {e}]"
-                    tool_outputs.append(f"Fetched URL:\n{result}")
-                    success = self._tool_succeeded(cmd, result)
-                    if success:
-                        successful_actions.append(f"fetch_url: {url}")
-                    else:
-                        failed_actions.append(f"fetch_url {url}: {result}")
-                    self.step_finished.emit(f"Fetched: {url}", None, "Done" if success else "Failed")
-            except Exception as e:
-                tool_outputs.append(f"[TOOL_ERROR] {cmd} failed: {e}\nAnalyze this error and either fix the inputs and retry, or explain the issue to the user.")
-                failed_actions.append(f"{cmd}: {e}")
-                self.step_finished.emit(f"Error in {cmd}", str(e), "Failed")
-        summary = self._build_action_summary(successful_changes, successful_actions, failed_actions)
-        self.finished.emit(summary + "\n\n" + "\n\n".join(tool_outputs))
+            call_run.replay(run)
+        return completed
+
+    def _run_pooled_call(self, thread, call, run) -> bool:
+        if thread.isInterruptionRequested():
+            return False
+        self._run_call(call, run)
+        return True
+
+    def _run_call(self, call, run):
+        cmd = call['cmd']
+        args = call['args']
+        enabled, disabled_reason = run.settings.policy[cmd]
+        if not enabled:
+            run.tool_outputs.append(f"System: [{cmd}] Skipped — {disabled_reason}")
+            run.failed_actions.append(f"{cmd}: {disabled_reason}")
+            run.emit(self.step_finished, f"{cmd} blocked", disabled_reason, "Skipped")
+            return
+        if cmd in self.DESTRUCTIVE_CMDS:
+            desc_map = {
+                'delete_file': f"Delete: {args.get('path', '?')}",
+                'execute_command': f"Run: {args.get('command', '?')}",
+                'git_commit': f"Git commit: {args.get('message', '?')}",
+                'git_push': f"Git push: {args.get('remote', 'origin')} {args.get('branch', '')}".strip(),
+                'git_pull': f"Git pull: {args.get('remote', 'origin')} {args.get('branch', '')}".strip(),
+                'move_file': f"Move: {args.get('src', '?')} -> {args.get('dst', '?')}",
+            }
+            if not self._request_approval(desc_map.get(cmd, cmd)):
+                run.tool_outputs.append(f"System: [{cmd}] Skipped — user declined.")
+                run.emit(self.step_finished, f"{cmd} declined", None, "Skipped")
+                return
+        handler = self._HANDLERS.get(cmd)
+        if handler is None:
+            run.tool_outputs.append(f"System: [{cmd}] Skipped — unknown tool.")
+            run.failed_actions.append(f"{cmd}: unknown tool")
+            run.emit(self.step_finished, f"{cmd} unknown", None, "Skipped")
+            return
+        try:
+            handler(self, cmd, args, run)
+        except Exception as e:
+            run.tool_outputs.append(f"[TOOL_ERROR] {cmd} failed: {e}\nAnalyze this error and either fix the inputs and retry, or explain the issue to the user.")
+            run.failed_actions.append(f"{cmd}: {e}")
+            run.emit(self.step_finished, f"Error in {cmd}", str(e), "Failed")
+
+    def _do_list_files(self, cmd, args, run):
+        path = args.get('path', '.')
+        run.emit(self.step_started, "📂", f"Listing files in {path}...")
+        result = AgentToolHandler.list_files(path)
+        run.tool_outputs.append(f"Listed files in '{path}':\n{result}")
+        run.emit(self.step_finished, f"Listed files in: {path}", None, "Done")
+
+    def _do_read_file(self, cmd, args, run):
+        path = args.get('path')
+        try:
+            start = int(args.get('start_line', 1))
+        except (ValueError, TypeError):
+            start = 1
+        try:
+            end = int(args.get('end_line', 300))
+        except (ValueError, TypeError):
+            end = 300
+        with_line_numbers = str(args.get('with_line_numbers', 'false')).lower() == 'true'
+        run.emit(self.step_started, "📖", f"Reading {os.path.basename(path)}...")
+        content = AgentToolHandler.read_file(path, start_line=start, end_line=end, with_line_numbers=with_line_numbers)
+        run.tool_outputs.append(f"Read file '{path}':\n{content}")
+        run.emit(self.step_finished, f"Read file: {path}", None, "Done")
+
+    def _do_read_json(self, cmd, args, run):
+        path = args.get('path')
+        query = args.get('query')
+        try:
+            max_chars = int(args.get('max_chars', 4000))
+        except (ValueError, TypeError):
+            max_chars = 4000
+        run.emit(self.step_started, "🧾", f"Inspecting JSON {os.path.basename(path)}...")
+        result = AgentToolHandler.read_json(path, query=query, max_chars=max_chars)
+        run.tool_outputs.append(f"JSON content for '{path}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"read_json: {path}" + (f" ({query})" if query else ""))
+        else:
+            run.failed_actions.append(f"read_json {path}: {result}")
+        run.emit(self.step_finished, f"Read JSON: {path}", None, "Done" if success else "Failed")
+
+    def _do_read_python_symbols(self, cmd, args, run):
+        path = args.get('path')
+        symbols = args.get('symbols')
+        with_line_numbers = str(args.get('with_line_numbers', 'true')).lower() == 'true'
+        try:
+            max_symbols = int(args.get('max_symbols', 5))
+        except (ValueError, TypeError):
+            max_symbols = 5
+        run.emit(self.step_started, "🧠", f"Reading Python symbols from {os.path.basename(path)}...")
+        result = AgentToolHandler.read_python_symbols(path, symbols=symbols, with_line_numbers=with_line_numbers, max_symbols=max_symbols)
+        run.tool_outputs.append(f"Python symbols from '{path}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"read_python_symbols: {path} ({symbols})")
+        else:
+            run.failed_actions.append(f"read_python_symbols {path}: {result}")
+        run.emit(self.step_finished, f"Read Python symbols: {path}", None, "Done" if success else "Failed")
+
+    def _do_find_tests(self, cmd, args, run):
+        query = args.get('query')
+        source_path = args.get('source_path')
+        root = args.get('root_dir', 'tests')
+        try:
+            max_results = int(args.get('max_results', 20))
+        except (ValueError, TypeError):
+            max_results = 20
+        label = source_path or query
+        run.emit(self.step_started, "🧪", f"Finding tests for '{label}'...")
+        result = AgentToolHandler.find_tests(query=query, source_path=source_path, root_dir=root, max_results=max_results)
+        run.tool_outputs.append(f"Tests for '{label}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"find_tests: {label}")
+        else:
+            run.failed_actions.append(f"find_tests {label}: {result}")
+        run.emit(self.step_finished, f"Found tests: {label}", None, "Done" if success else "Failed")
+
+    def _do_write_file(self, cmd, args, run):
+        path = args.get('path')
+        content = args.get('content')
+        name = os.path.basename(path)
+        run.emit(self.step_started, "📝", f"Writing {name}...")
+        syntax_error = AgentToolHandler.validate_syntax(content, path)
+        if syntax_error:
+            run.tool_outputs.append(f"System: [Syntax Error] in '{path}':\n{syntax_error}")
+            run.emit(self.step_finished, f"Syntax Error in {name}", syntax_error, "Failed")
+            return
+        diff_text = None
+        diff_str = "modified"
+        old_content = None
+        full_path = AgentToolHandler.resolve_path(path)
+        try:
+            with open(full_path, 'r', encoding='utf-8') as f:
+                old_content = f.read()
+            if not self.auto_approve:
+                diff_text = AgentToolHandler.get_diff(old_content, content, name)
+        except FileNotFoundError:
+            diff_str = "new"
+            diff_text = f"[New File]\n{content}"
+        except Exception:
+            diff_text = "[Error generating diff]"
+        if not self.auto_approve and diff_text and "[Error" not in diff_text:
+            self.change_proposed.emit(full_path, diff_text, content)
+            if not self._request_approval(f"Write file: {path} ({diff_str})"):
+                run.tool_outputs.append(f"System: [{cmd}] Write to '{path}' rejected by user.")
+                run.emit(self.step_finished, f"Write {name} rejected", None, "Skipped")
+                return
+        result = AgentToolHandler.write_file(path, content)
+        run.tool_outputs.append(f"System: Wrote file '{path}' ({result})")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_changes.append(path)
+            self.file_changed.emit(full_path)
+        else:
+            run.failed_actions.append(f"write_file {path}: {result}")
+        if success and diff_text is None and old_content is not None:
+            self._emit_diff_later(full_path, old_content, content, name)
+        elif success and diff_text and "[Error" not in diff_text:
+            self.diff_generated.emit(full_path, diff_text)
+        run.emit(self.step_finished, f"Wrote {name} ({diff_str})", diff_text, "Done" if success else "Failed")
+
+    def _do_move_file(self, cmd, args, run):
+        src = args.get('src')
+        dst = args.get('dst')
+        run.emit(self.step_started, "➡️", f"Moving {os.path.basename(src)}...")
+        result = AgentToolHandler.move_file(src, dst)
+        run.tool_outputs.append(f"System: {result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_changes.append(f"{src} -> {dst}")
+            self.file_changed.emit(AgentToolHandler.resolve_path(dst))
+        else:
+            run.failed_actions.append(f"move_file {src} -> {dst}: {result}")
+        run.emit(self.step_finished, f"Moved {src} to {dst}", None, "Done" if success else "Failed")
+
+    def _do_copy_file(self, cmd, args, run):
+        src = args.get('src')
+        dst = args.get('dst')
+        run.emit(self.step_started, "📋", f"Copying {os.path.basename(src)}...")
+        result = AgentToolHandler.copy_file(src, dst)
+        run.tool_outputs.append(f"System: {result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_changes.append(f"{src} -> {dst}")
+            self.file_changed.emit(AgentToolHandler.resolve_path(dst))
+        else:
+            run.failed_actions.append(f"copy_file {src} -> {dst}: {result}")
+        run.emit(self.step_finished, f"Copied {src} to {dst}", None, "Done" if success else "Failed")
+
+    def _do_delete_file(self, cmd, args, run):
+        path = args.get('path')
+        run.emit(self.step_started, "🗑️", f"Deleting {os.path.basename(path)}...")
+        result = AgentToolHandler.delete_file(path)
+        run.tool_outputs.append(f"System: {result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_changes.append(path)
+            self.file_changed.emit(AgentToolHandler.resolve_path(path))
+        else:
+            run.failed_actions.append(f"delete_file {path}: {result}")
+        run.emit(self.step_finished, f"Deleted {path}", None, "Done" if success else "Failed")
+
+    def _do_search_files(self, cmd, args, run):
+        query = args.get('query')
+        root = args.get('root_dir', '.')
+        file_pattern = args.get('file_pattern')
+        case_insensitive = str(args.get('case_insensitive', 'false')).lower() == 'true'
+        try:
+            context_lines = int(args.get('context_lines', 0))
+        except (ValueError, TypeError):
+            context_lines = 0
+        try:
+            max_results = int(args.get('max_results', 100))
+        except (ValueError, TypeError):
+            max_results = 100
+        run.emit(self.step_started, "🔍", f"Searching '{query}'...")
+        result = AgentToolHandler.search_files(query, root, file_pattern=file_pattern, case_insensitive=case_insensitive, context_lines=context_lines, max_results=max_results)
+        run.tool_outputs.append(f"Search Results for '{query}':\n{result}")
+        run.emit(self.step_finished, f"Searched for '{query}'", None, "Done")
+
+    def _do_find_files(self, cmd, args, run):
+        pattern = args.get('pattern')
+        root = args.get('root_dir', '.')
+        case_insensitive = str(args.get('case_insensitive', 'false')).lower() == 'true'
+        try:
+            max_results = int(args.get('max_results', 100))
+        except (ValueError, TypeError):
+            max_results = 100
+        run.emit(self.step_started, "🧭", f"Finding files matching '{pattern}'...")
+        result = AgentToolHandler.find_files(pattern, root_dir=root, case_insensitive=case_insensitive, max_results=max_results)
+        run.tool_outputs.append(f"Found Files for '{pattern}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"find_files: {pattern}")
+        else:
+            run.failed_actions.append(f"find_files {pattern}: {result}")
+        run.emit(self.step_finished, f"Found files: {pattern}", None, "Done" if success else "Failed")
+
+    def _do_find_symbol(self, cmd, args, run):
+        symbol = args.get('symbol')
+        root = args.get('root_dir', '.')
+        symbol_type = args.get('symbol_type')
+        file_pattern = args.get('file_pattern', '*.py')
+        try:
+            max_results = int(args.get('max_results', 50))
+        except (ValueError, TypeError):
+            max_results = 50
+        run.emit(self.step_started, "🔎", f"Finding symbol '{symbol}'...")
+        result = AgentToolHandler.find_symbol(symbol, root_dir=root, symbol_type=symbol_type, file_pattern=file_pattern, max_results=max_results)
+        run.tool_outputs.append(f"Python symbols for '{symbol}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"find_symbol: {symbol}")
+        else:
+            run.failed_actions.append(f"find_symbol {symbol}: {result}")
+        run.emit(self.step_finished, f"Found symbol: {symbol}", None, "Done" if success else "Failed")
+
+    def _do_find_references(self, cmd, args, run):
+        symbol = args.get('symbol')
+        root = args.get('root_dir', '.')
+        file_pattern = args.get('file_pattern', '*.py')
+        include_definitions = str(args.get('include_definitions', 'false')).lower() == 'true'
+        try:
+            context_lines = int(args.get('context_lines', 1))
+        except (ValueError, TypeError):
+            context_lines = 1
+        try:
+            max_results = int(args.get('max_results', 50))
+        except (ValueError, TypeError):
+            max_results = 50
+        run.emit(self.step_started, "🧷", f"Finding references to '{symbol}'...")
+        result = AgentToolHandler.find_references(symbol, root_dir=root, file_pattern=file_pattern, context_lines=context_lines, max_results=max_results, include_definitions=include_definitions)
+        run.tool_outputs.append(f"Python references for '{symbol}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"find_references: {symbol}")
+        else:
+            run.failed_actions.append(f"find_references {symbol}: {result}")
+        run.emit(self.step_finished, f"Found references: {symbol}", None, "Done" if success else "Failed")
+
+    def _do_get_imports(self, cmd, args, run):
+        path = args.get('path')
+        include_external = str(args.get('include_external', 'true')).lower() == 'true'
+        run.emit(self.step_started, "🕸️", f"Inspecting imports in {os.path.basename(path)}...")
+        result = AgentToolHandler.get_imports(path, include_external=include_external)
+        run.tool_outputs.append(f"Imports in '{path}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"get_imports: {path}")
+        else:
+            run.failed_actions.append(f"get_imports {path}: {result}")
+        run.emit(self.step_finished, f"Imports in: {path}", None, "Done" if success else "Failed")
+
+    def _do_find_importers(self, cmd, args, run):
+        target = args.get('target')
+        root = args.get('root_dir', '.')
+        file_pattern = args.get('file_pattern', '*.py')
+        try:
+            max_results = int(args.get('max_results', 50))
+        except (ValueError, TypeError):
+            max_results = 50
+        run.emit(self.step_started, "🕵️", f"Finding importers of '{target}'...")
+        result = AgentToolHandler.find_importers(target, root_dir=root, file_pattern=file_pattern, max_results=max_results)
+        run.tool_outputs.append(f"Importers for '{target}':\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"find_importers: {target}")
+        else:
+            run.failed_actions.append(f"find_importers {target}: {result}")
+        run.emit(self.step_finished, f"Found importers: {target}", None, "Done" if success else "Failed")
+
+    def _do_get_file_structure(self, cmd, args, run):
+        path = args.get('path')
+        run.emit(self.step_started, "🌳", f"Analyzing {os.path.basename(path)}...")
+        result = AgentToolHandler.get_file_structure(path)
+        run.tool_outputs.append(f"Structure of '{path}':\n{result}")
+        run.emit(self.step_finished, f"Got structure of: {path}", None, "Done")
+
+    def _do_execute_command(self, cmd, args, run):
+        command = args.get('command')
+        cwd = args.get('cwd') or '.'
+        run.emit(self.step_started, "💻", f"Executing: {command}...")
+        result = AgentToolHandler.execute_command(command, cwd)
+        run.tool_outputs.append(f"Command Output:\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"execute_command: {command}")
+        else:
+            run.failed_actions.append(f"execute_command {command}: {result}")
+        run.emit(self.step_finished, f"Executed: {command}", result, "Done" if success else "Failed")
+
+    def _do_search_memory(self, cmd, args, run):
+        query = args.get('query')
+        run.emit(self.step_started, "🧠", f"Searching memory for '{query}'...")
+        if not run.settings.rag_enabled:
+            run.tool_outputs.append("System: RAG memory search is disabled in settings.")
+            run.emit(self.step_finished, "Recall disabled", "Enable RAG in settings to search memory.", "Skipped")
+            return
+        chunks = self._retrieve(query, self._rag_search_k(cmd, run.settings.rag_top_k))
+        if chunks:
+            context = self.rag_client.format_context_block(
+                chunks, max_chars=run.settings.rag_max_context, max_chunk_chars=run.settings.rag_max_chunk
+            )
+            run.tool_outputs.append(f"Memory found for '{query}':\n{context}")
+            run.emit(self.step_finished, f"Recall: found {len(chunks)} relevant memories", context, "Done")
+        else:
+            run.tool_outputs.append(f"System: No relevant memories found for '{query}'.")
+            run.emit(self.step_finished, "Recall: No matches in archive", None, "Done")
+
+    def _do_search_codebase(self, cmd, args, run):
+        query = args.get('query')
+        run.emit(self.step_started, "🔎", f"Searching codebase for '{query}'...")
+        if not run.settings.rag_enabled:
+            run.tool_outputs.append("System: RAG codebase search is disabled in settings.")
+            run.emit(self.step_finished, "Code search disabled", "Enable RAG in settings to search the codebase.", "Skipped")
+            return
+        top_k = run.settings.rag_top_k
+        chunks = self._retrieve(query, self._rag_search_k(cmd, run.settings.rag_top_k))
+        chunks = [c for c in chunks if str(c.doc_id).startswith("file:")][:top_k]
+        preview_limit = run.settings.rag_max_chunk
+        if chunks:
+            run.tool_outputs.append("\n".join([
+                f"Codebase Search Results for '{query}':",
+                *(_format_code_search_hit(i, c, preview_limit) for i, c in enumerate(chunks, 1)),
+            ]))
+            run.emit(self.step_finished, f"Search: found {len(chunks)} code results", None, "Done")
+        else:
+            run.tool_outputs.append(f"System: No relevant code found for '{query}'.")
+            run.emit(self.step_finished, "Search: No matches found", None, "Done")
+
+    def _do_edit_file(self, cmd, args, run):
+        path = args.get('path')
+        old_text = html.unescape(args.get('old_text', ''))
+        new_text = html.unescape(args.get('new_text', args.get('content', '')))
+        start_line = args.get('start_line')
+        end_line = args.get('end_line')
+        occurrence = args.get('occurrence')
+        match_mode = args.get('match_mode', 'smart')
+        replace_all = str(args.get('replace_all', 'false')).lower() == 'true'
+        anchor_before = html.unescape(args.get('anchor_before', ''))
+        anchor_after = html.unescape(args.get('anchor_after', ''))
+        insert_before = html.unescape(args.get('insert_before', ''))
+        insert_after = html.unescape(args.get('insert_after', ''))
+        try:
+            start_line = int(start_line) if start_line not in (None, '') else None
+        except (TypeError, ValueError):
+            pass
+        try:
+            end_line = int(end_line) if end_line not in (None, '') else None
+        except (TypeError, ValueError):
+            pass
+        try:
+            occurrence = int(occurrence) if occurrence not in (None, '') else None
+        except (TypeError, ValueError):
+            pass
+        edit_kwargs = {
+            'start_line': start_line,
+            'end_line': end_line,
+            'match_mode': match_mode,
+            'occurrence': occurrence,
+            'replace_all': replace_all,
+            'anchor_before': anchor_before,
+            'anchor_after': anchor_after,
+            'insert_before': insert_before,
+            'insert_after': insert_after,
+        }
+        name = os.path.basename(path)
+        run.emit(self.step_started, "✏️", f"Editing {name}...")
+        full_path = AgentToolHandler.resolve_path(path)
+        plan = AgentToolHandler.preview_edit(path, old_text=old_text, new_text=new_text, **edit_kwargs)
+        if not self.auto_approve:
+            old_content = plan.get('old_content', '')
+            diff_text = plan.get('error', '')
+            if not diff_text:
+                diff_text = AgentToolHandler.get_diff(old_content, plan.get('new_content', old_content), name)
+                if not diff_text:
+                    diff_text = f"[Preview: {plan.get('summary', 'edit produced no visible diff')}]"
+            preview_content = plan.get('new_content', old_content)
+            self.change_proposed.emit(full_path, diff_text, preview_content)
+            if not self._request_approval(f"Edit file: {path}"):
+                run.tool_outputs.append(f"System: [{cmd}] Edit to '{path}' rejected by user.")
+                run.emit(self.step_finished, f"Edit {name} rejected", None, "Skipped")
+                return
+            # Re-plan: the file may have changed while the user was deciding.
+            plan = AgentToolHandler.preview_edit(path, old_text=old_text, new_text=new_text, **edit_kwargs)
+        result = AgentToolHandler.apply_edit(path, plan)
+        run.tool_outputs.append(f"System: {result}")
+        if "[Success" in result:
+            run.successful_changes.append(path)
+            self.file_changed.emit(full_path)
+            # The plan holds both sides of the write, so there is nothing to re-read.
+            self._emit_diff_later(full_path, plan['old_content'], plan['new_content'], name)
+        else:
+            run.failed_actions.append(f"edit_file {path}: {result}")
+        run.emit(self.step_finished, f"Edited {name}", None, "Done" if "[Success" in result else "Failed")
+
+    def _do_index_codebase(self, cmd, args, run):
+        path = args.get('path', '.')
+        run.emit(self.step_started, "📚", f"Indexing codebase at {path}...")
+        if not run.settings.rag_enabled:
+            run.tool_outputs.append("System: RAG indexing is disabled in settings.")
+            run.emit(self.step_finished, "Indexing disabled", "Enable RAG in settings to index the codebase.", "Skipped")
+            return
+        from core.indexer import ProjectIndexer
+        indexer = ProjectIndexer()
+        success = indexer.index_project(path)
+        if success:
+            run.tool_outputs.append(f"System: Successfully indexed codebase at '{path}'.")
+            run.successful_actions.append(f"index_codebase: {path}")
+            run.emit(self.step_finished, f"Indexed {path}", None, "Done")
+        else:
+            run.tool_outputs.append(f"System: Failed to index codebase at '{path}'. Check logs.")
+            run.failed_actions.append(f"index_codebase {path}: Failed to index codebase")
+            run.emit(self.step_finished, "Indexing failed", "Check logs", "Failed")
+
+    def _do_git(self, cmd, args, run):
+        remote = args.get('remote', 'origin')
+        branch = args.get('branch', '')
+        git_cmds = {
+            'git_status': 'git status --short',
+            'git_diff': 'git diff' + (f" {args.get('path', '')}" if args.get('path') else ''),
+            'git_log': f"git log --oneline -n {args.get('count', '15')}",
+            'git_commit': f"git add -A && git commit -m \"{args.get('message', 'auto-commit')}\"",
+            'git_push': f"git push {remote} {branch}".strip(),
+            'git_pull': f"git pull {remote} {branch}".strip(),
+            'git_fetch': f"git fetch {remote}".strip(),
+        }
+        git_cmd = git_cmds[cmd]
+        run.emit(self.step_started, "🔀", f"Git: {git_cmd}...")
+        result = AgentToolHandler.execute_command(git_cmd)
+        run.tool_outputs.append(f"Git Output ({cmd}):\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"{cmd}: {git_cmd}")
+        else:
+            run.failed_actions.append(f"{cmd} {git_cmd}: {result}")
+        run.emit(self.step_finished, f"Git: {cmd}", result, "Done" if success else "Failed")
+
+    def _do_web_search(self, cmd, args, run):
+        query = args.get('query', '')
+        run.emit(self.step_started, "🌐", f"Searching web: {query}...")
+        try:
+            from Vox_IronGate import IronGateClient
+            result = IronGateClient.web_search(query)
+        except ImportError:
+            result = "[Error: IronGate web client not available]"
+        except Exception as e:
+            result = f"[Error: Web search failed — {e}]"
+        run.tool_outputs.append(f"Web Search Results:\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"web_search: {query}")
+        else:
+            run.failed_actions.append(f"web_search {query}: {result}")
+        run.emit(self.step_finished, f"Web search: {query}", None, "Done" if success else "Failed")
+
+    def _do_fetch_url(self, cmd, args, run):
+        url = args.get('url', '')
+        run.emit(self.step_started, "🔗", f"Fetching {url}...")
+        try:
+            from Vox_IronGate import IronGateClient
+            result = IronGateClient.fetch_url(url)
+        except ImportError:
+            result = "[Error: IronGate web client not available]"
+        except Exception as e:
+            result = f"[Error: Fetch failed — {e}]"
+        run.tool_outputs.append(f"Fetched URL:\n{result}")
+        success = self._tool_succeeded(cmd, result)
+        if success:
+            run.successful_actions.append(f"fetch_url: {url}")
+        else:
+            run.failed_actions.append(f"fetch_url {url}: {result}")
+        run.emit(self.step_finished, f"Fetched: {url}", None, "Done" if success else "Failed")
+
+    # cmd -> handler, looked up once per call instead of walking an elif chain.
+    _HANDLERS = {
+        'list_files': _do_list_files,
+        'read_file': _do_read_file,
+        'read_json': _do_read_json,
+        'read_python_symbols': _do_read_python_symbols,
+        'find_tests': _do_find_tests,
+        'write_file': _do_write_file,
+        'move_file': _do_move_file,
+        'copy_file': _do_copy_file,
+        'delete_file': _do_delete_file,
+        'search_files': _do_search_files,
+        'find_files': _do_find_files,
+        'find_symbol': _do_find_symbol,
+        'find_references': _do_find_references,
+        'get_imports': _do_get_imports,
+        'find_importers': _do_find_importers,
+        'get_file_structure': _do_get_file_structure,
+        'execute_command': _do_execute_command,
+        'search_memory': _do_search_memory,
+        'search_codebase': _do_search_codebase,
+        'edit_file': _do_edit_file,
+        'index_codebase': _do_index_codebase,
+        'git_status': _do_git,
+        'git_diff': _do_git,
+        'git_log': _do_git,
+        'git_commit': _do_git,
+        'git_push': _do_git,
+        'git_pull': _do_git,
+        'git_fetch': _do_git,
+        'web_search': _do_web_search,
+        'fetch_url': _do_fetch_url,
+    }
 
 
 class IndexingWorker(QObject):
@@ -700,11 +1171,12 @@ class IndexingWorker(QObject):
     def __init__(self, root_path):
         super().__init__()
         self.root_path = root_path
-        from core.indexer import ProjectIndexer
-        self.indexer = ProjectIndexer()
+        self.indexer = None  # built on the worker thread in run()
 
     def run(self):
         try:
+            from core.indexer import ProjectIndexer
+            self.indexer = ProjectIndexer()
             success = self.indexer.index_project(
                 self.root_path,
                 progress_callback=self.progress.emit,
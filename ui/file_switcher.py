@@ -72,14 +72,15 @@ class FileSwitcher(QDialog):
         self._all_files.clear()
         if not self._project_root:
             return
+        root_len = len(os.path.join(self._project_root, ""))
         for dirpath, dirnames, filenames in os.walk(self._project_root):
             dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+            rel_dir = os.path.join(dirpath, "")[root_len:]
             for fname in filenames:
                 _, ext = os.path.splitext(fname)
                 if ext.lower() in _SKIP_EXT:
                     continue
-                rel = os.path.relpath(os.path.join(dirpath, fname), self._project_root)
-                self._all_files.append(rel)
+                self._all_files.append(rel_dir + fname)
         self._all_files.sort()
 
     def _filter(self, text: str):
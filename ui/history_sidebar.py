@@ -107,10 +107,14 @@ class HistorySidebar(QWidget):
             self.list_widget.takeItem(self.list_widget.row(item))
 
     def _remove_conversation_file(self, conv_id: str):
-        """Try to delete the conversation JSON from the history dir."""
+        """Try to delete the conversation JSON (and its sidecar) from the history dir."""
         try:
             from core.agent_tools import get_project_root
-            path = os.path.join(get_project_root(), ".vox", "history", f"{conv_id}.json")
+            hist_dir = os.path.join(get_project_root(), ".vox", "history")
+            path = os.path.join(hist_dir, f"{conv_id}.json")
+            meta_path = os.path.join(hist_dir, f"{conv_id}.meta.json")
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
             if os.path.exists(path):
                 os.remove(path)
                 log.info("Deleted conversation %s", conv_id)
@@ -218,6 +218,7 @@ class CodingAgentIDE(QMainWindow):
             self.tree_panel.set_root_path(self.project_path)
             self.settings_manager.set_last_project_path(self.project_path)
         set_project_root(self.project_path)
+        self.chat_panel.prime_project_files()
         self.search_panel.set_root(self.project_path)
         if hasattr(self, '_title_label') and self.project_path:
             self._title_label.setText(os.path.basename(self.project_path))
@@ -474,7 +475,7 @@ class CodingAgentIDE(QMainWindow):
     # ------------------------------------------------------------------
     def _enter_terminal_mode(self):
         """Hide GUI, save context, launch CLI terminal in a real console."""
-        self.chat_panel.save_conversation()
+        self.chat_panel._do_save_conversation()
 
         conv_file = self.chat_panel._conversation_file()
         project_root = self.project_path or os.getcwd()
@@ -715,8 +716,10 @@ class CodingAgentIDE(QMainWindow):
             self.project_path = folder
             self.settings_manager.set_last_project_path(folder)
             self.tree_panel.set_root_path(folder)
+            self.chat_panel.flush_conversation_save()
             os.chdir(folder)
             set_project_root(folder)
+            self.chat_panel.prime_project_files()
             self.search_panel.set_root(folder)
             self.setWindowTitle(f"VoxAI Coding Agent IDE — {folder}")
             if hasattr(self, '_title_label'):
@@ -915,6 +918,12 @@ class CodingAgentIDE(QMainWindow):
     def _shutdown_background_work(self):
         chat_panel = getattr(self, 'chat_panel', None)
         if chat_panel is not None:
+            flush_save = getattr(chat_panel, 'flush_conversation_save', None)
+            if callable(flush_save):
+                try:
+                    flush_save()
+                except Exception:
+                    log.exception("Failed to flush pending conversation save")
             shutdown = getattr(chat_panel, '_shutdown_background_threads', None)
             if callable(shutdown):
                 try:
@@ -0,0 +1,247 @@
+"""Live, incrementally maintained listing of project files for the AI prompt."""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, Signal
+
+log = logging.getLogger(__name__)
+
+PROJECT_STRUCTURE_SKIP_DIRS = frozenset({
+    ".git", "__pycache__", "node_modules", ".venv", "venv", "storage", ".vox", "dist", "build",
+    ".mypy_cache", ".pytest_cache",
+})
+# Compiled and binary artifacts carry no signal for the model's project overview.
+PROJECT_STRUCTURE_SKIP_EXTS = (
+    ".pyc", ".pyo", ".exe", ".dll", ".so", ".dylib", ".bin", ".o", ".obj",
+    ".gguf", ".pth", ".pt", ".safetensors",
+)
+# inotify watches are a per-user budget and Windows spends a thread per ~63 watched
+# directories, so only the shallowest directories of a large tree are watched.
+MAX_WATCHED_DIRS = 512
+UNWATCHED_RESCAN_SECONDS = 30.0  # background rescan interval when part of the tree is unwatched
+
+
+def _scan_directory(path: str) -> tuple[list[str], list[str]]:
+    """Return the sorted file and subdirectory names of a single directory.
+
+    Skipped and symlinked directories are left out so they are never opened,
+    as are compiled and binary files.
+    """
+    files = []
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                if not entry.name.lower().endswith(PROJECT_STRUCTURE_SKIP_EXTS):
+                    files.append(entry.name)
+            elif entry.name not in PROJECT_STRUCTURE_SKIP_DIRS and not entry.is_symlink():
+                subdirs.append(entry.name)
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+
+def _scan_tree_entries(top: str) -> dict[str, tuple[list[str], list[str]]]:
+    """Scan every directory under ``top`` into a ``dir -> (files, subdirs)`` map."""
+    dirs = {}
+    stack = [top]
+    while stack:
+        path = stack.pop()
+        try:
+            files, subdirs = _scan_directory(path)
+        except OSError:
+            continue
+        dirs[path] = (files, subdirs)
+        stack.extend(os.path.join(path, d) for d in subdirs)
+    return dirs
+
+
+# Priming walks whole project trees; one shared thread keeps that off the GUI.
+_prime_executor = None
+
+
+def _prime_pool() -> ThreadPoolExecutor:
+    global _prime_executor
+    if _prime_executor is None:
+        _prime_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vox-file-index")
+    return _prime_executor
+
+
+def _scan_project_files(root: str) -> list[str]:
+    """List project files relative to ``root`` in sorted ``os.walk`` order.
+
+    Entries are sorted per directory so the structure prompt is byte-stable
+    across turns.
+    """
+    files = []
+    stack = [(root, "")]
+    while stack:
+        current, prefix = stack.pop()
+        try:
+            dir_files, subdirs = _scan_directory(current)
+        except OSError:
+            continue
+        files.extend(prefix + name for name in dir_files)
+        stack.extend((os.path.join(current, d), f"{prefix}{d}{os.sep}") for d in reversed(subdirs))
+    return files
+
+
+class ProjectFileIndex(QObject):
+    """Project file listing kept current by a ``QFileSystemWatcher``.
+
+    Every tree scan runs on a background thread: ``prime`` (or the first
+    ``files`` call for a root) scans the project, and afterwards only
+    directories reported as changed (by the watcher or by tool writes) are
+    rescanned. Directories past ``MAX_WATCHED_DIRS`` go unwatched and are
+    picked up by a periodic background rescan instead.
+    """
+
+    _primed = Signal(str, object)  # root, dir map scanned off the GUI thread
+    _subtree_scanned = Signal(str, str, object)  # root, new subdirectory, its dir map
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = ""
+        self._dirs: dict[str, tuple[list[str], list[str]]] = {}  # dir -> (files, subdirs)
+        self._files: list[str] | None = None  # sorted relative listing, rebuilt lazily
+        self._priming = ""  # root whose background scan has not landed yet
+        self._watched: set[str] = set()
+        self._unwatched = False  # part of the tree is over the watch cap
+        self._scanned_at = 0.0
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self.refresh_directory)
+        self._primed.connect(self._install_primed)
+        self._subtree_scanned.connect(self._install_subtree)
+
+    def files(self, root: str) -> list[str] | None:
+        """Return the sorted relative file listing for ``root``.
+
+        The returned list is replaced, never mutated, so callers may keep it.
+        Returns ``None`` (and starts a ``prime``) until ``root`` has been scanned.
+        """
+        root = os.path.normpath(root)
+        if root != self.root:
+            self.prime(root)
+            return None
+        if self._rescan_due():
+            self.prime(root)  # keep serving the current listing meanwhile
+        if self._files is None:
+            self._files = self._collect()
+        return self._files
+
+    def refresh_directory(self, path: str):
+        path = os.path.normpath(path)
+        entry = self._dirs.get(path)
+        if entry is None:
+            return
+        self._files = None
+        try:
+            files, subdirs = _scan_directory(path)
+        except OSError:
+            self._drop_tree(path)
+            return
+        self._dirs[path] = (files, subdirs)
+        old_subdirs = set(entry[1])
+        for name in old_subdirs.difference(subdirs):
+            self._drop_tree(os.path.join(path, name))
+        for name in subdirs:
+            if name not in old_subdirs:
+                _prime_pool().submit(self._scan_subtree, self.root, os.path.join(path, name))
+
+    def prime(self, root: str):
+        """Scan ``root`` on the shared index thread so ``files`` finds it ready."""
+        root = os.path.normpath(root)
+        if root == self._priming or (root == self.root and not self._rescan_due()):
+            return
+        self._priming = root
+        _prime_pool().submit(self._prime_scan, root)
+
+    def _rescan_due(self) -> bool:
+        return self._unwatched and time.monotonic() - self._scanned_at >= UNWATCHED_RESCAN_SECONDS
+
+    def _prime_scan(self, root: str):
+        scanned = _scan_tree_entries(root)
+        try:
+            self._primed.emit(root, scanned)  # queued back to the GUI thread
+        except RuntimeError:
+            pass  # the index was deleted while scanning
+
+    def _scan_subtree(self, root: str, top: str):
+        scanned = _scan_tree_entries(top)
+        try:
+            self._subtree_scanned.emit(root, top, scanned)
+        except RuntimeError:
+            pass
+
+    def _install_primed(self, root: str, scanned):
+        if root != self._priming:
+            return
+        self._priming = ""
+        self._reset(root, scanned)
+
+    def _install_subtree(self, root: str, top: str, scanned):
+        # Drop the scan if the project changed or the directory went away meanwhile.
+        parent = self._dirs.get(os.path.dirname(top))
+        if root != self.root or top in self._dirs or parent is None or os.path.basename(top) not in parent[1]:
+            return
+        self._files = None
+        self._add_tree(scanned)
+
+    def note_file_changed(self, file_path: str):
+        """Fold a file written or deleted by a tool in without waiting for the watcher."""
+        if file_path:
+            self.refresh_directory(os.path.dirname(os.path.abspath(file_path)))
+
+    def _reset(self, root: str, scanned: dict[str, tuple[list[str], list[str]]]):
+        if self._watched:
+            self._watcher.removePaths(list(self._watched))
+        self.root = root
+        self._dirs = {}
+        self._files = None
+        self._watched = set()
+        self._unwatched = False
+        self._scanned_at = time.monotonic()
+        self._add_tree(scanned)
+        log.debug("Project file index built for %s (%d dirs, %d watched)", root, len(self._dirs), len(self._watched))
+
+    def _add_tree(self, scanned: dict[str, tuple[list[str], list[str]]]):
+        self._dirs.update(scanned)
+        room = MAX_WATCHED_DIRS - len(self._watched)
+        new = [d for d in scanned if d not in self._watched]
+        if len(new) > room:
+            new.sort(key=lambda d: d.count(os.sep))  # shallowest first
+            del new[max(room, 0):]
+            self._unwatched = True
+        if new:
+            self._watcher.addPaths(new)
+            self._watched.update(new)
+
+    def _drop_tree(self, top: str):
+        prefix = top + os.sep
+        gone = [d for d in self._dirs if d == top or d.startswith(prefix)]
+        for d in gone:
+            del self._dirs[d]
+        unwatch = [d for d in gone if d in self._watched]
+        if unwatch:
+            self._watched.difference_update(unwatch)
+            self._watcher.removePaths(unwatch)
+
+    def _collect(self) -> list[str]:
+        listing = []
+        stack = [(self.root, "")]
+        while stack:
+            path, prefix = stack.pop()
+            entry = self._dirs.get(path)
+            if entry is None:
+                continue
+            files, subdirs = entry
+            listing.extend(prefix + name for name in files)
+            stack.extend((os.path.join(path, d), f"{prefix}{d}{os.sep}") for d in reversed(subdirs))
+        return listing
@@ -137,6 +137,7 @@ class MessageItem(QWidget):
                 f"line-height: 1.4;")
 
         self.content_label.setText(self._format(text, text_color))
+        self._rendered_key = (text, text_color)
         layout.addWidget(self.content_label)
 
         # ── Footer (token usage) ──
@@ -229,6 +230,12 @@ class MessageItem(QWidget):
     def set_text(self, text: str):
         self.original_text = text
         if hasattr(self, 'content_label'):
+            # Re-formatting and relaying out the label is the costly part; skip
+            # it when neither the text nor the colour changed.
+            key = (text, self.current_color)
+            if key == getattr(self, '_rendered_key', None):
+                return
+            self._rendered_key = key
             self.content_label.setText(self._format(text, self.current_color))
 
     def set_usage(self, usage: dict):